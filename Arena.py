@@ -1,9 +1,126 @@
 import logging
+import math
+import multiprocessing
+import os
+from collections import deque
 
+import numpy as np
 from tqdm import tqdm
 
+from MCTS import MCTS
+
 log = logging.getLogger(__name__)
 
+arenaWorkers = None  # the Arenas of a worker process (players in both orders), see initArenaWorker
+
+
+def initArenaWorker(game, playerFactories):
+    """
+    Initializes an arena worker process: builds its own two players from
+    their factories, and an Arena for each order of play.
+    """
+    global arenaWorkers
+    player1, player2 = (factory() for factory in playerFactories)
+    arenaWorkers = (Arena(player1, player2, game), Arena(player2, player1, game))
+
+
+def playArenaGame(task):
+    """
+    Plays one game in a worker process, with the RNG seeded with seed. If
+    swapped, player2 starts.
+
+    Returns:
+        result: the result of the game for player1 (as returned by
+                Arena.playGame when player1 starts)
+    """
+    seed, swapped = task
+    np.random.seed(seed)
+    result = arenaWorkers[swapped].playGame()
+    return -result if swapped else result
+
+
+class SPRT():
+    """
+    Sequential probability ratio test of the win rate p of player2 (the new
+    network in Coach.learn) over the games that are not drawn: H0: p = p0
+    against H1: p = p1, with false acceptance rate alpha and false rejection
+    rate beta. After every game the log-likelihood ratio of H1 over H0 is
+    updated, and the test decides as soon as it leaves
+    [log(beta / (1 - alpha)), log((1 - beta) / alpha)].
+    """
+
+    def __init__(self, p0, p1, alpha=0.05, beta=0.05):
+        self.win = math.log(p1 / p0)  # log-likelihood ratio of a win of player2
+        self.loss = math.log((1 - p1) / (1 - p0))  # and of a loss
+        self.lower = math.log(beta / (1 - alpha))
+        self.upper = math.log((1 - beta) / alpha)
+        self.llr = 0.
+        self.games = 0
+        self.decision = None  # True if H1 was accepted, False if H0 was, None while undecided
+        self.trace = []  # log-likelihood ratio after each game
+
+    def update(self, gameResult):
+        """
+        Adds a game, gameResult being its result for player1 (1 if player1
+        won, -1 if player2 won, anything else for a draw).
+
+        Returns:
+            decision: see self.decision
+        """
+        self.games += 1
+        if gameResult == -1:
+            self.llr += self.win
+        elif gameResult == 1:
+            self.llr += self.loss
+        self.trace.append(self.llr)
+        if self.decision is None:
+            if self.llr >= self.upper:
+                self.decision = True
+            elif self.llr <= self.lower:
+                self.decision = False
+        return self.decision
+
+
+class MCTSPlayer():
+    """
+    A player that plays the most visited action of an MCTS of nnet with args
+    (at temp=0). It keeps its tree across all the games it plays, so the
+    statistics of the earlier games make the later ones differ from them.
+    """
+
+    def __init__(self, game, nnet, args):
+        self.mcts = MCTS(game, nnet, args)
+
+    def searchStats(self):
+        """
+        Returns the number of searches of all the games so far, and the number
+        of simulations early stopping saved in them.
+        """
+        return self.mcts.searches, self.mcts.simsSaved
+
+    def __call__(self, board):
+        return np.argmax(self.mcts.getActionProb(board, temp=0))
+
+
+class MCTSPlayerFactory():
+    """
+    A picklable recipe for an MCTS player, to build the players of the worker
+    processes of a parallel Arena: loads the checkpoint folder/filename into a
+    new nnetClass(game), and returns an MCTSPlayer of it with args.
+    """
+
+    def __init__(self, game, nnetClass, folder, filename, args):
+        self.game = game
+        self.nnetClass = nnetClass
+        self.folder = folder
+        self.filename = filename
+        self.args = args
+
+    def __call__(self):
+        nnet = self.nnetClass(self.game)
+        nnet.load_checkpoint(folder=self.folder, filename=self.filename)
+        return MCTSPlayer(self.game, nnet, self.args)
+
 
 class Arena():
     """
@@ -62,16 +179,27 @@ class Arena():
             self.display(board)
         return curPlayer * self.game.getGameEnded(board, curPlayer)
 
-    def playGames(self, num, verbose=False):
+    def playGames(self, num, verbose=False, numWorkers=1, playerFactories=None, sprt=None):
         """
         Plays num games in which player1 starts num/2 games and player2 starts
         num/2 games.
 
+        With numWorkers > 1, the games are played in parallel by a pool of that
+        many processes, see playGamesParallel.
+
+        With an SPRT, the players take turns to start, and the games stop as
+        soon as the test is decided (see sprt.decision), so at most num games
+        are played.
+
         Returns:
             oneWon: games won by player1
             twoWon: games won by player2
             draws:  games won by nobody
         """
+        if numWorkers > 1:
+            return self.playGamesParallel(num, numWorkers, playerFactories, sprt)
+        if sprt is not None:
+            return self.playGamesSequential(num, sprt, verbose=verbose)
 
         num = int(num / 2)
         oneWon = 0
@@ -98,3 +226,250 @@ class Arena():
                 draws += 1
 
         return oneWon, twoWon, draws
+
+    def playGamesSequential(self, num, sprt, verbose=False):
+        """
+        Plays the games of playGames until sprt is decided, with the players
+        starting in turns.
+        """
+        num = int(num / 2)
+        oneWon = 0
+        twoWon = 0
+        draws = 0
+        for i in tqdm(range(2 * num), desc="Arena.playGames (SPRT)"):
+            swapped = i % 2 == 1
+            if swapped:
+                self.player1, self.player2 = self.player2, self.player1
+            gameResult = self.playGame(verbose=verbose)
+            if swapped:
+                self.player1, self.player2 = self.player2, self.player1
+                gameResult = -gameResult
+            if gameResult == 1:
+                oneWon += 1
+            elif gameResult == -1:
+                twoWon += 1
+            else:
+                draws += 1
+            if sprt.update(gameResult) is not None:
+                break
+
+        return oneWon, twoWon, draws
+
+    def playGamesParallel(self, num, numWorkers, playerFactories, sprt=None):
+        """
+        Plays the games of playGames on a pool of numWorkers processes. Players
+        usually hold an MCTS and a network, which cannot be shared with other
+        processes, so every worker builds its own players from
+        playerFactories: a pair of picklable callables (see MCTSPlayerFactory)
+        that return player1 and player2. Each worker keeps its players for all
+        the games it plays, as playGames does.
+
+        With an SPRT, the games are handed out with the players starting in
+        turns, and the pool is stopped as soon as the test is decided. The test
+        is then fed the results in the order the games were handed out, not
+        in the order they finish: short games, often one-sided, would
+        otherwise come first and bias an early decision.
+
+        Returns:
+            oneWon: games won by player1
+            twoWon: games won by player2
+            draws:  games won by nobody
+        """
+        if playerFactories is None:
+            raise ValueError("Parallel games need playerFactories to build the players of the workers")
+
+        num = int(num / 2)
+        seeds = np.random.randint(2 ** 31, size=2 * num)
+        if sprt is None:
+            tasks = [(seed, i >= num) for i, seed in enumerate(seeds)]
+        else:
+            tasks = [(seed, i % 2 == 1) for i, seed in enumerate(seeds)]
+
+        # see Coach.executeEpisodesParallel
+        os.environ.setdefault('OMP_NUM_THREADS', '1')
+        context = multiprocessing.get_context('spawn')
+
+        oneWon = 0
+        twoWon = 0
+        draws = 0
+        with context.Pool(numWorkers, initializer=initArenaWorker, initargs=(self.game, playerFactories)) as pool:
+            imap = pool.imap_unordered if sprt is None else pool.imap
+            for gameResult in tqdm(imap(playArenaGame, tasks), total=len(tasks), desc="Arena.playGames (parallel)"):
+                if gameResult == 1:
+                    oneWon += 1
+                elif gameResult == -1:
+                    twoWon += 1
+                else:
+                    draws += 1
+                if sprt is not None and sprt.update(gameResult) is not None:
+                    # leaving the with block terminates the games still running
+                    break
+
+        return oneWon, twoWon, draws
+
+
+class LockStepGame():
+    """
+    The state of one game of a BatchedArena.
+    """
+
+    def __init__(self, game, mcts, first):
+        self.first = first  # index of the network that plays player 1
+        self.mcts = mcts  # the trees of the networks, see BatchedArena.trees
+        self.board = game.getInitBoard()
+        self.curPlayer = 1
+        self.canonicalBoard = None  # board searched from by the network to move
+        self.s = None  # key of canonicalBoard in the tree of that network
+        self.sims = 0  # simulations done for the current move
+
+    def mover(self):
+        """Returns the index of the network to move."""
+        return self.first if self.curPlayer == 1 else 1 - self.first
+
+
+class BatchedArena():
+    """
+    An Arena in which two networks play against each other with MCTS, with
+    numGames games advanced in lock-step. Every round runs one simulation
+    (args.mctsBatchSize with batched leaf evaluation) in each game, and the
+    leaves of all the games are evaluated with one predict_batch call per
+    network. Finished games are replaced by new ones until all games are
+    played.
+
+    The games are played on numGames pairs of trees, one tree per network,
+    and each pair is kept for the following games played on it, like the
+    trees of the MCTSPlayers of an Arena: the statistics of the earlier games
+    make the later ones differ (at temp=0, games searched from new trees
+    mostly replay each other). With numGames=1, the games are those of an
+    Arena of two MCTSPlayers.
+    """
+
+    def __init__(self, nnet1, nnet2, game, args, numGames=8):
+        """
+        Input:
+            nnet1, nnet2: the NeuralNets of player1 and player2, they need
+                          predict_batch
+            game: Game object
+            args: the MCTS args of both players
+            numGames: number of games played at the same time
+        """
+        self.nnets = (nnet1, nnet2)
+        self.game = game
+        self.args = args
+        self.numGames = numGames
+        # the idle pairs of trees, a game takes one and gives it back when it ends
+        self.trees = deque(tuple(MCTS(game, nnet, args) for nnet in self.nnets) for _ in range(numGames))
+
+    def playGames(self, num, sprt=None):
+        """
+        Plays num games in which player1 starts num/2 games and player2 starts
+        num/2 games.
+
+        With an SPRT, the players take turns to start, and the games stop as
+        soon as the test is decided (see Arena.playGames).
+
+        Returns:
+            oneWon: games won by player1
+            twoWon: games won by player2
+            draws:  games won by nobody
+        """
+        num = int(num / 2)
+        if sprt is None:
+            waiting = deque([0] * num + [1] * num)  # the player that starts each game
+        else:
+            waiting = deque([0, 1] * num)
+        active = []
+        oneWon = 0
+        twoWon = 0
+        draws = 0
+
+        with tqdm(total=2 * num, desc="BatchedArena.playGames") as progress:
+            while waiting or active:
+                while waiting and len(active) < self.numGames:
+                    g = LockStepGame(self.game, self.trees.popleft(), waiting.popleft())
+                    self.startMove(g)
+                    active.append(g)
+
+                self.simulate(active)
+
+                for g in list(active):
+                    if not self.moveIsSearched(g):
+                        continue
+                    gameResult = self.playMove(g)
+                    if gameResult is None:
+                        self.startMove(g)
+                        continue
+                    active.remove(g)
+                    self.trees.append(g.mcts)
+                    progress.update()
+                    if gameResult == 1:
+                        oneWon += 1
+                    elif gameResult == -1:
+                        twoWon += 1
+                    else:
+                        draws += 1
+                    if sprt is not None and sprt.update(gameResult) is not None:
+                        waiting.clear()
+                        self.trees.extend(g.mcts for g in active)
+                        active.clear()
+                        break
+
+        return oneWon, twoWon, draws
+
+    def startMove(self, g):
+        g.canonicalBoard = self.game.getCanonicalForm(g.board, g.curPlayer)
+        g.s = g.mcts[g.mover()].setRootBoard(g.canonicalBoard)
+        g.sims = 0
+
+    def simulate(self, active):
+        """
+        Runs a round of simulations in all active games, with one
+        predict_batch call per network for the leaves of all of them.
+        """
+        requests = ([], [])  # (game, paths, leaves) of the searches of each network
+        for g in active:
+            mcts = g.mcts[g.mover()]
+            batchSize = 1
+            if g.s in mcts.Ps:
+                # paths can only spread out once the root is expanded
+                batchSize = min(getattr(self.args, 'mctsBatchSize', 1), self.args.numMCTSSims - g.sims)
+            paths, leaves = mcts.selectLeaves(g.canonicalBoard, batchSize, g.s)
+            g.sims += batchSize
+            requests[g.mover()].append((g, paths, leaves))
+
+        for nnet, searches in zip(self.nnets, requests):
+            boards = [board for _, _, leaves in searches for board in leaves.values()]
+            pis, vs = nnet.predict_batch(boards) if boards else ([], [])
+            i = 0
+            for g, paths, leaves in searches:
+                mcts = g.mcts[g.mover()]
+                mcts.backupLeaves(paths, leaves, pis[i:i + len(leaves)], vs[i:i + len(leaves)])
+                mcts.evict()
+                i += len(leaves)
+
+    def moveIsSearched(self, g):
+        if g.sims >= self.args.numMCTSSims:
+            return True
+        mcts = g.mcts[g.mover()]
+        return getattr(self.args, 'earlyStop', False) and mcts.leaderIsSafe(g.s, self.args.numMCTSSims - g.sims)
+
+    def playMove(self, g):
+        """
+        Plays the most visited action of the current search of game g.
+
+        Returns:
+            gameResult: None if the game goes on, otherwise its result for
+                        player1 (as in Arena.playGames)
+        """
+        mcts = g.mcts[g.mover()]
+        action = int(np.argmax(mcts.visitProbs(g.s, temp=0)))
+        mcts.searches += 1
+        mcts.simsSaved += max(self.args.numMCTSSims - g.sims, 0)
+        g.board, g.curPlayer = self.game.getNextState(g.board, g.curPlayer, action)
+
+        r = self.game.getGameEnded(g.board, g.curPlayer)
+        if r == 0:
+            return None
+        # result for the player that started, see Arena.playGame
+        gameResult = g.curPlayer * r
+        return gameResult if g.first == 0 else -gameResult
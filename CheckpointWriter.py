@@ -0,0 +1,72 @@
+import logging
+import queue
+import threading
+
+log = logging.getLogger(__name__)
+
+
+class CheckpointWriter():
+    """
+    Saves checkpoints of a network on a background thread, so that training
+    does not wait for the disk. save takes an in-memory snapshot of the
+    network (see NeuralNet.snapshot) right away; the thread loads it into a
+    spare network of the same class and writes that one with save_checkpoint.
+    Networks that cannot take snapshots are saved before save returns.
+
+    A write that fails is raised again by the next call to save or wait.
+    """
+
+    def __init__(self, game, nnetClass):
+        self.game = game
+        self.nnetClass = nnetClass
+        self.spare = None  # the network the snapshots are written with, built by the thread
+        self.error = None  # the exception of a failed write, until save or wait raise it
+        self.jobs = queue.Queue()
+        self.thread = threading.Thread(target=self.write, daemon=True)
+        self.thread.start()
+
+    def save(self, nnet, folder, filename):
+        """
+        Saves nnet in folder/filename, as it is when save is called.
+        """
+        self.raiseError()
+        snapshot = nnet.snapshot()
+        if snapshot is None:
+            nnet.save_checkpoint(folder=folder, filename=filename)
+        else:
+            self.jobs.put((snapshot, folder, filename))
+
+    def write(self):
+        while True:
+            job = self.jobs.get()
+            if job is None:
+                self.jobs.task_done()
+                break
+            snapshot, folder, filename = job
+            try:
+                if self.spare is None:
+                    self.spare = self.nnetClass(self.game)
+                self.spare.restore(snapshot)
+                self.spare.save_checkpoint(folder=folder, filename=filename)
+            except Exception as e:
+                log.exception(f'Writing checkpoint {filename} failed')
+                if self.error is None:
+                    self.error = e
+            finally:
+                self.jobs.task_done()
+
+    def wait(self):
+        """
+        Waits until all checkpoints passed to save are written.
+        """
+        self.jobs.join()
+        self.raiseError()
+
+    def raiseError(self):
+        error, self.error = self.error, None
+        if error is not None:
+            raise error
+
+    def close(self):
+        self.jobs.put(None)
+        self.thread.join()
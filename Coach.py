@@ -1,18 +1,153 @@
+import json
 import logging
+import multiprocessing
 import os
-import sys
+import queue
+import random
+import shutil
+import time
 from collections import deque
-from pickle import Pickler, Unpickler
+from pickle import Unpickler
 from random import shuffle
 
 import numpy as np
 from tqdm import tqdm
 
-from Arena import Arena
+from Arena import Arena, BatchedArena, MCTSPlayer, MCTSPlayerFactory, SPRT
+from CheckpointWriter import CheckpointWriter
+from InferenceServer import InferenceServer
 from MCTS import MCTS
+from ReplayBuffer import ExampleStore, ReplayBuffer
 
 log = logging.getLogger(__name__)
 
+selfPlayCoach = None  # the Coach of a self-play worker process, see initSelfPlayWorker
+
+
+def initSelfPlayWorker(game, nnetClass, args, folder, filename):
+    """
+    Initializes a self-play worker process: builds its own network from the
+    checkpoint folder/filename and a Coach that plays episodes with it.
+    """
+    global selfPlayCoach
+    nnet = nnetClass(game)
+    nnet.load_checkpoint(folder=folder, filename=filename)
+    selfPlayCoach = Coach(game, nnet, args)
+
+
+def initSelfPlayClient(game, clients, clientIds, args):
+    """
+    Initializes a self-play worker process that evaluates its boards through
+    an InferenceServer: takes one of the clients and plays with it instead of
+    a network of its own.
+    """
+    global selfPlayCoach
+    selfPlayCoach = Coach(game, clients[clientIds.get()], args)
+
+
+def playSelfPlayEpisode(seed):
+    """
+    Plays one episode of self-play in a worker process, with a fresh search
+    tree and the RNG seeded with seed.
+
+    Returns:
+        trainExamples: the examples returned by Coach.executeEpisode
+        sims: number of MCTS simulations the episode took
+        moves: number of moves it took
+        positions: number of positions it recorded as training examples
+    """
+    np.random.seed(seed)
+    selfPlayCoach.mcts = MCTS(selfPlayCoach.game, selfPlayCoach.nnet, selfPlayCoach.args)
+    selfPlayCoach.selfPlaySims = selfPlayCoach.selfPlayMoves = selfPlayCoach.selfPlayPositions = 0
+    trainExamples = selfPlayCoach.executeEpisode()
+    return trainExamples, selfPlayCoach.selfPlaySims, selfPlayCoach.selfPlayMoves, selfPlayCoach.selfPlayPositions
+
+
+def selfPlayActor(game, nnetClass, args, modelVersion, results, stop, seed):
+    """
+    The loop of a self-play actor process of Coach.learnAsync: plays episodes
+    with the network in best.pth.tar of args.checkpoint, which it reloads
+    whenever modelVersion changes, and puts the results of every episode on
+    the results queue, until stop is set. A final None tells that it is done.
+    """
+    np.random.seed(seed)
+    nnet = nnetClass(game)
+    coach = Coach(game, nnet, args)
+    version = None
+    while not stop.is_set():
+        if modelVersion.value != version:
+            version = modelVersion.value
+            nnet.load_checkpoint(folder=args.checkpoint, filename='best.pth.tar')
+        coach.mcts = MCTS(game, nnet, args)
+        coach.selfPlaySims = coach.selfPlayMoves = coach.selfPlayPositions = 0
+        trainExamples = coach.executeEpisode()
+        results.put((trainExamples, coach.selfPlaySims, coach.selfPlayMoves, coach.selfPlayPositions))
+    results.put(None)
+
+
+def evaluateCandidates(game, nnetClass, args, modelVersion, candidates, verdicts):
+    """
+    The loop of the evaluator process of Coach.learnAsync: pits every
+    (iteration, filename) candidate it gets from the candidates queue against
+    the network in best.pth.tar. An accepted candidate replaces best.pth.tar
+    (atomically, the actors may be loading it) and bumps modelVersion. The
+    (iteration, accept, pwins, nwins, draws) verdicts are put on the verdicts
+    queue. Stops at a None candidate.
+    """
+    pnet, nnet = nnetClass(game), nnetClass(game)
+    while True:
+        candidate = candidates.get()
+        if candidate is None:
+            break
+        iteration, filename = candidate
+        pnet.load_checkpoint(folder=args.checkpoint, filename='best.pth.tar')
+        nnet.load_checkpoint(folder=args.checkpoint, filename=filename)
+        sprt = newSPRT(args)
+        if getattr(args, 'arenaLockStepGames', 1) > 1:
+            arena = BatchedArena(pnet, nnet, game, args, numGames=args.arenaLockStepGames)
+        else:
+            arena = Arena(MCTSPlayer(game, pnet, args), MCTSPlayer(game, nnet, args), game)
+        pwins, nwins, draws = arena.playGames(args.arenaCompare, sprt=sprt)
+        accept = acceptNewModel(args, sprt, pwins, nwins, draws)
+
+        candidateFile = os.path.join(args.checkpoint, filename)
+        if accept:
+            shutil.copyfile(candidateFile, os.path.join(args.checkpoint, 'checkpoint_' + str(iteration) + '.pth.tar'))
+            os.replace(candidateFile, os.path.join(args.checkpoint, 'best.pth.tar'))
+            with modelVersion.get_lock():
+                modelVersion.value += 1
+        else:
+            os.remove(candidateFile)
+        verdicts.put((iteration, accept, pwins, nwins, draws))
+
+
+def newSPRT(args):
+    """
+    Returns the SPRT that gates the new networks with args.sprtGating, else None.
+    """
+    if not getattr(args, 'sprtGating', False):
+        return None
+    delta = getattr(args, 'sprtDelta', 0.1)
+    return SPRT(max(args.updateThreshold - delta, 0.01), min(args.updateThreshold + delta, 0.99),
+                alpha=getattr(args, 'sprtAlpha', 0.05), beta=getattr(args, 'sprtBeta', 0.05))
+
+
+def acceptNewModel(args, sprt, pwins, nwins, draws):
+    """
+    Logs the result of the arena games and decides whether the new network
+    is accepted: by the decision of the SPRT if it reached one, else by
+    whether it won at least args.updateThreshold of the decisive games.
+    """
+    log.info('NEW/PREV WINS : %d / %d ; DRAWS : %d' % (nwins, pwins, draws))
+    if sprt is not None:
+        log.info(f'SPRT: decision {sprt.decision} after {sprt.games} games '
+                 f'({args.arenaCompare - sprt.games} saved), LLR bounds '
+                 f'[{sprt.lower:.2f}, {sprt.upper:.2f}]')
+        log.info('SPRT trace: ' + ' '.join(f'{llr:.2f}' for llr in sprt.trace))
+    if sprt is not None and sprt.decision is not None:
+        return sprt.decision
+    return pwins + nwins > 0 and float(nwins) / (pwins + nwins) >= args.updateThreshold
+
 
 class Coach():
     """
@@ -23,11 +158,29 @@ class Coach():
     def __init__(self, game, nnet, args):
         self.game = game
         self.nnet = nnet
-        self.pnet = self.nnet.__class__(self.game)  # the competitor network
+        self.pnet = None  # the competitor network, built when learn() first needs it
+        self.checkpointWriter = None  # writes the checkpoints with args.asyncCheckpoints, see saveCheckpoint
         self.args = args
         self.mcts = MCTS(self.game, self.nnet, self.args)
-        self.trainExamplesHistory = []  # history of examples from args.numItersForTrainExamplesHistory latest iterations
+        # examples of the args.numItersForTrainExamplesHistory latest iterations, in RAM or (with
+        # args.replayOnDisk) in memory-mapped files of the replay folder
+        replayArgs = dict(
+            capacity=getattr(args, 'replayBufferSize', None) or args.maxlenOfQueue * args.numItersForTrainExamplesHistory,
+            maxChunks=args.numItersForTrainExamplesHistory,
+            boardDtype=getattr(args, 'replayBoardDtype', None), piDtype=getattr(args, 'replayPiDtype', 'float32'),
+            game=game if getattr(args, 'lazySymmetries', False) else None)
+        if getattr(args, 'replayOnDisk', False):
+            self.replayBuffer = ExampleStore(self.getReplayFolder(args.checkpoint), **replayArgs)
+        else:
+            self.replayBuffer = ReplayBuffer(**replayArgs)
         self.skipFirstSelfPlay = False  # can be overriden in loadTrainExamples()
+        self.startIteration = 1  # can be overriden in loadTrainingState()
+        self.selfPlaySims = 0  # MCTS simulations run by the self-play of the current iteration
+        self.selfPlayMoves = 0  # moves played by that self-play
+        self.selfPlayPositions = 0  # positions it recorded as training examples
+        self.learnStart = None  # time learn() started, for the throughput
+        self.examplesAdded = 0  # examples added to the replay buffer since
+        self.modelsAccepted = 0  # networks accepted by the arena since
 
     def executeEpisode(self):
         """
@@ -40,6 +193,16 @@ class Coach():
         It uses a temp=1 if episodeStep < tempThreshold, and thereafter
         uses temp=0.
 
+        Each move is a full search (args.numMCTSSims simulations, with
+        Dirichlet noise at the root) with probability args.fullSearchProb
+        (default 1), and a fast search of args.numFastSims simulations
+        otherwise. Only the positions of full searches are recorded, the fast
+        ones just pick the move (playout cap randomization, as in KataGo).
+
+        Every position is recorded in all its symmetrical forms, or only as
+        it is with args.lazySymmetries, in which case the replay buffer applies
+        a random symmetry whenever the example is sampled for training.
+
         Returns:
             trainExamples: a list of examples of the form (canonicalBoard, currPlayer, pi,v)
                            pi is the MCTS informed policy vector, v is +1 if
@@ -49,25 +212,95 @@ class Coach():
         board = self.game.getInitBoard()
         self.curPlayer = 1
         episodeStep = 0
+        sims = self.mcts.sims
 
         while True:
             episodeStep += 1
+            self.selfPlayMoves += 1
             canonicalBoard = self.game.getCanonicalForm(board, self.curPlayer)
             temp = int(episodeStep < self.args.tempThreshold)
 
-            pi = self.mcts.getActionProb(canonicalBoard, temp=temp)
-            sym = self.game.getSymmetries(canonicalBoard, pi)
-            for b, p in sym:
-                trainExamples.append([b, self.curPlayer, p, None])
+            if np.random.rand() < getattr(self.args, 'fullSearchProb', 1):
+                pi = self.mcts.getActionProb(canonicalBoard, temp=temp, rootNoise=True)
+                if getattr(self.args, 'lazySymmetries', False):
+                    sym = [(canonicalBoard, pi)]
+                else:
+                    sym = self.game.getSymmetries(canonicalBoard, pi)
+                for b, p in sym:
+                    trainExamples.append([b, self.curPlayer, p, None])
+                self.selfPlayPositions += 1
+            else:
+                pi = self.mcts.getActionProb(canonicalBoard, temp=temp, numSims=self.args.numFastSims)
 
             action = np.random.choice(len(pi), p=pi)
+            if getattr(self.args, 'reuseTree', False):
+                self.mcts.advanceRoot(canonicalBoard, action)
             board, self.curPlayer = self.game.getNextState(board, self.curPlayer, action)
 
             r = self.game.getGameEnded(board, self.curPlayer)
 
             if r != 0:
+                self.selfPlaySims += self.mcts.sims - sims
                 return [(x[0], x[2], r * ((-1) ** (x[1] != self.curPlayer))) for x in trainExamples]
 
+    def executeEpisodesParallel(self, numEps):
+        """
+        Plays numEps episodes of self-play on a pool of args.numSelfPlayWorkers
+        processes. Every worker loads the current network from temp.pth.tar in
+        args.checkpoint and plays each episode with its own MCTS and RNG seed.
+
+        With args.useInferenceServer, the workers do not load a network.
+        Instead, self.nnet evaluates the boards of all workers on an
+        InferenceServer thread in this process, in batches of up to
+        args.inferenceBatchSize boards (default numSelfPlayWorkers), waiting at
+        most args.inferenceMaxWait seconds (default 0.005) for a batch to fill.
+
+        The simulations, moves and positions of the episodes are added to
+        self.selfPlaySims, self.selfPlayMoves and self.selfPlayPositions as
+        they come in.
+
+        Yields:
+            trainExamples: the examples of each episode (as returned by
+                           executeEpisode), in the order the episodes finish
+        """
+        workers = self.args.numSelfPlayWorkers
+        seeds = np.random.randint(2 ** 31, size=numEps)
+
+        # every worker runs on its own core, so keep the deep learning
+        # frameworks from starting a thread pool of their own in each of them
+        os.environ.setdefault('OMP_NUM_THREADS', '1')
+        # spawn rather than fork: neither PyTorch nor TensorFlow survive a fork
+        # once they are initialized
+        context = multiprocessing.get_context('spawn')
+
+        server = None
+        if getattr(self.args, 'useInferenceServer', False):
+            server = InferenceServer(self.nnet, workers,
+                                     maxBatchSize=getattr(self.args, 'inferenceBatchSize', workers),
+                                     maxWaitTime=getattr(self.args, 'inferenceMaxWait', 0.005),
+                                     context=context)
+            clientIds = context.Queue()
+            for clientId in range(workers):
+                clientIds.put(clientId)
+            initializer, initargs = initSelfPlayClient, (self.game, server.clients, clientIds, self.args)
+            server.start()
+        else:
+            self.nnet.save_checkpoint(folder=self.args.checkpoint, filename='temp.pth.tar')
+            initializer, initargs = initSelfPlayWorker, (self.game, self.nnet.__class__, self.args,
+                                                         self.args.checkpoint, 'temp.pth.tar')
+
+        try:
+            with context.Pool(workers, initializer=initializer, initargs=initargs) as pool:
+                for trainExamples, sims, moves, positions in pool.imap_unordered(playSelfPlayEpisode, seeds):
+                    self.selfPlaySims += sims
+                    self.selfPlayMoves += moves
+                    self.selfPlayPositions += positions
+                    yield trainExamples
+        finally:
+            if server is not None:
+                server.stop()
+                server.logStats()
+
     def learn(self):
         """
         Performs numIters iterations with numEps episodes of self-play in each
@@ -75,83 +308,361 @@ class Coach():
         examples in trainExamples (which has a maximum length of maxlenofQueue).
         It then pits the new neural network against the old one and accepts it
         only if it wins >= updateThreshold fraction of games.
+
+        With args.asyncPipeline, runs learnAsync instead.
         """
+        if getattr(self.args, 'asyncPipeline', False):
+            return self.learnAsync()
 
-        for i in range(1, self.args.numIters + 1):
-            # bookkeeping
-            log.info(f'Starting Iter #{i} ...')
-            # examples of the iteration
-            if not self.skipFirstSelfPlay or i > 1:
-                iterationTrainExamples = deque([], maxlen=self.args.maxlenOfQueue)
+        self.learnStart = time.time()
+        try:
+            for i in range(self.startIteration, self.args.numIters + 1):
+                # bookkeeping
+                log.info(f'Starting Iter #{i} ...')
+                # examples of the iteration
+                if not self.skipFirstSelfPlay or i > self.startIteration:
+                    iterationTrainExamples = deque([], maxlen=self.args.maxlenOfQueue)
+                    self.selfPlaySims = self.selfPlayMoves = self.selfPlayPositions = 0
+
+                    if getattr(self.args, 'numSelfPlayWorkers', 1) > 1:
+                        for episodeExamples in tqdm(self.executeEpisodesParallel(self.args.numEps),
+                                                    total=self.args.numEps, desc="Self Play"):
+                            iterationTrainExamples += episodeExamples
+                    else:
+                        for _ in tqdm(range(self.args.numEps), desc="Self Play"):
+                            self.mcts = MCTS(self.game, self.nnet, self.args)  # reset search tree
+                            iterationTrainExamples += self.executeEpisode()
+
+                    log.info(f'Self-play: {self.selfPlaySims} MCTS sims, {self.selfPlayMoves} moves, '
+                             f'{self.selfPlayPositions} training positions; '
+                             f'{self.selfPlaySims / max(self.selfPlayMoves, 1):.1f} sims per move, '
+                             f'{self.selfPlaySims / max(self.selfPlayPositions, 1):.1f} sims per training position')
+
+                    # append the iteration examples to the history, evicting the oldest iteration if needed
+                    self.replayBuffer.addChunk(iterationTrainExamples)
+                    self.examplesAdded += len(iterationTrainExamples)
+
+                # backup the new examples to the replay folder
+                self.saveTrainExamples()
+                trainExamples = self.trainingExamples()
 
+                # training new network, keeping a copy of the old one (in memory if it can take snapshots)
+                if self.pnet is None:
+                    self.pnet = self.nnet.__class__(self.game)
+                snapshot = self.nnet.snapshot()
+                if snapshot is None:
+                    self.nnet.save_checkpoint(folder=self.args.checkpoint, filename='temp.pth.tar')
+                    self.pnet.load_checkpoint(folder=self.args.checkpoint, filename='temp.pth.tar')
+                else:
+                    self.pnet.restore(snapshot)
+
+                self.nnet.train(trainExamples)
+
+                log.info('PITTING AGAINST PREVIOUS VERSION')
+                pplayer = MCTSPlayer(self.game, self.pnet, self.args)
+                nplayer = MCTSPlayer(self.game, self.nnet, self.args)
+                arena = Arena(pplayer, nplayer, self.game)
+                sprt = newSPRT(self.args)
+                workers = getattr(self.args, 'numArenaWorkers', 1)
+                if workers > 1:
+                    # the workers load both networks from their checkpoints
+                    if snapshot is not None:
+                        self.pnet.save_checkpoint(folder=self.args.checkpoint, filename='temp.pth.tar')
+                    self.nnet.save_checkpoint(folder=self.args.checkpoint, filename='arena.pth.tar')
+                    factories = (
+                        MCTSPlayerFactory(self.game, self.pnet.__class__, self.args.checkpoint, 'temp.pth.tar',
+                                          self.args),
+                        MCTSPlayerFactory(self.game, self.nnet.__class__, self.args.checkpoint, 'arena.pth.tar',
+                                          self.args),
+                    )
+                    pwins, nwins, draws = arena.playGames(self.args.arenaCompare, numWorkers=workers,
+                                                          playerFactories=factories, sprt=sprt)
+                elif getattr(self.args, 'arenaLockStepGames', 1) > 1:
+                    arena = BatchedArena(self.pnet, self.nnet, self.game, self.args,
+                                         numGames=self.args.arenaLockStepGames)
+                    pwins, nwins, draws = arena.playGames(self.args.arenaCompare, sprt=sprt)
+                else:
+                    pwins, nwins, draws = arena.playGames(self.args.arenaCompare, sprt=sprt)
+                    log.info(f'Arena MCTS trees (prev / new): {pplayer.mcts.treeStats()} / {nplayer.mcts.treeStats()}')
+                    if getattr(self.args, 'earlyStop', False):
+                        (psearches, psaved), (nsearches, nsaved) = pplayer.searchStats(), nplayer.searchStats()
+                        saved, searches = psaved + nsaved, psearches + nsearches
+                        log.info(f'Arena early stop saved {saved / max(searches, 1):.1f} of {self.args.numMCTSSims} '
+                                 f'MCTS sims per move')
+
+                if not acceptNewModel(self.args, sprt, pwins, nwins, draws):
+                    log.info('REJECTING NEW MODEL')
+                    if snapshot is None:
+                        self.nnet.load_checkpoint(folder=self.args.checkpoint, filename='temp.pth.tar')
+                    else:
+                        self.nnet.restore(snapshot)
+                else:
+                    log.info('ACCEPTING NEW MODEL')
+                    self.modelsAccepted += 1
+                    self.saveCheckpoint(self.getCheckpointFile(i))
+                    self.saveCheckpoint('best.pth.tar')
+                if getattr(self.args, 'saveTrainingState', False):
+                    self.saveTrainingState(i)
+                self.logThroughput()
+        finally:
+            if self.checkpointWriter is not None:
+                self.checkpointWriter.wait()
+
+    def learnAsync(self):
+        """
+        Runs self-play, training and evaluation at the same time instead of
+        one after the other:
+        - args.numSelfPlayWorkers actor processes keep playing episodes with
+          the latest accepted network (best.pth.tar), see selfPlayActor;
+        - this process trains self.nnet on the replay buffer every time the
+          actors finished args.numEps more episodes, numIters times;
+        - an evaluator process pits the trained network against the best one
+          in the background, see evaluateCandidates. A new candidate is only
+          handed over once the previous one was decided.
+
+        Unlike learn, a rejected network is not rolled back: training carries
+        on from its weights (as in AlphaGo Zero's pipeline), only the actors
+        keep playing with the best network.
+        """
+        # see executeEpisodesParallel
+        os.environ.setdefault('OMP_NUM_THREADS', '1')
+        context = multiprocessing.get_context('spawn')
+        if not os.path.exists(self.args.checkpoint):
+            os.makedirs(self.args.checkpoint)
+        # after a resume, best.pth.tar is the last network the evaluator
+        # accepted, not the one we go on training
+        if self.startIteration == 1 or not os.path.isfile(os.path.join(self.args.checkpoint, 'best.pth.tar')):
+            self.nnet.save_checkpoint(folder=self.args.checkpoint, filename='best.pth.tar')
+
+        modelVersion = context.Value('i', 0)
+        stop = context.Event()
+        results, candidates, verdicts = context.Queue(), context.Queue(), context.Queue()
+        nnetClass = self.nnet.__class__
+        actors = [context.Process(target=selfPlayActor, daemon=True,
+                                  args=(self.game, nnetClass, self.args, modelVersion, results, stop, seed))
+                  for seed in np.random.randint(2 ** 31, size=getattr(self.args, 'numSelfPlayWorkers', 1))]
+        evaluator = context.Process(target=evaluateCandidates, daemon=True,
+                                    args=(self.game, nnetClass, self.args, modelVersion, candidates, verdicts))
+        for process in actors + [evaluator]:
+            process.start()
+
+        self.learnStart = time.time()
+        evaluating = False
+        try:
+            for i in range(self.startIteration, self.args.numIters + 1):
+                log.info(f'Starting Iter #{i} ...')
+                iterationTrainExamples = deque([], maxlen=self.args.maxlenOfQueue)
+                self.selfPlaySims = self.selfPlayMoves = self.selfPlayPositions = 0
                 for _ in tqdm(range(self.args.numEps), desc="Self Play"):
-                    self.mcts = MCTS(self.game, self.nnet, self.args)  # reset search tree
-                    iterationTrainExamples += self.executeEpisode()
-
-                # save the iteration examples to the history 
-                self.trainExamplesHistory.append(iterationTrainExamples)
-
-            if len(self.trainExamplesHistory) > self.args.numItersForTrainExamplesHistory:
-                log.warning(
-                    f"Removing the oldest entry in trainExamples. len(trainExamplesHistory) = {len(self.trainExamplesHistory)}")
-                self.trainExamplesHistory.pop(0)
-            # backup history to a file
-            # NB! the examples were collected using the model from the previous iteration, so (i-1)  
-            self.saveTrainExamples(i - 1)
-
-            # shuffle examples before training
-            trainExamples = []
-            for e in self.trainExamplesHistory:
-                trainExamples.extend(e)
-            shuffle(trainExamples)
-
-            # training new network, keeping a copy of the old one
-            self.nnet.save_checkpoint(folder=self.args.checkpoint, filename='temp.pth.tar')
-            self.pnet.load_checkpoint(folder=self.args.checkpoint, filename='temp.pth.tar')
-            pmcts = MCTS(self.game, self.pnet, self.args)
+                    trainExamples, sims, moves, positions = self.actorResult(results, actors)
+                    iterationTrainExamples += trainExamples
+                    self.selfPlaySims += sims
+                    self.selfPlayMoves += moves
+                    self.selfPlayPositions += positions
+                log.info(f'Self-play: {self.selfPlaySims} MCTS sims, {self.selfPlayMoves} moves, '
+                         f'{self.selfPlayPositions} training positions')
 
-            self.nnet.train(trainExamples)
-            nmcts = MCTS(self.game, self.nnet, self.args)
+                self.replayBuffer.addChunk(iterationTrainExamples)
+                self.examplesAdded += len(iterationTrainExamples)
+                self.saveTrainExamples()
+                self.nnet.train(self.trainingExamples())
 
-            log.info('PITTING AGAINST PREVIOUS VERSION')
-            arena = Arena(lambda x: np.argmax(pmcts.getActionProb(x, temp=0)),
-                          lambda x: np.argmax(nmcts.getActionProb(x, temp=0)), self.game)
-            pwins, nwins, draws = arena.playGames(self.args.arenaCompare)
+                evaluating = self.collectVerdicts(verdicts, evaluating)
+                if not evaluating:
+                    filename = f'candidate_{i}.pth.tar'
+                    self.nnet.save_checkpoint(folder=self.args.checkpoint, filename=filename)
+                    candidates.put((i, filename))
+                    evaluating = True
+                if getattr(self.args, 'saveTrainingState', False):
+                    self.saveTrainingState(i)
+                self.logThroughput()
+        finally:
+            # let the evaluator decide on the last candidate, and the actors
+            # finish their episodes (their results have to be read for them
+            # to exit)
+            candidates.put(None)
+            stop.set()
+            running = len(actors)
+            while running:
+                try:
+                    if self.actorResult(results, actors) is None:
+                        running -= 1
+                except RuntimeError:
+                    break
+            for process in actors:
+                process.join()
+            evaluator.join()
+            self.collectVerdicts(verdicts, evaluating)
+            self.logThroughput()
 
-            log.info('NEW/PREV WINS : %d / %d ; DRAWS : %d' % (nwins, pwins, draws))
-            if pwins + nwins == 0 or float(nwins) / (pwins + nwins) < self.args.updateThreshold:
-                log.info('REJECTING NEW MODEL')
-                self.nnet.load_checkpoint(folder=self.args.checkpoint, filename='temp.pth.tar')
-            else:
-                log.info('ACCEPTING NEW MODEL')
-                self.nnet.save_checkpoint(folder=self.args.checkpoint, filename=self.getCheckpointFile(i))
-                self.nnet.save_checkpoint(folder=self.args.checkpoint, filename='best.pth.tar')
+    def actorResult(self, results, actors):
+        """
+        Returns the next result the self-play actors put on the results
+        queue, or raises a RuntimeError if they all exited without one.
+        """
+        while True:
+            try:
+                return results.get(timeout=1)
+            except queue.Empty:
+                if not any(actor.is_alive() for actor in actors):
+                    raise RuntimeError('The self-play actors exited')
+
+    def collectVerdicts(self, verdicts, evaluating):
+        """
+        Logs the verdicts of the evaluator that came in.
+
+        Returns:
+            evaluating: whether a candidate is still being evaluated
+        """
+        while True:
+            try:
+                iteration, accept, pwins, nwins, draws = verdicts.get_nowait()
+            except queue.Empty:
+                return evaluating
+            log.info(f'Candidate of iteration {iteration}: NEW/PREV WINS : {nwins} / {pwins} ; DRAWS : {draws}, '
+                     f'{"ACCEPTED" if accept else "REJECTED"}')
+            self.modelsAccepted += accept
+            evaluating = False
+
+    def trainingExamples(self):
+        """
+        Returns what NNet.train gets: the replay buffer itself when it has to
+        sample the minibatches (to read them from the memory-mapped files
+        and/or apply the random symmetries), else all its examples, shuffled.
+        """
+        if isinstance(self.replayBuffer, ExampleStore) or self.replayBuffer.game is not None:
+            return self.replayBuffer
+        trainExamples = self.replayBuffer.examples()
+        shuffle(trainExamples)
+        return trainExamples
+
+    def throughput(self):
+        """
+        Returns:
+            examplesPerHour: examples added to the replay buffer per hour of learn
+            acceptedPerHour: networks accepted per hour of learn
+        """
+        hours = max(time.time() - self.learnStart, 1e-9) / 3600
+        return self.examplesAdded / hours, self.modelsAccepted / hours
+
+    def logThroughput(self):
+        examplesPerHour, acceptedPerHour = self.throughput()
+        log.info(f'Throughput: {examplesPerHour:.0f} examples/hour, {acceptedPerHour:.2f} accepted models/hour')
+
+    def saveCheckpoint(self, filename):
+        """
+        Saves self.nnet in args.checkpoint, on a background thread with
+        args.asyncCheckpoints (see CheckpointWriter).
+        """
+        if not getattr(self.args, 'asyncCheckpoints', False):
+            self.nnet.save_checkpoint(folder=self.args.checkpoint, filename=filename)
+            return
+        if self.checkpointWriter is None:
+            self.checkpointWriter = CheckpointWriter(self.game, self.nnet.__class__)
+        self.checkpointWriter.save(self.nnet, self.args.checkpoint, filename)
 
     def getCheckpointFile(self, iteration):
         return 'checkpoint_' + str(iteration) + '.pth.tar'
 
-    def saveTrainExamples(self, iteration):
-        folder = self.args.checkpoint
-        if not os.path.exists(folder):
-            os.makedirs(folder)
-        filename = os.path.join(folder, self.getCheckpointFile(iteration) + ".examples")
-        with open(filename, "wb+") as f:
-            Pickler(f).dump(self.trainExamplesHistory)
-        f.closed
+    def getReplayFolder(self, folder):
+        return os.path.join(folder, 'replay')
+
+    def saveTrainExamples(self):
+        """
+        Saves the replay buffer to the replay folder in args.checkpoint. Only
+        the iterations that are not in there yet are written.
+        """
+        self.replayBuffer.save(self.getReplayFolder(self.args.checkpoint))
 
     def loadTrainExamples(self):
+        """
+        Loads the replay buffer saved in the folder of args.load_folder_file,
+        or else the pickled history of examples that older versions saved next
+        to the model.
+        """
+        replayFolder = self.getReplayFolder(self.args.load_folder_file[0])
         modelFile = os.path.join(self.args.load_folder_file[0], self.args.load_folder_file[1])
         examplesFile = modelFile + ".examples"
-        if not os.path.isfile(examplesFile):
-            log.warning(f'File "{examplesFile}" with trainExamples not found!')
-            r = input("Continue? [y|n]")
-            if r != "y":
-                sys.exit()
-        else:
+        if ReplayBuffer.exists(replayFolder):
+            log.info("Replay buffer found. Loading it...")
+            self.replayBuffer.load(replayFolder)
+        elif os.path.isfile(examplesFile):
             log.info("File with trainExamples found. Loading it...")
             with open(examplesFile, "rb") as f:
-                self.trainExamplesHistory = Unpickler(f).load()
-            log.info('Loading done!')
+                for iterationTrainExamples in Unpickler(f).load():
+                    self.replayBuffer.addChunk(iterationTrainExamples)
+        else:
+            log.warning(f'Neither the replay buffer "{replayFolder}" nor the file "{examplesFile}" '
+                        f'with trainExamples found, starting without examples')
+            return
+        log.info(f'Loading done! {len(self.replayBuffer)} examples')
 
-            # examples based on the model were already collected (loaded)
-            self.skipFirstSelfPlay = True
+        # examples based on the model were already collected (loaded)
+        self.skipFirstSelfPlay = True
+
+    def getStateFolder(self, folder):
+        return os.path.join(folder, 'state')
+
+    def saveTrainingState(self, iteration):
+        """
+        Saves what learn needs to resume after iteration to the state folder
+        in args.checkpoint: the network with the states of its optimizer and
+        RNG (see NeuralNet.save_training_state), the chunks of the replay
+        buffer and the states of the random generators, all listed in
+        state.json.
+
+        The network goes to a new file and state.json is then replaced
+        atomically, so the folder holds a complete state whenever we are
+        interrupted. The replay chunks are not copied: they are already in the
+        replay folder (see saveTrainExamples).
+        """
+        folder = self.getStateFolder(self.args.checkpoint)
+        if not os.path.exists(folder):
+            os.makedirs(folder)
+        modelFile = f'model_{iteration}.pth.tar'
+        self.nnet.save_training_state(folder=folder, filename=modelFile)
+        numpyState = np.random.get_state()
+        randomState = random.getstate()
+        state = {
+            'iteration': iteration,
+            'model': modelFile,
+            'replay': [{'id': chunkId, 'length': length} for chunkId, _, length in self.replayBuffer.chunks],
+            'numpyRandom': [numpyState[0], numpyState[1].tolist()] + list(numpyState[2:]),
+            'random': [randomState[0], list(randomState[1]), randomState[2]],
+        }
+        tmp = os.path.join(folder, 'state.json.tmp')
+        with open(tmp, 'w') as f:
+            json.dump(state, f)
+        os.replace(tmp, os.path.join(folder, 'state.json'))
+
+        # the networks of the previous states (whatever extension the network gave them)
+        for filename in os.listdir(folder):
+            if filename.startswith('model_') and not filename.startswith(f'model_{iteration}.'):
+                os.remove(os.path.join(folder, filename))
+
+    def loadTrainingState(self, folder):
+        """
+        Resumes from the state saveTrainingState left in folder, if there is
+        one: loads the network, the replay chunks listed in the state and the
+        states of the random generators, and makes learn go on with the next
+        iteration.
+
+        Returns:
+            resumed: whether a state was found
+        """
+        stateFolder = self.getStateFolder(folder)
+        stateFile = os.path.join(stateFolder, 'state.json')
+        if not os.path.isfile(stateFile):
+            return False
+        with open(stateFile) as f:
+            state = json.load(f)
+        self.nnet.load_training_state(folder=stateFolder, filename=state['model'])
+        if state['replay']:
+            self.replayBuffer.load(self.getReplayFolder(folder), chunks=state['replay'])
+        numpyState = state['numpyRandom']
+        np.random.set_state((numpyState[0], np.array(numpyState[1], dtype=np.uint32)) + tuple(numpyState[2:]))
+        randomState = state['random']
+        random.setstate((randomState[0], tuple(randomState[1]), randomState[2]))
+        self.startIteration = state['iteration'] + 1
+        log.info(f'Resuming after iteration {state["iteration"]} with {len(self.replayBuffer)} examples')
+        return True
@@ -1,3 +1,6 @@
+import numpy as np
+
+
 class Game():
     """
     This class specifies the base Game class. To define your own game, subclass
@@ -101,6 +104,46 @@ class Game():
         """
         pass
 
+    def applySymmetryBatch(self, boards, pis, ids):
+        """
+        Optional, games get it for free when getSymmetries only moves the
+        entries of the board and pi around (see getSymmetryPermutations).
+
+        Input:
+            boards: array of boards, of shape (batch size,) + board shape
+            pis: array of policy vectors, of shape (batch size, action size)
+            ids: array with the index of the symmetry to apply to each
+                 example, as in the list returned by getSymmetries
+
+        Returns:
+            boards, pis: the transformed boards and pis, as new arrays. Used to
+                         augment training examples when they are sampled
+                         instead of storing all their symmetrical forms.
+        """
+        boardPerms, piPerms = self.getSymmetryPermutations()
+        rows = np.arange(len(ids))[:, None]
+        flat = boards.reshape(len(boards), -1)
+        return flat[rows, boardPerms[ids]].reshape(boards.shape), pis[rows, piPerms[ids]]
+
+    def getSymmetryPermutations(self):
+        """
+        Returns:
+            boardPerms: array of shape (number of symmetries, board cells),
+                        row k gives for every cell of the k-th symmetrical form
+                        of a board the (flat) index of the cell it comes from
+            piPerms: the same for the policy vectors
+
+        They are worked out once, by passing getSymmetries a board and a pi
+        that hold their own indices.
+        """
+        if getattr(self, 'symmetryPermutations', None) is None:
+            shape = np.shape(self.getInitBoard())
+            board = np.arange(np.prod(shape)).reshape(shape)
+            symmetries = self.getSymmetries(board, np.arange(self.getActionSize()))
+            self.symmetryPermutations = (np.array([np.ravel(b) for b, _ in symmetries]),
+                                         np.array([np.ravel(p) for _, p in symmetries]))
+        return self.symmetryPermutations
+
     def stringRepresentation(self, board):
         """
         Input:
@@ -111,3 +154,32 @@ class Game():
                          Required by MCTS for hashing.
         """
         pass
+
+    def getHash(self, board):
+        """
+        Optional, games that do not implement it return None.
+
+        Input:
+            board: current board, in canonical form
+
+        Returns:
+            boardHash: a Zobrist hash of the board, as an int. Used by MCTS to
+                       identify nodes when args.zobristHash is set.
+        """
+        return None
+
+    def getNextHash(self, boardHash, board, action):
+        """
+        Optional, required when getHash is implemented.
+
+        Input:
+            boardHash: getHash(board)
+            board: current board, in canonical form
+            action: action taken by player 1
+
+        Returns:
+            nextHash: getHash of the canonical form of the board reached by
+                      getNextState(board, 1, action), computed incrementally
+                      from boardHash
+        """
+        return None
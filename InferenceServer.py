@@ -0,0 +1,176 @@
+import logging
+import multiprocessing
+import queue
+import threading
+import time
+from collections import Counter
+
+import numpy as np
+
+from NeuralNet import NeuralNet
+
+log = logging.getLogger(__name__)
+
+# upper edges (in milliseconds) of the queue latency histogram buckets
+LATENCY_BUCKETS_MS = [0.1, 0.5, 1, 2, 5, 10, 20, 50, 100, 500]
+
+
+class InferenceClient(NeuralNet):
+    """
+    A NeuralNet that forwards predict calls to an InferenceServer, which may
+    be running in another process. Clients are picklable, so they can be
+    handed to worker processes (e.g. as Pool initargs). Only predict and
+    predict_batch are supported; the network itself is owned by the server.
+    """
+
+    def __init__(self, clientId, requests, responses):
+        self.clientId = clientId
+        self.requests = requests  # queue shared by all clients of the server
+        self.responses = responses  # queue on which this client gets its results
+
+    def predict(self, board):
+        pis, vs = self.predict_batch([board])
+        return pis[0], vs[0]
+
+    def predict_batch(self, boards):
+        self.requests.put((self.clientId, time.time(), boards))
+        result = self.responses.get()
+        if isinstance(result, Exception):
+            # the server failed to evaluate the batch these boards were in
+            raise result
+        return result
+
+
+class InferenceServer():
+    """
+    Evaluates the boards sent by many InferenceClients (typically one per
+    self-play process, each with its own MCTS) with a single network, in
+    dynamically sized batches: a batch is evaluated once it holds
+    maxBatchSize boards, or maxWaitTime seconds after its first request
+    arrived, whichever comes first.
+
+    The server runs on a thread of the process that owns the network, see
+    start and stop. It records how full the batches are and how long requests
+    waited in the queue, see stats and logStats. If the network raises, the
+    clients waiting for that batch raise a RuntimeError instead of waiting
+    forever, and the server carries on with the next batch.
+    """
+
+    def __init__(self, nnet, numClients, maxBatchSize=16, maxWaitTime=0.005, context=multiprocessing):
+        """
+        Input:
+            nnet: the NeuralNet that evaluates the boards, it needs predict_batch
+            numClients: number of clients to create, see self.clients
+            maxBatchSize: maximum number of boards evaluated at once
+            maxWaitTime: maximum time (in seconds) a batch waits to fill up
+            context: multiprocessing context the queues are created with, it
+                     has to match the one the client processes are started with
+        """
+        self.nnet = nnet
+        self.maxBatchSize = maxBatchSize
+        self.maxWaitTime = maxWaitTime
+        self.requests = context.Queue()
+        self.clients = [InferenceClient(i, self.requests, context.Queue()) for i in range(numClients)]
+        self.thread = None
+
+        self.batchSizes = Counter()  # batch size -> #batches of that size
+        self.queueLatencies = Counter()  # latency bucket -> #boards that waited that long
+
+    def start(self):
+        self.thread = threading.Thread(target=self.serve, daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.requests.put(None)
+        self.thread.join()
+        self.thread = None
+
+    def serve(self):
+        """
+        Collects and evaluates batches until a None request is received.
+        """
+        stopping = False
+        pending = None  # request that did not fit in the previous batch
+        while not stopping:
+            request = pending if pending is not None else self.requests.get()
+            pending = None
+            if request is None:
+                break
+            batch = [request]
+            size = len(request[2])
+            deadline = time.time() + self.maxWaitTime
+            while size < self.maxBatchSize:
+                timeout = deadline - time.time()
+                if timeout <= 0:
+                    break
+                try:
+                    request = self.requests.get(timeout=timeout)
+                except queue.Empty:
+                    break
+                if request is None:
+                    stopping = True
+                    break
+                if size + len(request[2]) > self.maxBatchSize:
+                    pending = request
+                    break
+                batch.append(request)
+                size += len(request[2])
+            self.evaluate(batch)
+
+    def evaluate(self, batch):
+        """
+        Evaluates the boards of a batch of requests with one predict_batch call
+        (or several, for a single request of more than maxBatchSize boards)
+        and sends every client its share of the results.
+        """
+        start = time.time()
+        boards = [board for _, _, requestBoards in batch for board in requestBoards]
+        try:
+            results = [self.nnet.predict_batch(boards[i:i + self.maxBatchSize])
+                       for i in range(0, len(boards), self.maxBatchSize)]
+        except Exception as e:
+            log.exception(f'Evaluating a batch of {len(boards)} boards failed')
+            error = RuntimeError(f'The inference server failed to evaluate the boards: {e!r}')
+            for clientId, _, _ in batch:
+                self.clients[clientId].responses.put(error)
+            return
+        if len(results) == 1:
+            pis, vs = results[0]
+        else:
+            pis = np.concatenate([pi for pi, _ in results])
+            vs = np.concatenate([v for _, v in results])
+
+        for i in range(0, len(boards), self.maxBatchSize):
+            self.batchSizes[len(boards[i:i + self.maxBatchSize])] += 1
+        i = 0
+        for clientId, sent, requestBoards in batch:
+            bucket = int(np.searchsorted(LATENCY_BUCKETS_MS, (start - sent) * 1000))
+            self.queueLatencies[bucket] += len(requestBoards)
+            self.clients[clientId].responses.put((pis[i:i + len(requestBoards)], vs[i:i + len(requestBoards)]))
+            i += len(requestBoards)
+
+    def stats(self):
+        """
+        Returns:
+            batches: number of batches evaluated
+            meanFill: average batch size as a fraction of maxBatchSize
+            batchSizes: histogram of the batch sizes, as a dict size -> count
+            queueLatencies: histogram of the time boards waited before their
+                            batch was evaluated, as a dict bucket label -> count
+        """
+        batches = sum(self.batchSizes.values())
+        boards = sum(size * count for size, count in self.batchSizes.items())
+        labels = [f'<{edge}ms' for edge in LATENCY_BUCKETS_MS] + [f'>={LATENCY_BUCKETS_MS[-1]}ms']
+        return {
+            'batches': batches,
+            'meanFill': boards / (batches * self.maxBatchSize) if batches else 0.,
+            'batchSizes': dict(sorted(self.batchSizes.items())),
+            'queueLatencies': {labels[b]: c for b, c in sorted(self.queueLatencies.items())},
+        }
+
+    def logStats(self):
+        stats = self.stats()
+        log.info(f'Inference server: {stats["batches"]} batches, '
+                 f'{stats["meanFill"]:.1%} mean fill of {self.maxBatchSize}')
+        log.info(f'Batch sizes: {stats["batchSizes"]}')
+        log.info(f'Queue latencies: {stats["queueLatencies"]}')
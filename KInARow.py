@@ -0,0 +1,68 @@
+import itertools
+
+import numpy as np
+
+
+class KInARow():
+    """
+    Finds k pieces of the same colour in a row on boards of any number of
+    dimensions whose cells are 0 (empty), +1 or -1: along the axes and along
+    every diagonal, like the rows of TicTacToe, Connect4 and Gobang.
+
+    All the rows of k cells a board of the given shape holds are listed once
+    in lines, as the indices of their cells in the flattened board, so that
+    checking a board (or a whole batch of boards) is one gather and one sum.
+    """
+
+    detectors = {}  # (shape, k) -> KInARow, see get
+
+    def __init__(self, shape, k):
+        self.shape = tuple(shape)
+        self.k = k
+        self.lines = self.makeLines(self.shape, k)  # (number of rows, k) flat cell indices
+
+    @staticmethod
+    def get(shape, k):
+        """
+        Returns the KInARow of boards of the given shape, made on first use.
+        """
+        key = (tuple(shape), k)
+        if key not in KInARow.detectors:
+            KInARow.detectors[key] = KInARow(*key)
+        return KInARow.detectors[key]
+
+    @staticmethod
+    def makeLines(shape, k):
+        dims = len(shape)
+        cells = np.indices(shape).reshape(dims, -1).T
+        steps = np.arange(k)[:, None]
+        lines = []
+        for direction in itertools.product((-1, 0, 1), repeat=dims):
+            # one direction of each pair of opposite ones
+            if not any(direction) or direction[np.flatnonzero(direction)[0]] < 0:
+                continue
+            ends = cells + (k - 1) * np.array(direction)
+            starts = cells[np.all((ends >= 0) & (ends < shape), axis=1)]
+            rows = starts[:, None, :] + steps * direction  # (rows, k, dims)
+            lines.append(np.ravel_multi_index(tuple(np.moveaxis(rows, -1, 0)), shape))
+        return np.concatenate(lines)
+
+    def winner(self, boards):
+        """
+        Returns the colour (1 or -1) that has k pieces in a row on boards, or 0
+        if neither does; 1 if both do. boards is one board of the detector's
+        shape, or an array of them, in which case an array of their winners
+        is returned.
+        """
+        boards = np.asarray(boards)
+        batch = boards.shape[:boards.ndim - len(self.shape)]
+        # a row sums to k (-k) when all its cells hold 1 (-1)
+        if not batch:
+            sums = boards.ravel()[self.lines].sum(axis=1)
+            if sums.max() == self.k:
+                return 1
+            return -1 if sums.min() == -self.k else 0
+        sums = boards.reshape(batch + (-1,))[..., self.lines].sum(axis=-1)
+        wins = (sums == self.k).any(axis=-1)
+        losses = (sums == -self.k).any(axis=-1)
+        return np.where(wins, 1, np.where(losses, -1, 0))
@@ -1,44 +1,159 @@
 import logging
 import math
+import sys
 
 import numpy as np
 
 EPS = 1e-8
+EVICT_FRACTION = 0.1  # fraction of the node budget evicted at once when the tree is full
+DICT_ENTRY_BYTES = 50  # rough cost of one entry in one of the dicts of the tree
 
 log = logging.getLogger(__name__)
 
 
+def puct_select(Q, N, P, valids, Ns, cpuct):
+    """
+    Picks the action with the highest upper confidence bound
+        U = Q + cpuct * P * sqrt(Ns) / (1 + N)
+    among the valid actions of a node, in one vectorized pass over the action
+    dimension. Unvisited edges have Q = 0, and EPS keeps the priors
+    meaningful while Ns is still 0.
+
+    Input:
+        Q, N, P: arrays with the Q value, visit count and prior of each action
+        valids: binary mask of the valid actions
+        Ns: #times the node itself was visited
+        cpuct: exploration constant
+
+    Returns:
+        a: index of the selected action
+    """
+    u = Q + cpuct * P * math.sqrt(Ns + EPS) / (1 + N)
+    return int(np.argmax(np.where(valids, u, -np.inf)))
+
+
 class MCTS():
     """
     This class handles the MCTS tree.
+
+    Nodes are keyed on game.stringRepresentation(board), or with
+    args.zobristHash on the incremental game.getHash / game.getNextHash, see
+    boardKey and childKey.
     """
 
     def __init__(self, game, nnet, args):
+        if getattr(args, 'zobristHash', False) and game.getHash(game.getInitBoard()) is None:
+            raise ValueError(f"{type(game).__name__} does not implement getHash")
         self.game = game
         self.nnet = nnet
         self.args = args
-        self.Qsa = {}  # stores Q values for s,a (as defined in the paper)
-        self.Nsa = {}  # stores #times edge s,a was visited
+        self.Qsa = {}  # stores Q values of all actions a of board s (as defined in the paper)
+        self.Nsa = {}  # stores #times each edge s,a of board s was visited
         self.Ns = {}  # stores #times board s was visited
         self.Ps = {}  # stores initial policy (returned by neural net)
 
         self.Es = {}  # stores game.getGameEnded ended for board s
         self.Vs = {}  # stores game.getValidMoves for board s
+        self.Cs = {}  # stores the child board reached by each action taken from board s
+        self.Ls = {}  # stores the simulation that last visited board s
+        self.Bs = {}  # stores board s itself, for the boards reached through Cs
 
-    def getActionProb(self, canonicalBoard, temp=1):
+        self.root = None  # board s the last getActionProb call searched from
+        self.sims = 0  # number of simulations run so far
+        self.evictions = 0  # number of expanded nodes evicted so far
+        self.nodeBytes = 0  # estimated memory taken by one expanded node
+        self.collisions = 0  # number of boards whose Zobrist hash collided with another board
+        self.searches = 0  # number of getActionProb calls so far
+        self.simsSaved = 0  # simulations skipped by stopping searches early so far
+
+    def getActionProb(self, canonicalBoard, temp=1, numSims=None, rootNoise=False):
         """
-        This function performs numMCTSSims simulations of MCTS starting from
-        canonicalBoard.
+        This function performs numSims (by default args.numMCTSSims)
+        simulations of MCTS starting from canonicalBoard. If
+        args.mctsBatchSize > 1, the simulations are run in batches of that size
+        by searchBatch.
+
+        With rootNoise and args.dirichletEpsilon > 0, the prior of the root is
+        mixed with Dirichlet(args.dirichletAlpha) noise for the duration of
+        this search, see noisyPrior.
+
+        With args.reuseTree, the tree is first pruned to the subtree of
+        canonicalBoard (see setRoot), so the statistics gathered for it by
+        earlier searches are kept and everything else is dropped.
+
+        With args.maxTreeNodes or args.maxTreeBytes, nodes are evicted between
+        simulations whenever the tree grows over that budget, see evict.
+
+        With args.earlyStop and temp=0, the search stops as soon as the most
+        visited action cannot be caught up with by the simulations left (see
+        leaderIsSafe), so it still returns the action the full search would
+        have. The skipped simulations are counted in self.simsSaved.
 
         Returns:
             probs: a policy vector where the probability of the ith action is
-                   proportional to Nsa[(s,a)]**(1./temp)
+                   proportional to Nsa[s][a]**(1./temp)
+        """
+        s = self.setRootBoard(canonicalBoard)
+        if numSims is None:
+            numSims = self.args.numMCTSSims
+
+        sims = 0
+        noise = rootNoise and getattr(self.args, 'dirichletEpsilon', 0) > 0
+        if noise:
+            if s not in self.Ps:
+                # the root has to be expanded before its prior can be perturbed
+                self.search(canonicalBoard, s)
+                sims += 1
+            prior = self.Ps[s]
+            self.Ps[s] = self.noisyPrior(s)
+
+        earlyStop = temp == 0 and getattr(self.args, 'earlyStop', False)
+        batchSize = getattr(self.args, 'mctsBatchSize', 1)
+        if batchSize > 1:
+            while sims < numSims and not (earlyStop and self.leaderIsSafe(s, numSims - sims)):
+                if s not in self.Ps:
+                    # paths can only spread out once the root is expanded
+                    self.search(canonicalBoard, s)
+                    sims += 1
+                else:
+                    k = min(batchSize, numSims - sims)
+                    self.searchBatch(canonicalBoard, k, s)
+                    sims += k
+                self.evict()
+        else:
+            while sims < numSims and not (earlyStop and self.leaderIsSafe(s, numSims - sims)):
+                self.search(canonicalBoard, s)
+                sims += 1
+                self.evict()
+        self.searches += 1
+        self.simsSaved += numSims - sims
+
+        if noise:
+            self.Ps[s] = prior
+
+        return self.visitProbs(s, temp)
+
+    def setRootBoard(self, canonicalBoard):
+        """
+        Makes canonicalBoard the root of the next search. With args.reuseTree,
+        the tree is pruned to its subtree, see setRoot.
+
+        Returns:
+            s: the key of canonicalBoard
         """
-        for i in range(self.args.numMCTSSims):
-            self.search(canonicalBoard)
+        s = self.boardKey(canonicalBoard)
+        if getattr(self.args, 'reuseTree', False):
+            self.setRoot(s)
+        self.root = s
+        return s
 
-        s = self.game.stringRepresentation(canonicalBoard)
-        counts = [self.Nsa[(s, a)] if (s, a) in self.Nsa else 0 for a in range(self.game.getActionSize())]
+    def visitProbs(self, s, temp=1):
+        """
+        Returns:
+            probs: a policy vector where the probability of the ith action is
+                   proportional to Nsa[s][a]**(1./temp)
+        """
+        counts = self.visitCounts(s)
 
         if temp == 0:
             bestAs = np.array(np.argwhere(counts == np.max(counts))).flatten()
@@ -52,7 +167,194 @@ class MCTS():
         probs = [x / counts_sum for x in counts]
         return probs
 
-    def search(self, canonicalBoard):
+    def leaderIsSafe(self, s, simsLeft):
+        """
+        Returns True if the most visited action of board s has more visits than
+        any other action could reach with simsLeft more simulations, each of
+        which adds one visit to one action.
+        """
+        if simsLeft >= self.Ns.get(s, 0):
+            # the gap between the two most visited actions is at most Ns[s]
+            return False
+        second, first = np.partition(self.Nsa[s], -2)[-2:]
+        return first - second > simsLeft
+
+    def noisyPrior(self, s):
+        """
+        Returns:
+            ps: the prior of the expanded board s mixed with Dirichlet noise
+                over its valid moves, as in AlphaZero:
+                (1 - eps) * Ps[s] + eps * Dirichlet(alpha), with eps and alpha
+                given by args.dirichletEpsilon and args.dirichletAlpha
+        """
+        eps = self.args.dirichletEpsilon
+        valids = np.flatnonzero(self.Vs[s])
+        noise = np.zeros(len(self.Ps[s]))
+        noise[valids] = np.random.dirichlet([getattr(self.args, 'dirichletAlpha', 0.3)] * len(valids))
+        return (1 - eps) * self.Ps[s] + eps * noise
+
+    def visitCounts(self, s):
+        """
+        Returns:
+            counts: a list with the number of times each action was taken from
+                    board s, 0 for actions that were never taken
+        """
+        if s not in self.Nsa:
+            return [0] * self.game.getActionSize()
+        return self.Nsa[s].tolist()
+
+    def boardKey(self, canonicalBoard):
+        """
+        Returns:
+            s: the key of canonicalBoard in the tree
+        """
+        if not getattr(self.args, 'zobristHash', False):
+            return self.game.stringRepresentation(canonicalBoard)
+        return self.verifiedKey(self.game.getHash(canonicalBoard), canonicalBoard)
+
+    def childKey(self, s, canonicalBoard, a):
+        """
+        Returns the key and the board reached by taking action a from the
+        expanded board s, and records the edge in Cs and the board in Bs.
+        Edges that were taken before are looked up in Cs and their boards in
+        Bs, so following them costs no game calls at all, whatever the keys.
+        """
+        child = self.Cs[s].get(a)
+        if child is not None and child in self.Bs:
+            return child, self.Bs[child]
+
+        next_s, next_player = self.game.getNextState(canonicalBoard, 1, a)
+        next_s = self.game.getCanonicalForm(next_s, next_player)
+        if child is None:
+            if getattr(self.args, 'zobristHash', False):
+                h = self.game.getNextHash(s[0] if isinstance(s, tuple) else s, canonicalBoard, a)
+                child = self.verifiedKey(h, next_s)
+            else:
+                child = self.game.stringRepresentation(next_s)
+            self.Cs[s][a] = child
+        # also puts the board of an evicted child back, see evict
+        self.Bs[child] = next_s
+        return child, next_s
+
+    def verifiedKey(self, h, canonicalBoard):
+        """
+        Returns the key of canonicalBoard, whose Zobrist hash is h. That is h
+        itself, unless another board of the tree has the same hash: such a
+        collision is detected by comparing the board with the one stored in
+        Bs, and the board is then keyed on (h, its string representation).
+        """
+        other = self.Bs.get(h)
+        if other is None:
+            self.Bs[h] = canonicalBoard
+            return h
+        if np.array_equal(other, canonicalBoard):
+            return h
+        key = (h, self.game.stringRepresentation(canonicalBoard))
+        if key not in self.Bs:
+            self.collisions += 1
+            self.Bs[key] = canonicalBoard
+        return key
+
+    def advanceRoot(self, canonicalBoard, action):
+        """
+        Moves the root of the tree from canonicalBoard to the board reached by
+        playing action on it: keeps the subtree below that child and drops all
+        nodes that can no longer be reached. Call it after each move of a game
+        to reuse the search statistics on the next move while keeping memory
+        bounded.
+        """
+        s = self.boardKey(canonicalBoard)
+        child = self.Cs.get(s, {}).get(action)
+        if child is None:
+            next_s, next_player = self.game.getNextState(canonicalBoard, 1, action)
+            child = self.boardKey(self.game.getCanonicalForm(next_s, next_player))
+        self.setRoot(child)
+
+    def setRoot(self, s):
+        """
+        Prunes the tree to the nodes reachable from board s. If s is not in the
+        tree, the whole tree is dropped.
+        """
+        if s == self.root:
+            return
+        self.root = s
+
+        reachable = [s]
+        seen = {s}
+        for node in reachable:
+            for child in self.Cs.get(node, {}).values():
+                if child not in seen:
+                    seen.add(child)
+                    reachable.append(child)
+
+        self.Es = {k: self.Es[k] for k in reachable if k in self.Es}
+        expanded = [k for k in reachable if k in self.Ps]
+        self.Qsa = {k: self.Qsa[k] for k in expanded}
+        self.Nsa = {k: self.Nsa[k] for k in expanded}
+        self.Ns = {k: self.Ns[k] for k in expanded}
+        self.Ps = {k: self.Ps[k] for k in expanded}
+        self.Vs = {k: self.Vs[k] for k in expanded}
+        self.Cs = {k: self.Cs[k] for k in expanded}
+        self.Ls = {k: self.Ls[k] for k in reachable if k in self.Ls}
+        self.Bs = {k: self.Bs[k] for k in reachable if k in self.Bs}
+
+    def maxNodes(self):
+        """
+        Returns:
+            maxNodes: the node budget set by args.maxTreeNodes and/or
+                      args.maxTreeBytes, None if the tree is unbounded
+        """
+        budgets = []
+        if getattr(self.args, 'maxTreeNodes', None):
+            budgets.append(self.args.maxTreeNodes)
+        if getattr(self.args, 'maxTreeBytes', None) and self.nodeBytes:
+            budgets.append(self.args.maxTreeBytes // self.nodeBytes)
+        return max(1, min(budgets)) if budgets else None
+
+    def evict(self):
+        """
+        If the tree holds more expanded nodes than its budget (see maxNodes),
+        evicts nodes until it is EVICT_FRACTION below the budget. With
+        args.evictionPolicy 'lru' (the default) the nodes that were visited
+        least recently go first, with 'visits' the ones with the fewest visits.
+
+        Evicting a node keeps the statistics of the edges leading to it, it is
+        simply expanded again if a later simulation reaches it. Eviction only
+        runs between simulations, so the root is the only node on the current
+        search path, and it is never evicted.
+        """
+        maxNodes = self.maxNodes()
+        if maxNodes is None or len(self.Ps) <= maxNodes:
+            return
+
+        target = int(maxNodes * (1 - EVICT_FRACTION))
+        candidates = [k for k in self.Es if k != self.root]
+        if getattr(self.args, 'evictionPolicy', 'lru') == 'visits':
+            keys = [self.Ns.get(k, 0) for k in candidates]
+        else:
+            keys = [self.Ls.get(k, 0) for k in candidates]
+
+        for i in np.argsort(keys, kind='stable'):
+            if len(self.Ps) <= target:
+                break
+            k = candidates[i]
+            if k in self.Ps:
+                del self.Qsa[k], self.Nsa[k], self.Ns[k], self.Ps[k], self.Vs[k], self.Cs[k]
+                self.evictions += 1
+            del self.Es[k]
+            self.Ls.pop(k, None)
+            self.Bs.pop(k, None)
+
+    def treeStats(self):
+        """
+        Returns:
+            stats: a dict with the number of expanded nodes in the tree, an
+                   estimate of the bytes they take and the number of nodes
+                   evicted so far
+        """
+        return {'nodes': len(self.Ps), 'bytes': len(self.Ps) * self.nodeBytes, 'evictions': self.evictions}
+
+    def search(self, canonicalBoard, s=None):
         """
         This function performs one iteration of MCTS. It is recursively called
         till a leaf node is found. The action chosen at each node is one that
@@ -68,69 +370,276 @@ class MCTS():
         state. This is done since v is in [-1,1] and if v is the value of a
         state for the current player, then its value is -v for the other player.
 
+        Input:
+            canonicalBoard: board to search from
+            s: boardKey(canonicalBoard), if already known
+
         Returns:
             v: the negative of the value of the current canonicalBoard
         """
 
-        s = self.game.stringRepresentation(canonicalBoard)
+        if s is None:
+            s = self.boardKey(canonicalBoard)
 
+        self.Ls[s] = self.sims
         if s not in self.Es:
             self.Es[s] = self.game.getGameEnded(canonicalBoard, 1)
         if self.Es[s] != 0:
             # terminal node
+            self.sims += 1
             return -self.Es[s]
 
         if s not in self.Ps:
             # leaf node
-            self.Ps[s], v = self.nnet.predict(canonicalBoard)
-            valids = self.game.getValidMoves(canonicalBoard, 1)
-            self.Ps[s] = self.Ps[s] * valids  # masking invalid moves
-            sum_Ps_s = np.sum(self.Ps[s])
-            if sum_Ps_s > 0:
-                self.Ps[s] /= sum_Ps_s  # renormalize
-            else:
-                # if all valid moves were masked make all valid moves equally probable
+            self.sims += 1
+            ps, v = self.nnet.predict(canonicalBoard)
+            self.expand(s, canonicalBoard, ps)
+            return -v
 
-                # NB! All valid moves may be masked if either your NNet architecture is insufficient or you've get overfitting or something else.
-                # If you have got dozens or hundreds of these messages you should pay attention to your NNet and/or training process.   
-                log.error("All valid moves were masked, doing a workaround.")
-                self.Ps[s] = self.Ps[s] + valids
-                self.Ps[s] /= np.sum(self.Ps[s])
+        # pick the action with the highest upper confidence bound
+        a = puct_select(self.Qsa[s], self.Nsa[s], self.Ps[s], self.Vs[s], self.Ns[s], self.args.cpuct)
+        next_key, next_s = self.childKey(s, canonicalBoard, a)
 
-            self.Vs[s] = valids
-            self.Ns[s] = 0
-            return -v
+        v = self.search(next_s, next_key)
 
-        valids = self.Vs[s]
-        cur_best = -float('inf')
-        best_act = -1
+        self.Qsa[s][a] = (self.Nsa[s][a] * self.Qsa[s][a] + v) / (self.Nsa[s][a] + 1)
+        self.Nsa[s][a] += 1
+        self.Ns[s] += 1
+        return -v
 
-        # pick the action with the highest upper confidence bound
-        for a in range(self.game.getActionSize()):
-            if valids[a]:
-                if (s, a) in self.Qsa:
-                    u = self.Qsa[(s, a)] + self.args.cpuct * self.Ps[s][a] * math.sqrt(self.Ns[s]) / (
-                            1 + self.Nsa[(s, a)])
-                else:
-                    u = self.args.cpuct * self.Ps[s][a] * math.sqrt(self.Ns[s] + EPS)  # Q = 0 ?
+    def searchBatch(self, canonicalBoard, batchSize, s=None):
+        """
+        This function performs batchSize iterations of MCTS at once. Each
+        iteration descends from canonicalBoard like search does, but adds a
+        virtual loss (args.virtualLoss visits that all lost, default 1) to every
+        edge it takes, which steers the following descents towards other paths.
+        The leaves that are reached are then evaluated with a single
+        nnet.predict_batch call and the virtual losses along each path are
+        replaced by the real value.
 
-                if u > cur_best:
-                    cur_best = u
-                    best_act = a
+        Iterations that end in the same leaf share its evaluation.
+        """
+        paths, leaves = self.selectLeaves(canonicalBoard, batchSize, s)
+        if leaves:
+            pis, vs = self.nnet.predict_batch(list(leaves.values()))
+        else:
+            pis, vs = [], []
+        self.backupLeaves(paths, leaves, pis, vs)
 
-        a = best_act
-        next_s, next_player = self.game.getNextState(canonicalBoard, 1, a)
-        next_s = self.game.getCanonicalForm(next_s, next_player)
+    def selectLeaves(self, canonicalBoard, batchSize, s=None):
+        """
+        The descents of searchBatch: descends batchSize times from
+        canonicalBoard, adding virtual losses along the way.
 
-        v = self.search(next_s)
+        Returns:
+            paths: a list with the (board s, action) edges taken by each
+                   descent and the board s it ended in
+            leaves: a dict from board s to canonicalBoard of the leaves that
+                    need an evaluation, to be passed to backupLeaves with the
+                    evaluations
+        """
+        root = self.boardKey(canonicalBoard) if s is None else s
+        vl = getattr(self.args, 'virtualLoss', 1)
+        paths = []  # (edges taken, board s at the end of the path)
+        leaves = {}  # board s -> canonicalBoard of the leaves to evaluate
+
+        for _ in range(batchSize):
+            path = []
+            board, s = canonicalBoard, root
+            while True:
+                self.Ls[s] = self.sims
+                if s not in self.Es:
+                    self.Es[s] = self.game.getGameEnded(board, 1)
+                if self.Es[s] != 0 or s not in self.Ps:
+                    break
+
+                a = puct_select(self.Qsa[s], self.Nsa[s], self.Ps[s], self.Vs[s], self.Ns[s], self.args.cpuct)
+                n = self.Nsa[s][a]
+                self.Qsa[s][a] = (n * self.Qsa[s][a] - vl) / (n + vl)
+                self.Nsa[s][a] = n + vl
+                self.Ns[s] += vl
+                path.append((s, a))
+                s, board = self.childKey(s, board, a)
+
+            if self.Es[s] == 0:
+                leaves[s] = board
+            paths.append((path, s))
+            self.sims += 1
+        return paths, leaves
+
+    def backupLeaves(self, paths, leaves, pis, vs):
+        """
+        Expands the leaves returned by selectLeaves with their policies pis and
+        values vs (in the order of leaves), and replaces the virtual losses
+        along paths by the real values.
+        """
+        vl = getattr(self.args, 'virtualLoss', 1)
+        values = {}
+        for (s, board), ps, v in zip(leaves.items(), pis, vs):
+            self.expand(s, board, ps)
+            values[s] = v
 
-        if (s, a) in self.Qsa:
-            self.Qsa[(s, a)] = (self.Nsa[(s, a)] * self.Qsa[(s, a)] + v) / (self.Nsa[(s, a)] + 1)
-            self.Nsa[(s, a)] += 1
+        for path, leaf in paths:
+            v = -self.Es[leaf] if self.Es[leaf] != 0 else -values[leaf]
+            for s, a in reversed(path):
+                # undo the virtual loss and add the real value in one go
+                n = self.Nsa[s][a] - vl
+                self.Qsa[s][a] = (self.Nsa[s][a] * self.Qsa[s][a] + vl + v) / (n + 1)
+                self.Nsa[s][a] = n + 1
+                self.Ns[s] += 1 - vl
+                v = -v
 
+    def expand(self, s, canonicalBoard, ps):
+        """
+        Adds the leaf node s to the tree. ps is the policy the neural network
+        returned for canonicalBoard; it gets masked to the valid moves and
+        renormalized.
+        """
+        valids = self.game.getValidMoves(canonicalBoard, 1)
+        ps = ps * valids  # masking invalid moves
+        sum_Ps_s = np.sum(ps)
+        if sum_Ps_s > 0:
+            ps /= sum_Ps_s  # renormalize
         else:
-            self.Qsa[(s, a)] = v
-            self.Nsa[(s, a)] = 1
+            # if all valid moves were masked make all valid moves equally probable
 
-        self.Ns[s] += 1
+            # NB! All valid moves may be masked if either your NNet architecture is insufficient or you've get overfitting or something else.
+            # If you have got dozens or hundreds of these messages you should pay attention to your NNet and/or training process.   
+            log.error("All valid moves were masked, doing a workaround.")
+            ps = ps + valids
+            ps /= np.sum(ps)
+
+        self.Ps[s] = ps
+        self.Vs[s] = valids
+        self.Ns[s] = 0
+        self.Nsa[s] = np.zeros(self.game.getActionSize(), dtype=np.int32)
+        self.Qsa[s] = np.zeros(self.game.getActionSize())
+        self.Cs[s] = {}
+        if not self.nodeBytes:
+            # the board is kept in Bs, see childKey
+            self.nodeBytes = sum(sys.getsizeof(x) for x in (s, ps, valids, self.Nsa[s], self.Qsa[s], self.Cs[s],
+                                                            canonicalBoard))
+            self.nodeBytes += DICT_ENTRY_BYTES * 8
+
+
+class ArrayMCTS(MCTS):
+    """
+    MCTS with an array-backed node table. Every expanded board s gets a slot
+    index, and the per-action statistics of all nodes live in contiguous
+    (capacity, actionSize) NumPy arrays, so an edge (s,a) is the element
+    [slot, a] instead of a tuple key in a dict. getActionProb and search behave
+    exactly like in MCTS.
+
+    Only the sequential search is implemented; batched leaf evaluation
+    (args.mctsBatchSize > 1), tree reuse (args.reuseTree), node budgets
+    (args.maxTreeNodes, args.maxTreeBytes), Zobrist hashing (args.zobristHash)
+    and root noise (args.dirichletEpsilon) need MCTS.
+    """
+
+    def __init__(self, game, nnet, args, capacity=1024):
+        if getattr(args, 'mctsBatchSize', 1) > 1:
+            raise ValueError("ArrayMCTS does not support batched leaf evaluation, use MCTS instead")
+        if getattr(args, 'reuseTree', False):
+            raise ValueError("ArrayMCTS does not support tree reuse, use MCTS instead")
+        if getattr(args, 'maxTreeNodes', None) or getattr(args, 'maxTreeBytes', None):
+            raise ValueError("ArrayMCTS does not support a node budget, use MCTS instead")
+        if getattr(args, 'zobristHash', False):
+            raise ValueError("ArrayMCTS does not support Zobrist hashing, use MCTS instead")
+        if getattr(args, 'dirichletEpsilon', 0) > 0:
+            raise ValueError("ArrayMCTS does not support root noise, use MCTS instead")
+        super().__init__(game, nnet, args)
+        actionSize = game.getActionSize()
+        self.slots = {}  # maps board s to its row in the node table
+        self.N = np.zeros((capacity, actionSize), dtype=np.int32)  # #times edge s,a was visited
+        self.Q = np.zeros((capacity, actionSize), dtype=np.float32)  # Q values for s,a
+        self.P = np.zeros((capacity, actionSize), dtype=np.float32)  # initial policy
+        self.V = np.zeros((capacity, actionSize), dtype=np.bool_)  # game.getValidMoves for s
+        self.Ns = np.zeros(capacity, dtype=np.int32)  # #times board s was visited
+
+    def __len__(self):
+        return len(self.slots)
+
+    def nbytes(self):
+        """
+        Returns the number of bytes held by the node table arrays.
+        """
+        return self.N.nbytes + self.Q.nbytes + self.P.nbytes + self.V.nbytes + self.Ns.nbytes
+
+    def newSlot(self, s):
+        slot = len(self.slots)
+        if slot == len(self.Ns):
+            # node table is full, double its capacity
+            self.N = np.concatenate((self.N, np.zeros_like(self.N)))
+            self.Q = np.concatenate((self.Q, np.zeros_like(self.Q)))
+            self.P = np.concatenate((self.P, np.zeros_like(self.P)))
+            self.V = np.concatenate((self.V, np.zeros_like(self.V)))
+            self.Ns = np.concatenate((self.Ns, np.zeros_like(self.Ns)))
+        self.slots[s] = slot
+        return slot
+
+    def expand(self, s, canonicalBoard, ps):
+        slot = self.newSlot(s)
+        valids = self.game.getValidMoves(canonicalBoard, 1)
+        ps = ps * valids  # masking invalid moves
+        sum_Ps_s = np.sum(ps)
+        if sum_Ps_s > 0:
+            ps /= sum_Ps_s  # renormalize
+        else:
+            # if all valid moves were masked make all valid moves equally probable
+            log.error("All valid moves were masked, doing a workaround.")
+            ps = ps + valids
+            ps /= np.sum(ps)
+
+        self.P[slot] = ps
+        self.V[slot] = valids
+
+    def visitCounts(self, s):
+        if s not in self.slots:
+            return [0] * self.game.getActionSize()
+        return self.N[self.slots[s]].tolist()
+
+    def leaderIsSafe(self, s, simsLeft):
+        slot = self.slots.get(s)
+        if slot is None or simsLeft >= self.Ns[slot]:
+            return False
+        second, first = np.partition(self.N[slot], -2)[-2:]
+        return first - second > simsLeft
+
+    def search(self, canonicalBoard, s=None):
+        """
+        Same as MCTS.search, with the statistics of board s read from and
+        written to row self.slots[s] of the node table.
+
+        Returns:
+            v: the negative of the value of the current canonicalBoard
+        """
+
+        if s is None:
+            s = self.game.stringRepresentation(canonicalBoard)
+
+        if s not in self.Es:
+            self.Es[s] = self.game.getGameEnded(canonicalBoard, 1)
+        if self.Es[s] != 0:
+            # terminal node
+            return -self.Es[s]
+
+        slot = self.slots.get(s)
+        if slot is None:
+            # leaf node
+            ps, v = self.nnet.predict(canonicalBoard)
+            self.expand(s, canonicalBoard, ps)
+            return -v
+
+        # pick the action with the highest upper confidence bound
+        a = puct_select(self.Q[slot], self.N[slot], self.P[slot], self.V[slot], self.Ns[slot], self.args.cpuct)
+        next_s, next_player = self.game.getNextState(canonicalBoard, 1, a)
+        next_s = self.game.getCanonicalForm(next_s, next_player)
+
+        v = self.search(next_s)
+
+        # the table may have been reallocated while searching the child
+        n = self.N[slot, a]
+        self.Q[slot, a] = (n * self.Q[slot, a] + v) / (n + 1)
+        self.N[slot, a] = n + 1
+        self.Ns[slot] += 1
         return -v
@@ -1,3 +1,6 @@
+import numpy as np
+
+
 class NeuralNet():
     """
     This class specifies the base NeuralNet class. To define your own neural
@@ -36,6 +39,21 @@ class NeuralNet():
         """
         pass
 
+    def predict_batch(self, boards):
+        """
+        Input:
+            boards: a list of boards in their canonical form.
+
+        Returns:
+            pis: an array with the policy vector of each board
+            vs: an array with the value of each board
+
+        Subclasses should evaluate all boards in a single forward pass; this
+        default implementation just calls predict on each board.
+        """
+        pis, vs = zip(*[self.predict(board) for board in boards])
+        return np.array(pis), np.array(vs)
+
     def save_checkpoint(self, folder, filename):
         """
         Saves the current neural network (with its parameters) in
@@ -48,3 +66,38 @@ class NeuralNet():
         Loads parameters of the neural network from folder/filename
         """
         pass
+
+    def save_training_state(self, folder, filename):
+        """
+        Saves what training needs to go on where it stopped in folder/filename:
+        the parameters and, for networks trained with one, the state of the
+        optimizer, and that of the random generators of the framework (e.g.
+        for dropout). Defaults to save_checkpoint.
+        """
+        self.save_checkpoint(folder, filename)
+
+    def load_training_state(self, folder, filename):
+        """
+        Loads a file written by save_training_state. Defaults to
+        load_checkpoint.
+        """
+        self.load_checkpoint(folder, filename)
+
+    def snapshot(self):
+        """
+        Optional, networks that do not implement it return None.
+
+        Returns:
+            snapshot: an in-memory copy of the parameters of the neural
+                      network (and of the state of its optimizer, if any),
+                      which restore loads back. Used by Coach to keep the
+                      previous network without a round trip through a
+                      checkpoint file.
+        """
+        return None
+
+    def restore(self, snapshot):
+        """
+        Loads the parameters of a snapshot returned by snapshot()
+        """
+        pass
@@ -0,0 +1,364 @@
+import json
+import logging
+import os
+from collections import deque
+
+import numpy as np
+
+log = logging.getLogger(__name__)
+
+MANIFEST = 'manifest.json'
+FIELDS = ('boards', 'pis', 'vs')
+
+
+def chunkFile(folder, chunkId, field):
+    return os.path.join(folder, f'chunk_{chunkId:06d}.{field}.npy')
+
+
+def writeChunk(folder, chunkId, arrays):
+    for field, array in zip(FIELDS, arrays):
+        np.save(chunkFile(folder, chunkId, field), array)
+
+
+def removeChunk(folder, chunkId):
+    for field in FIELDS:
+        filename = chunkFile(folder, chunkId, field)
+        if os.path.exists(filename):
+            os.remove(filename)
+
+
+def readManifest(folder):
+    with open(os.path.join(folder, MANIFEST)) as f:
+        return json.load(f)
+
+
+def writeManifest(folder, buffer):
+    """
+    Replaces the manifest of folder with the one listing the chunks of buffer.
+    The manifest is written to a temporary file first, so the folder always
+    holds a complete one.
+    """
+    manifest = {
+        'boardDtype': None if buffer.boardDtype is None else buffer.boardDtype.name,
+        'piDtype': buffer.piDtype.name,
+        'chunks': [{'id': chunkId, 'length': length} for chunkId, _, length in buffer.chunks],
+    }
+    tmp = os.path.join(folder, MANIFEST + '.tmp')
+    with open(tmp, 'w') as f:
+        json.dump(manifest, f)
+    os.replace(tmp, os.path.join(folder, MANIFEST))
+
+
+class ReplayBuffer():
+    """
+    Stores the training examples of the latest self-play iterations in
+    preallocated ring arrays of a fixed dtype: boards (by default the dtype of
+    the first boards added, int8 saves memory for boards of small integers),
+    pis (float32 or float16) and vs (float32).
+
+    Every iteration is appended as one chunk. The oldest chunks are evicted
+    once there are more than maxChunks of them, or when the new chunk does not
+    fit into the capacity left. save only writes the chunks that are not in
+    the folder yet (and deletes the evicted ones), so saving and loading take
+    time proportional to the new data rather than to the whole history.
+
+    If a game is given, sample applies a random symmetry of it (see
+    Game.applySymmetryBatch) to every example it returns, so the buffer only
+    has to hold one form of each position.
+    """
+
+    def __init__(self, capacity, maxChunks, boardDtype=None, piDtype='float32', game=None):
+        """
+        Input:
+            capacity: maximum number of examples in the buffer
+            maxChunks: maximum number of chunks (iterations) in the buffer
+            boardDtype: dtype the boards are stored with, it has to hold every
+                        value a board can take. None takes the dtype of the
+                        first boards added
+            piDtype: dtype the policies are stored with
+            game: the game whose symmetries sample applies, or None
+        """
+        self.capacity = capacity
+        self.maxChunks = maxChunks
+        self.boardDtype = None if boardDtype is None else np.dtype(boardDtype)
+        self.piDtype = np.dtype(piDtype)
+        self.boards = self.pis = self.vs = None  # allocated by the first chunk, which gives the shapes
+        self.chunks = deque()  # [chunkId, start, length] of each chunk, oldest first
+        self.head = 0  # index the next chunk starts at
+        self.size = 0  # number of examples in the buffer
+        self.nextChunkId = 0
+        self.saved = set()  # ids of the chunks in self.savedFolder
+        self.savedFolder = None  # folder the buffer was last saved to or loaded from
+        self.game = game
+        self.numSymmetries = None  # len(game.getSymmetries(...)), worked out by the first sample
+
+    def __len__(self):
+        return self.size
+
+    def __getitem__(self, i):
+        if not 0 <= i < self.size:
+            raise IndexError(i)
+        boards, pis, vs = self.sample(np.array([i]))
+        return boards[0], pis[0], vs[0]
+
+    def allocate(self, boardShape, piShape):
+        # np.zeros leaves the pages to the OS until they are written, so the
+        # buffer only takes the memory of the examples it holds
+        self.boards = np.zeros((self.capacity,) + boardShape, dtype=self.boardDtype)
+        self.pis = np.zeros((self.capacity,) + piShape, dtype=self.piDtype)
+        self.vs = np.zeros(self.capacity, dtype=np.float32)
+
+    def addChunk(self, examples):
+        """
+        Appends the examples of an iteration as a new chunk.
+
+        Input:
+            examples: a list of examples of the form (board, pi, v)
+
+        Returns:
+            chunkId: the id of the new chunk, or None if examples is empty
+        """
+        if len(examples) == 0:
+            return None
+        boards = np.array([e[0] for e in examples])
+        stored = self.storedBoards(boards)
+        if not np.array_equal(stored, boards):
+            raise ValueError(f'Boards cannot be stored as {self.boardDtype}, pass a wider boardDtype')
+        pis = np.array([e[1] for e in examples], dtype=self.piDtype)
+        vs = np.array([e[2] for e in examples], dtype=np.float32)
+        return self.append(stored, pis, vs)
+
+    def storedBoards(self, boards):
+        """
+        Returns boards as self.boardDtype, which they set if it was left to None.
+        """
+        if self.boardDtype is None:
+            self.boardDtype = boards.dtype
+        return boards.astype(self.boardDtype)
+
+    def append(self, boards, pis, vs, chunkId=None):
+        """
+        Appends a chunk given as arrays, evicting the oldest chunks as needed.
+        If the chunk is larger than the capacity, only its latest examples are
+        kept.
+        """
+        if self.boards is None:
+            self.allocate(boards.shape[1:], pis.shape[1:])
+        if len(boards) > self.capacity:
+            log.warning(f'Chunk of {len(boards)} examples is larger than the replay buffer, '
+                        f'keeping the latest {self.capacity}')
+            boards, pis, vs = boards[-self.capacity:], pis[-self.capacity:], vs[-self.capacity:]
+        n = len(boards)
+        self.evict(n)
+        chunkId = self.newChunkId(chunkId)
+        index = self.indices(self.head, n)
+        self.boards[index] = boards
+        self.pis[index] = pis
+        self.vs[index] = vs
+        self.chunks.append([chunkId, self.head, n])
+        self.head = (self.head + n) % self.capacity
+        self.size += n
+        return chunkId
+
+    def evict(self, n):
+        """
+        Evicts the oldest chunks until a chunk of n examples can be added.
+
+        Returns:
+            evicted: the ids of the evicted chunks
+        """
+        evicted = []
+        while self.chunks and (len(self.chunks) >= self.maxChunks or self.size + n > self.capacity):
+            evictedId, _, length = self.chunks.popleft()
+            self.size -= length
+            evicted.append(evictedId)
+            log.info(f'Evicting replay chunk {evictedId} ({length} examples)')
+        return evicted
+
+    def newChunkId(self, chunkId=None):
+        if chunkId is None:
+            chunkId = self.nextChunkId
+        self.nextChunkId = max(self.nextChunkId, chunkId + 1)
+        return chunkId
+
+    def indices(self, start, length):
+        return (start + np.arange(length)) % self.capacity
+
+    def chunk(self, chunkId):
+        """
+        Returns the (boards, pis, vs) arrays of a chunk, as copies.
+        """
+        for cid, start, length in self.chunks:
+            if cid == chunkId:
+                index = self.indices(start, length)
+                return self.boards[index], self.pis[index], self.vs[index]
+        raise KeyError(chunkId)
+
+    def sample(self, ids):
+        """
+        Input:
+            ids: array of example indices, 0 being the oldest example
+
+        Returns:
+            boards, pis, vs: arrays with the examples at ids, pis as float32
+        """
+        boards, pis, vs = self.gather(ids)
+        if self.game is not None:
+            if self.numSymmetries is None:
+                self.numSymmetries = len(self.game.getSymmetries(boards[0], pis[0]))
+            ids = np.random.randint(self.numSymmetries, size=len(ids))
+            boards, pis = self.game.applySymmetryBatch(boards, pis, ids)
+        return boards, pis, vs
+
+    def gather(self, ids):
+        # the chunks follow each other around the ring, starting at the oldest
+        index = (self.chunks[0][1] + ids) % self.capacity
+        return self.boards[index], self.pis[index].astype(np.float32), self.vs[index]
+
+    def examples(self):
+        """
+        Returns:
+            examples: all examples in the buffer, oldest first, as a list of
+                      (board, pi, v) with pi as float32
+        """
+        examples = []
+        for chunkId, _, _ in self.chunks:
+            boards, pis, vs = self.chunk(chunkId)
+            examples.extend(zip(boards, pis.astype(np.float32), vs))
+        return examples
+
+    def save(self, folder):
+        """
+        Writes the chunks that are not in folder yet, deletes the files of the
+        chunks evicted since, and then replaces the manifest listing the chunks.
+        """
+        if not os.path.exists(folder):
+            os.makedirs(folder)
+        if folder != self.savedFolder:
+            self.savedFolder, self.saved = folder, set()
+
+        for chunkId, _, _ in self.chunks:
+            if chunkId not in self.saved:
+                writeChunk(folder, chunkId, self.chunk(chunkId))
+                self.saved.add(chunkId)
+
+        # write the new manifest before deleting anything, so the folder stays
+        # loadable if we are interrupted
+        writeManifest(folder, self)
+        current = {chunkId for chunkId, _, _ in self.chunks}
+        for chunkId in self.saved - current:
+            removeChunk(folder, chunkId)
+        self.saved &= current
+
+    def load(self, folder, chunks=None):
+        """
+        Appends the chunks saved in folder (which need to fit into this
+        buffer's capacity and maxChunks to all be kept), or only the given
+        ones, a list like the chunks of the manifest.
+        """
+        for chunk in self.savedChunks(folder, chunks):
+            boards, pis, vs = (np.load(chunkFile(folder, chunk['id'], field)) for field in FIELDS)
+            self.append(self.storedBoards(boards), pis.astype(self.piDtype), vs, chunkId=chunk['id'])
+        self.savedFolder = folder
+        self.saved = {chunkId for chunkId, _, _ in self.chunks}
+
+    @staticmethod
+    def savedChunks(folder, chunks=None):
+        """
+        Returns the chunks of the manifest of folder, or the given ones, less
+        those whose files were deleted.
+        """
+        saved = []
+        for chunk in readManifest(folder)['chunks'] if chunks is None else chunks:
+            if os.path.exists(chunkFile(folder, chunk['id'], FIELDS[0])):
+                saved.append(chunk)
+            else:
+                log.warning(f'Replay chunk {chunk["id"]} not found in {folder}, skipping it')
+        return saved
+
+    @staticmethod
+    def exists(folder):
+        return os.path.isfile(os.path.join(folder, MANIFEST))
+
+
+class ExampleStore(ReplayBuffer):
+    """
+    A ReplayBuffer that keeps its chunks on disk instead of in RAM: every
+    chunk is written to folder as soon as it is added (in the format of
+    ReplayBuffer.save, with the manifest as the index of the chunks) and read
+    back through memory maps. sample only reads the examples it returns, so
+    training from the store takes the same memory whatever the length of the
+    history.
+    """
+
+    def __init__(self, folder, capacity, maxChunks, boardDtype=None, piDtype='float32', game=None):
+        super().__init__(capacity, maxChunks, boardDtype=boardDtype, piDtype=piDtype, game=game)
+        self.folder = folder
+        self.shards = {}  # chunk id -> (boards, pis, vs) memory maps of its files
+
+    def append(self, boards, pis, vs, chunkId=None):
+        if len(boards) > self.capacity:
+            log.warning(f'Chunk of {len(boards)} examples is larger than the replay buffer, '
+                        f'keeping the latest {self.capacity}')
+            boards, pis, vs = boards[-self.capacity:], pis[-self.capacity:], vs[-self.capacity:]
+        if not os.path.exists(self.folder):
+            os.makedirs(self.folder)
+        evicted = self.evict(len(boards))
+        chunkId = self.newChunkId(chunkId)
+        writeChunk(self.folder, chunkId, (boards, pis.astype(self.piDtype), vs.astype(np.float32)))
+        self.openChunk(chunkId, len(boards))
+        writeManifest(self.folder, self)
+        for evictedId in evicted:
+            del self.shards[evictedId]
+            removeChunk(self.folder, evictedId)
+        return chunkId
+
+    def openChunk(self, chunkId, length):
+        self.shards[chunkId] = tuple(np.load(chunkFile(self.folder, chunkId, field), mmap_mode='r')
+                                     for field in FIELDS)
+        self.chunks.append([chunkId, 0, length])
+        self.size += length
+
+    def chunk(self, chunkId):
+        return tuple(np.array(array) for array in self.shards[chunkId])
+
+    def gather(self, ids):
+        ends = np.cumsum([length for _, _, length in self.chunks])
+        shardOf = np.searchsorted(ends, ids, side='right')
+        boards = pis = vs = None
+        for k, (chunkId, _, length) in enumerate(self.chunks):
+            mask = shardOf == k
+            if not mask.any():
+                continue
+            shardBoards, shardPis, shardVs = self.shards[chunkId]
+            if boards is None:
+                boards = np.empty((len(ids),) + shardBoards.shape[1:], dtype=shardBoards.dtype)
+                pis = np.empty((len(ids),) + shardPis.shape[1:], dtype=np.float32)
+                vs = np.empty(len(ids), dtype=np.float32)
+            local = ids[mask] - (ends[k] - length)
+            boards[mask] = shardBoards[local]
+            pis[mask] = shardPis[local]
+            vs[mask] = shardVs[local]
+        return boards, pis, vs
+
+    def save(self, folder):
+        """
+        The chunks in self.folder are always up to date, other folders get a
+        copy of them.
+        """
+        if folder != self.folder:
+            super().save(folder)
+
+    def load(self, folder, chunks=None):
+        """
+        Opens the chunks saved in self.folder, or copies the ones saved in
+        another folder into it.
+        """
+        if folder != self.folder:
+            super().load(folder, chunks)
+            return
+        for chunk in self.savedChunks(folder, chunks):
+            for evictedId in self.evict(chunk['length']):
+                del self.shards[evictedId]
+            self.newChunkId(chunk['id'])
+            self.openChunk(chunk['id'], chunk['length'])
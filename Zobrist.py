@@ -0,0 +1,42 @@
+import numpy as np
+
+MASK = (1 << 64) - 1
+
+
+class Zobrist():
+    """
+    Zobrist hashing for boards whose cells are 0 (empty), +1 or -1, and whose
+    canonical form for player -1 is the negated board.
+
+    A hash is a 128 bit int holding two 64 bit Zobrist hashes: the one of the
+    board in its low half and the one of the negated board in its high half.
+    Negating a board then only swaps the halves, so the hash of the next
+    canonical board follows from the hash of the current one and the cells
+    that changed.
+    """
+
+    def __init__(self, numCells, seed=0):
+        rng = np.random.RandomState(seed)
+        self.white = rng.randint(0, 1 << 64, size=numCells, dtype=np.uint64)  # keys of the +1 pieces
+        self.black = rng.randint(0, 1 << 64, size=numCells, dtype=np.uint64)  # keys of the -1 pieces
+        white = [int(k) for k in self.white]
+        black = [int(k) for k in self.black]
+        self.place = [w | b << 64 for w, b in zip(white, black)]  # +1 piece added to a cell
+        self.flip = [(w ^ b) | (w ^ b) << 64 for w, b in zip(white, black)]  # piece of a cell changes colour
+
+    def hash(self, board):
+        """
+        Returns the hash of board, computed from scratch.
+        """
+        cells = np.ravel(board)
+        white, black = cells == 1, cells == -1
+        low = np.bitwise_xor.reduce(self.white[white]) ^ np.bitwise_xor.reduce(self.black[black])
+        high = np.bitwise_xor.reduce(self.black[white]) ^ np.bitwise_xor.reduce(self.white[black])
+        return int(low) | int(high) << 64
+
+    @staticmethod
+    def negate(boardHash):
+        """
+        Returns the hash of the negated board.
+        """
+        return boardHash >> 64 | (boardHash & MASK) << 64
@@ -0,0 +1,53 @@
+"""
+Compares the throughput (in games/hour) of the serial Arena, where every MCTS
+leaf is evaluated with its own predict call, against the lock-step
+BatchedArena, which evaluates the leaves of many games with one predict_batch
+call per network. Both play Othello with two untrained instances of the
+PyTorch network, so only the cost of playing is measured.
+
+usage: python benchmarks/arena_throughput.py [board size] [simulations] [games] [lock-step games...]
+"""
+import os
+import sys
+import time
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from Arena import Arena, BatchedArena, MCTSPlayer
+from othello.OthelloGame import OthelloGame
+from othello.pytorch.NNet import NNetWrapper
+from utils import dotdict
+
+
+def serial(game, nnets, args, games):
+    arena = Arena(MCTSPlayer(game, nnets[0], args), MCTSPlayer(game, nnets[1], args), game)
+    start = time.perf_counter()
+    arena.playGames(games)
+    return games / (time.perf_counter() - start) * 3600
+
+
+def lockStep(game, nnets, args, games, numGames):
+    arena = BatchedArena(nnets[0], nnets[1], game, args, numGames=numGames)
+    start = time.perf_counter()
+    arena.playGames(games)
+    return games / (time.perf_counter() - start) * 3600
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 6
+    sims = int(sys.argv[2]) if len(sys.argv) > 2 else 25
+    games = int(sys.argv[3]) if len(sys.argv) > 3 else 8
+    lockStepGames = [int(g) for g in sys.argv[4:]] or [4, 8]
+
+    game = OthelloGame(n)
+    nnets = (NNetWrapper(game), NNetWrapper(game))
+    args = dotdict({'numMCTSSims': sims, 'cpuct': 1.0})
+
+    base = serial(game, nnets, args, games)
+    print(f'{"Arena":>18}: {base:8.1f} games/hour')
+    for numGames in lockStepGames:
+        speed = lockStep(game, nnets, args, games, numGames)
+        print(f'{f"BatchedArena({numGames})":>18}: {speed:8.1f} games/hour ({speed / base:.2f}x)')
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,20 @@
+import zlib
+
+import numpy as np
+
+
+class RandomPolicyNet():
+    """
+    Stands in for a NeuralNet in the benchmarks: returns a pseudo-random policy
+    and value that only depend on the board (not on the hash seed), so that different search
+    implementations see identical trees and only the cost of the search
+    itself is measured.
+    """
+
+    def __init__(self, game):
+        self.game = game
+        self.action_size = game.getActionSize()
+
+    def predict(self, board):
+        rng = np.random.default_rng(zlib.crc32(np.ascontiguousarray(board).tobytes()))
+        return rng.random(self.action_size), rng.uniform(-1, 1)
@@ -0,0 +1,73 @@
+"""
+Compares keying the MCTS nodes on game.stringRepresentation against the
+incremental Zobrist hashes (args.zobristHash), for each game that implements
+getHash. Reports the cost of computing one child key both ways, and the
+search speed of both trees grown from the initial position with a random (but
+fixed) policy in place of a neural network.
+
+usage: python benchmarks/mcts_hashing.py [simulations]
+"""
+import os
+import sys
+import time
+import timeit
+
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from MCTS import MCTS
+from benchmarks.common import RandomPolicyNet
+from connect4.Connect4Game import Connect4Game
+from dotsandboxes.DotsAndBoxesGame import DotsAndBoxesGame
+from gobang.GobangGame import GobangGame
+from othello.OthelloGame import OthelloGame
+from tictactoe.TicTacToeGame import TicTacToeGame
+from utils import dotdict
+
+GAMES = {
+    'othello': lambda: OthelloGame(8),
+    'gobang': lambda: GobangGame(15, 5),
+    'tictactoe': lambda: TicTacToeGame(3),
+    'connect4': lambda: Connect4Game(),
+    'dotsandboxes': lambda: DotsAndBoxesGame(3),
+}
+
+
+def keyCost(game, number=2000):
+    """
+    Returns the time (in seconds) to compute the key of a child of the initial
+    position with stringRepresentation and with getNextHash. Like in
+    MCTS.childKey, the child board was just made by getNextState.
+    """
+    board = game.getInitBoard()
+    action = int(np.flatnonzero(game.getValidMoves(board, 1))[0])
+    next_s, next_player = game.getNextState(board, 1, action)
+    next_s = game.getCanonicalForm(next_s, next_player)
+    h = game.getHash(board)
+    string = timeit.timeit(lambda: game.stringRepresentation(next_s), number=number) / number
+    zobrist = timeit.timeit(lambda: game.getNextHash(h, board, action), number=number) / number
+    return string, zobrist
+
+
+def searchSpeed(game, sims, zobristHash):
+    args = dotdict({'numMCTSSims': sims, 'cpuct': 1.0, 'zobristHash': zobristHash})
+    mcts = MCTS(game, RandomPolicyNet(game), args)
+    start = time.perf_counter()
+    mcts.getActionProb(game.getInitBoard(), temp=1)
+    return sims / (time.perf_counter() - start)
+
+
+def main():
+    sims = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    for name, make_game in GAMES.items():
+        game = make_game()
+        string, zobrist = keyCost(game)
+        stringSpeed = searchSpeed(game, sims, False)
+        zobristSpeed = searchSpeed(game, sims, True)
+        print(f'{name:>12}: child key {string * 1e9:7.0f} ns string, {zobrist * 1e9:7.0f} ns zobrist | '
+              f'search {stringSpeed:8.1f} sims/sec string, {zobristSpeed:8.1f} sims/sec zobrist '
+              f'({zobristSpeed / stringSpeed:.2f}x)')
+
+
+if __name__ == "__main__":
+    main()
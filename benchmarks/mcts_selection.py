@@ -0,0 +1,87 @@
+"""
+Micro-benchmark for the PUCT selection step of MCTS.search on every bundled
+game. For each game it reports
+  - the per-simulation latency of a full MCTS search (rules + selection), and
+  - the latency of one selection step at the root, both for the original
+    per-action Python loop and for the vectorized puct_select.
+A random (but fixed) policy stands in for the neural network.
+
+usage: python benchmarks/mcts_selection.py [simulations]
+"""
+import math
+import os
+import sys
+import time
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from MCTS import EPS, MCTS, puct_select
+from benchmarks.common import RandomPolicyNet
+from connect4.Connect4Game import Connect4Game
+from dotsandboxes.DotsAndBoxesGame import DotsAndBoxesGame
+from gobang.GobangGame import GobangGame
+from othello.OthelloGame import OthelloGame
+from rts.RTSGame import RTSGame
+from santorini.SantoriniGame import SantoriniGame
+from tafl.TaflGame import TaflGame
+from tictactoe.TicTacToeGame import TicTacToeGame
+from tictactoe_3d.TicTacToeGame import TicTacToeGame as TicTacToe3DGame
+from utils import dotdict
+
+GAMES = [
+    ('Othello 8x8', lambda: OthelloGame(8)),
+    ('TicTacToe', lambda: TicTacToeGame()),
+    ('TicTacToe3D', lambda: TicTacToe3DGame(3)),
+    ('Connect4', lambda: Connect4Game()),
+    ('Gobang 15x15', lambda: GobangGame(15, 5)),
+    ('Tafl Brandubh', lambda: TaflGame('Brandubh')),
+    ('DotsAndBoxes 3', lambda: DotsAndBoxesGame(3)),
+    ('Santorini', lambda: SantoriniGame(5)),
+    ('RTS', lambda: RTSGame()),
+]
+
+
+def loop_select(Q, N, P, valids, Ns, cpuct):
+    """The per-action selection loop MCTS.search used before puct_select."""
+    cur_best = -float('inf')
+    best_act = -1
+    for a in range(len(valids)):
+        if valids[a]:
+            if N[a] > 0:
+                u = Q[a] + cpuct * P[a] * math.sqrt(Ns) / (1 + N[a])
+            else:
+                u = cpuct * P[a] * math.sqrt(Ns + EPS)
+            if u > cur_best:
+                cur_best = u
+                best_act = a
+    return best_act
+
+
+def time_per_call(fn, args, repeat=200):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn(*args)
+    return (time.perf_counter() - start) / repeat
+
+
+def main():
+    sims = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    print(f'{"game":>15} {"actions":>8} {"us/sim":>10} {"loop us":>10} {"numpy us":>10} {"speedup":>8}')
+    for name, make_game in GAMES:
+        game = make_game()
+        board = game.getCanonicalForm(game.getInitBoard(), 1)
+        mcts = MCTS(game, RandomPolicyNet(game), dotdict({'numMCTSSims': sims, 'cpuct': 1.0}))
+
+        start = time.perf_counter()
+        mcts.getActionProb(board, temp=1)
+        per_sim = (time.perf_counter() - start) / sims
+
+        s = game.stringRepresentation(board)
+        root = (mcts.Qsa[s], mcts.Nsa[s], mcts.Ps[s], mcts.Vs[s], mcts.Ns[s], 1.0)
+        loop = time_per_call(loop_select, root)
+        vectorized = time_per_call(puct_select, root)
+        print(f'{name:>15} {game.getActionSize():>8} {per_sim * 1e6:>10.1f} {loop * 1e6:>10.1f} '
+              f'{vectorized * 1e6:>10.1f} {loop / vectorized:>7.1f}x')
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,58 @@
+"""
+Compares the dict-based MCTS tree store against the array-backed node table in
+ArrayMCTS. Both trees are grown with the same number of simulations from the
+initial Othello position using a random (but fixed) policy in place of a
+neural network, so the numbers only reflect the cost of the tree itself.
+
+usage: python benchmarks/mcts_tree_store.py [board size] [simulations]
+"""
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from MCTS import MCTS, ArrayMCTS
+from benchmarks.common import RandomPolicyNet
+from othello.OthelloGame import OthelloGame
+from utils import dotdict
+
+
+def run(mcts_class, game, sims):
+    board = game.getInitBoard()
+    args = dotdict({'numMCTSSims': sims, 'cpuct': 1.0})
+
+    mcts = mcts_class(game, RandomPolicyNet(game), args)
+    start = time.perf_counter()
+    mcts.getActionProb(board, temp=1)
+    elapsed = time.perf_counter() - start
+
+    # measure memory on a separate run, tracemalloc slows the search down
+    tracemalloc.start()
+    mcts = mcts_class(game, RandomPolicyNet(game), args)
+    mcts.getActionProb(board, temp=1)
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return sims / elapsed, current, len(mcts.Es)
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 8
+    sims = int(sys.argv[2]) if len(sys.argv) > 2 else 2000
+    game = OthelloGame(n)
+
+    results = {}
+    for mcts_class in (MCTS, ArrayMCTS):
+        results[mcts_class.__name__] = run(mcts_class, game, sims)
+        speed, memory, nodes = results[mcts_class.__name__]
+        print(f'{mcts_class.__name__:>10}: {speed:8.1f} sims/sec  {memory / 1024:9.1f} KiB  '
+              f'({memory / nodes:7.1f} bytes/node, {nodes} nodes)')
+
+    dict_speed, dict_memory, _ = results['MCTS']
+    array_speed, array_memory, _ = results['ArrayMCTS']
+    print(f'ArrayMCTS vs MCTS: {array_speed / dict_speed:.2f}x sims/sec, '
+          f'{1 - array_memory / dict_memory:.1%} less memory')
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+"""
+Perft for Othello: counts the positions reached from the initial position
+after every sequence of the given number of moves (passes included), through
+the OthelloGame interface, once with the bitboard engine and once with
+OthelloLogic.Board, and on the bitboards directly, which leaves out the
+conversions from and to numpy boards that the interface needs. Checks that
+all agree and reports their speed in positions/sec.
+
+usage: python benchmarks/othello_perft.py [depth] [n]
+"""
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from othello.OthelloGame import OthelloGame
+
+
+def perft(game, board, player, depth):
+    """
+    Returns the number of positions reached from board in depth moves; games
+    that end sooner count once.
+    """
+    if depth == 0:
+        return 1
+    valids = game.getValidMoves(board, player)
+    if valids[-1] and game.getGameEnded(board, player) != 0:
+        return 1
+    return sum(perft(game, *game.getNextState(board, player, action), depth - 1)
+               for action in np.flatnonzero(valids))
+
+
+def perftBits(bitboard, own, opp, depth):
+    """
+    perft on the (own, opp) bitboards of the player to move.
+    """
+    if depth == 0:
+        return 1
+    moves = bitboard.legalMoves(own, opp)
+    if not moves:
+        if not bitboard.legalMoves(opp, own):
+            return 1
+        return perftBits(bitboard, opp, own, depth - 1)
+    count = 0
+    while moves:
+        move = (moves & -moves).bit_length() - 1
+        moves &= moves - 1
+        mine, theirs = bitboard.play(own, opp, move)
+        count += perftBits(bitboard, theirs, mine, depth - 1)
+    return count
+
+
+def report(name, depth, count, elapsed):
+    print(f'{name:>18}: perft({depth}) = {count} in {elapsed:.2f} s, {count / elapsed:10.0f} positions/sec')
+
+
+def main():
+    depth = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    n = int(sys.argv[2]) if len(sys.argv) > 2 else 8
+    counts = {}
+    for name, bitboard in (('Board', False), ('bitboard', True)):
+        game = OthelloGame(n, bitboard=bitboard)
+        start = time.perf_counter()
+        counts[name] = perft(game, game.getInitBoard(), 1, depth)
+        report(name, depth, counts[name], time.perf_counter() - start)
+    start = time.perf_counter()
+    counts['bitboards directly'] = perftBits(game.bitboard, *game.bitboard.fromBoard(game.getInitBoard(), 1), depth)
+    report('bitboards directly', depth, counts['bitboards directly'], time.perf_counter() - start)
+    assert len(set(counts.values())) == 1, 'the engines disagree'
+
+
+if __name__ == "__main__":
+    main()
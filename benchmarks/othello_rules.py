@@ -0,0 +1,67 @@
+"""
+Measures the time an MCTS search of 8x8 Othello spends in the rules
+(getGameEnded, getValidMoves, getNextState, getNextHash) per expanded node,
+for OthelloLogic.Board, for the bitboard engine without its cache of move
+states (cacheSize=0), and for the bitboard engine with it. The search starts
+from the initial position, with a random (but fixed) policy in place of a
+neural network.
+
+usage: python benchmarks/othello_rules.py [simulations]
+"""
+import os
+import sys
+import time
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from MCTS import MCTS
+from benchmarks.common import RandomPolicyNet
+from othello.OthelloGame import OthelloGame
+from utils import dotdict
+
+RULES = ['getGameEnded', 'getValidMoves', 'getNextState', 'getNextHash']
+
+ENGINES = {
+    'Board': lambda: OthelloGame(8, bitboard=False),
+    'bitboard, no cache': lambda: OthelloGame(8, cacheSize=0),
+    'bitboard, cached': lambda: OthelloGame(8),
+}
+
+
+def timeRules(game):
+    """
+    Wraps the rules methods of game so that the time spent in them adds up in
+    the returned list.
+    """
+    spent = [0.]
+
+    def timed(method):
+        def call(*args):
+            start = time.perf_counter()
+            try:
+                return method(*args)
+            finally:
+                spent[0] += time.perf_counter() - start
+        return call
+
+    for name in RULES:
+        setattr(game, name, timed(getattr(game, name)))
+    return spent
+
+
+def main():
+    sims = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    for zobristHash in (False, True):
+        perNode = {}
+        for name, makeGame in ENGINES.items():
+            game = makeGame()
+            spent = timeRules(game)
+            mcts = MCTS(game, RandomPolicyNet(game), dotdict({'numMCTSSims': sims, 'cpuct': 1.0,
+                                                              'zobristHash': zobristHash}))
+            mcts.getActionProb(game.getInitBoard(), temp=1)
+            perNode[name] = spent[0] / len(mcts.Ps)
+            print(f'{name:>18}{" (zobrist)" if zobristHash else "":10}: {perNode[name] * 1e6:7.1f} us of rules '
+                  f'per node, {perNode["Board"] / perNode[name]:5.2f}x less than Board')
+
+
+if __name__ == "__main__":
+    main()
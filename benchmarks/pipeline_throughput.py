@@ -0,0 +1,71 @@
+"""
+Compares the throughput of the synchronous Coach.learn loop (self-play, then
+training, then the arena) with the asynchronous pipeline of Coach.learnAsync
+(args.asyncPipeline), on 6x6 Othello with a small PyTorch network. Both run
+the same number of iterations; reported are the examples added to the replay
+buffer per hour and the networks accepted per hour.
+
+The pipeline overlaps its processes, so it only gains when there are cores
+for the actors, the trainer and the evaluator to run on at the same time.
+
+usage: python benchmarks/pipeline_throughput.py [iterations] [self-play workers]
+"""
+import logging
+import os
+import sys
+import tempfile
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from Coach import Coach
+from othello.OthelloGame import OthelloGame
+from othello.pytorch import NNet
+from othello.pytorch.NNet import NNetWrapper
+from utils import dotdict
+
+
+class SmallNNetWrapper(NNetWrapper):
+    """
+    The Othello network with fewer channels and epochs, so the loop is not all
+    training. It sets them when it is built, which also happens in the worker
+    processes.
+    """
+
+    def __init__(self, game):
+        NNet.args.num_channels = 32
+        NNet.args.epochs = 2
+        super().__init__(game)
+
+
+def run(iterations, workers, asyncPipeline):
+    with tempfile.TemporaryDirectory() as folder:
+        args = dotdict({
+            'numIters': iterations,
+            'numEps': 4,
+            'tempThreshold': 15,
+            'updateThreshold': 0.6,
+            'maxlenOfQueue': 200000,
+            'numMCTSSims': 15,
+            'arenaCompare': 4,
+            'cpuct': 1,
+            'checkpoint': folder,
+            'numItersForTrainExamplesHistory': 20,
+            'numSelfPlayWorkers': workers,
+            'asyncPipeline': asyncPipeline,
+        })
+        game = OthelloGame(6)
+        coach = Coach(game, SmallNNetWrapper(game), args)
+        coach.learn()
+        return coach.throughput()
+
+
+def main():
+    logging.basicConfig(level=logging.WARNING)
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 3
+    workers = int(sys.argv[2]) if len(sys.argv) > 2 else os.cpu_count()
+    for name, asyncPipeline in (('synchronous', False), ('asynchronous', True)):
+        examplesPerHour, acceptedPerHour = run(iterations, workers, asyncPipeline)
+        print(f'{name:>12}: {examplesPerHour:10.0f} examples/hour, {acceptedPerHour:6.1f} accepted models/hour')
+
+
+if __name__ == "__main__":
+    main()
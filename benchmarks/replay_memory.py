@@ -0,0 +1,84 @@
+"""
+Compares the peak memory of training from the replay buffer in RAM (loaded
+and flattened into the trainExamples list, as Coach.learn does) against
+training from the memory-mapped ExampleStore (args.replayOnDisk), for growing
+lengths of the history. Every iteration holds the given number of random 8x8
+Othello examples; training samples one epoch of minibatches of 64.
+
+Each measurement runs in a fresh process and reports the growth of its peak
+resident set size, so it does not include the interpreter and numpy. Pages
+of the memory-mapped files that were read count as resident too, but unlike
+the list they are clean file pages that the OS can drop whenever it needs the
+memory.
+
+usage: python benchmarks/replay_memory.py [examples per iteration]
+"""
+import multiprocessing
+import os
+import resource
+import sys
+import tempfile
+
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from ReplayBuffer import ExampleStore, ReplayBuffer
+
+ITERATIONS = [1, 4, 16]
+BATCH_SIZE = 64
+ACTION_SIZE = 65
+
+
+def peakRSS():
+    # in kilobytes on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+def train(folder, capacity, onDisk, peak):
+    before = peakRSS()
+    if onDisk:
+        examples = ExampleStore(folder, capacity, maxChunks=max(ITERATIONS))
+        examples.load(folder)
+    else:
+        buffer = ReplayBuffer(capacity, maxChunks=max(ITERATIONS))
+        buffer.load(folder)
+        examples = buffer.examples()
+        del buffer
+    for _ in range(len(examples) // BATCH_SIZE):
+        ids = np.random.randint(len(examples), size=BATCH_SIZE)
+        if onDisk:
+            boards, pis, vs = examples.sample(ids)
+        else:
+            boards, pis, vs = list(zip(*[examples[i] for i in ids]))
+    peak.value = peakRSS() - before
+
+
+def measure(folder, capacity, onDisk):
+    context = multiprocessing.get_context('spawn')
+    peak = context.Value('l', 0)
+    process = context.Process(target=train, args=(folder, capacity, onDisk, peak))
+    process.start()
+    process.join()
+    return peak.value / 1024
+
+
+def main():
+    perIteration = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    rng = np.random.RandomState(0)
+    for iterations in ITERATIONS:
+        with tempfile.TemporaryDirectory() as folder:
+            capacity = perIteration * iterations
+            store = ExampleStore(folder, capacity, maxChunks=iterations)
+            for _ in range(iterations):
+                boards = rng.randint(-1, 2, size=(perIteration, 8, 8)).astype(np.int8)
+                pis = rng.dirichlet(np.ones(ACTION_SIZE), size=perIteration).astype(np.float32)
+                vs = rng.choice([-1., 1.], size=perIteration).astype(np.float32)
+                store.append(boards, pis, vs)
+            inRAM = measure(folder, capacity, False)
+            onDisk = measure(folder, capacity, True)
+            print(f'{iterations:3d} iterations ({capacity} examples): peak RSS +{inRAM:8.1f} MB in RAM, '
+                  f'+{onDisk:8.1f} MB memory-mapped')
+
+
+if __name__ == "__main__":
+    main()
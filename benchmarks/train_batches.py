@@ -0,0 +1,78 @@
+"""
+Compares the two ways othello/pytorch NNetWrapper.train has assembled its
+minibatches: from the list of examples, one example at a time and through
+float64 arrays (as it used to), and by indexing float32 tensors the examples
+were converted to once (as it does now). Reports the batches/sec of the
+assembly alone, and of whole training steps of the Othello network.
+
+usage: python benchmarks/train_batches.py [num_channels] [examples]
+"""
+import os
+import sys
+import time
+
+import numpy as np
+import torch
+import torch.optim as optim
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from othello.OthelloGame import OthelloGame
+from othello.pytorch import NNet
+from othello.pytorch.NNet import NNetWrapper
+
+BATCHES = 200
+STEPS = 20
+
+
+def listBatch(examples, sample_ids):
+    boards, pis, vs = list(zip(*[examples[i] for i in sample_ids]))
+    boards = torch.FloatTensor(np.array(boards).astype(np.float64))
+    target_pis = torch.FloatTensor(np.array(pis))
+    target_vs = torch.FloatTensor(np.array(vs).astype(np.float64))
+    return boards, target_pis, target_vs
+
+
+def tensorBatch(tensors, sample_ids):
+    sample_ids = torch.from_numpy(sample_ids)
+    return tuple(t[sample_ids] for t in tensors)
+
+
+def batchesPerSec(makeBatch, data, size, nnet=None, batches=BATCHES):
+    if nnet is not None:
+        optimizer = optim.Adam(nnet.nnet.parameters())
+    start = time.perf_counter()
+    for _ in range(batches):
+        boards, target_pis, target_vs = makeBatch(data, np.random.randint(size, size=NNet.args.batch_size))
+        if nnet is not None:
+            out_pi, out_v = nnet.nnet(boards)
+            total_loss = nnet.loss_pi(target_pis, out_pi) + nnet.loss_v(target_vs, out_v)
+            optimizer.zero_grad()
+            total_loss.backward()
+            optimizer.step()
+    return batches / (time.perf_counter() - start)
+
+
+def main():
+    NNet.args.num_channels = int(sys.argv[1]) if len(sys.argv) > 1 else 64
+    size = int(sys.argv[2]) if len(sys.argv) > 2 else 100000
+    game = OthelloGame(8)
+    rng = np.random.RandomState(0)
+    examples = [(rng.randint(-1, 2, size=(8, 8)), list(rng.dirichlet(np.ones(game.getActionSize()))),
+                 rng.choice([-1, 1])) for _ in range(size)]
+
+    start = time.perf_counter()
+    tensors = NNetWrapper.examples_to_tensors(examples)
+    print(f'conversion to tensors: {time.perf_counter() - start:.2f} s for {size} examples (once per train call)')
+
+    print(f'assembly only: {batchesPerSec(listBatch, examples, size):8.1f} batches/sec from the list, '
+          f'{batchesPerSec(tensorBatch, tensors, size):8.1f} batches/sec from tensors')
+    nnet = NNetWrapper(game)
+    nnet.nnet.train()
+    listed = batchesPerSec(listBatch, examples, size, nnet, STEPS)
+    indexed = batchesPerSec(tensorBatch, tensors, size, nnet, STEPS)
+    print(f'training steps ({NNet.args.num_channels} channels): {listed:8.1f} batches/sec from the list, '
+          f'{indexed:8.1f} batches/sec from tensors ({indexed / listed:.2f}x)')
+
+
+if __name__ == "__main__":
+    main()
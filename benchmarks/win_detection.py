@@ -0,0 +1,115 @@
+"""
+Compares the k-in-a-row detection of KInARow with the Python loops Connect4,
+TicTacToe and Gobang used before, on random positions (half of the cells
+filled). Reports the time per board of the loops, of KInARow.winner called on
+one board at a time, and of KInARow.winner called on the whole batch. Qubic
+(TicTacToe3D) had no general loop to compare with.
+
+usage: python benchmarks/win_detection.py [positions]
+"""
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from KInARow import KInARow
+
+
+def connect4Loops(board, k):
+    # Connect4Logic.Board.get_win_state
+    def straight(pieces):
+        runs = [pieces[:, i:i + k].sum(axis=1) for i in range(len(pieces) - k + 2)]
+        return max([x.max() for x in runs]) >= k
+
+    def diagonal(pieces):
+        for i in range(len(pieces) - k + 1):
+            for j in range(len(pieces[0]) - k + 1):
+                if all(pieces[i + x][j + x] for x in range(k)):
+                    return True
+            for j in range(k - 1, len(pieces[0])):
+                if all(pieces[i + x][j - x] for x in range(k)):
+                    return True
+        return False
+
+    for player in [-1, 1]:
+        pieces = board == -player
+        if straight(pieces) or straight(pieces.transpose()) or diagonal(pieces):
+            return -player
+    return 0
+
+
+def tictactoeLoops(board, k):
+    # TicTacToeLogic.Board.is_win, for both colours
+    n = len(board)
+    for color in (1, -1):
+        lines = [[board[x][y] for x in range(n)] for y in range(n)]
+        lines += [[board[x][y] for y in range(n)] for x in range(n)]
+        lines += [[board[d][d] for d in range(n)], [board[d][n - d - 1] for d in range(n)]]
+        for line in lines:
+            count = 0
+            for square in line:
+                if square == color:
+                    count += 1
+            if count == k:
+                return color
+    return 0
+
+
+def gobangLoops(board, n):
+    # GobangGame.getGameEnded
+    size = len(board)
+    for w in range(size):
+        for h in range(size):
+            if (w in range(size - n + 1) and board[w][h] != 0 and
+                    len(set(board[i][h] for i in range(w, w + n))) == 1):
+                return board[w][h]
+            if (h in range(size - n + 1) and board[w][h] != 0 and
+                    len(set(board[w][j] for j in range(h, h + n))) == 1):
+                return board[w][h]
+            if (w in range(size - n + 1) and h in range(size - n + 1) and board[w][h] != 0 and
+                    len(set(board[w + k][h + k] for k in range(n))) == 1):
+                return board[w][h]
+            if (w in range(size - n + 1) and h in range(n - 1, size) and board[w][h] != 0 and
+                    len(set(board[w + l][h - l] for l in range(n))) == 1):
+                return board[w][h]
+    return 0
+
+
+GAMES = {
+    'connect4': ((6, 7), 4, connect4Loops),
+    'tictactoe': ((3, 3), 3, tictactoeLoops),
+    'gobang': ((15, 15), 5, gobangLoops),
+    'qubic': ((4, 4, 4), 4, None),
+}
+
+
+def perBoard(detect, boards):
+    start = time.perf_counter()
+    winners = [detect(board) for board in boards]
+    return (time.perf_counter() - start) / len(boards), winners
+
+
+def main():
+    positions = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    rng = np.random.RandomState(0)
+    for name, (shape, k, loops) in GAMES.items():
+        boards = rng.choice([-1, 0, 1], size=(positions,) + shape, p=[0.25, 0.5, 0.25])
+        detector = KInARow.get(shape, k)
+        single, winners = perBoard(detector.winner, boards)
+        start = time.perf_counter()
+        batch = detector.winner(boards)
+        batched = (time.perf_counter() - start) / positions
+        assert list(batch) == winners
+        line = f'KInARow {single * 1e6:7.1f} us/board, batched {batched * 1e6:6.2f} us/board'
+        if loops is not None:
+            looped, expected = perBoard(lambda board: loops(board, k), boards)
+            # the loops may find either colour first where both have a row
+            assert [bool(w) for w in expected] == [bool(w) for w in winners]
+            line = f'loops {looped * 1e6:8.1f} us/board | {line} ({looped / single:.1f}x, {looped / batched:.0f}x)'
+        print(f'{name:>10}: {line}')
+
+
+if __name__ == "__main__":
+    main()
@@ -146,11 +146,41 @@ class CaptureGoGame():
                 newB = np.rot90(board, i, axes=(1, 2))
                 newPi = np.rot90(pi_board, i)
                 if j:
-                    newB = np.fliplr(newB)
+                    # flip the columns of every plane, like those of pi
+                    newB = np.flip(newB, axis=2)
                     newPi = np.fliplr(newPi)
                 l += [(newB, list(newPi.ravel()) + [pi[-1]])]
         return l
 
+    def applySymmetryBatch(self, boards, pis, ids):
+        """
+        Input:
+            boards: array of boards, of shape (batch size,) + board shape
+            pis: array of policy vectors, of shape (batch size, action size)
+            ids: array with the index of the symmetry to apply to each
+                 example, as in the list returned by getSymmetries
+
+        Returns:
+            boards, pis: the transformed boards and pis, as new arrays
+        """
+        newBoards = np.empty_like(boards)
+        newPis = np.empty_like(pis)
+        newPis[:, -1] = pis[:, -1]
+        pi_boards = np.reshape(pis[:, :-1], (len(pis),) + self.getBoardSize())
+        for k in range(8):
+            rows = ids == k
+            if not rows.any():
+                continue
+            i, j = k // 2 + 1, k % 2 == 0  # the order of getSymmetries
+            newB = np.rot90(boards[rows], i, axes=(2, 3))
+            newPi = np.rot90(pi_boards[rows], i, axes=(1, 2))
+            if j:
+                newB = np.flip(newB, axis=3)
+                newPi = np.flip(newPi, axis=2)
+            newBoards[rows] = newB
+            newPis[rows, :-1] = newPi.reshape(len(newPi), -1)
+        return newBoards, newPis
+
     def stringRepresentation(self, board):
         """
         Input:
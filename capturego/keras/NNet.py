@@ -56,6 +56,14 @@ class NNetWrapper(NeuralNet):
         # print('PREDICTION TIME TAKEN : {0:03f}'.format(time.time()-start))
         return pi[0], v[0]
 
+    def predict_batch(self, boards):
+        """
+        boards: list of np arrays with boards
+        """
+        # run
+        pi, v = self.nnet.model.predict(np.asarray(boards), verbose=False)
+        return pi, v
+
     def save_checkpoint(self, folder='checkpoint', filename='checkpoint.pth.tar'):
         # change extension
         filename = filename.split(".")[0] + ".h5"
@@ -77,3 +85,9 @@ class NNetWrapper(NeuralNet):
         if not os.path.exists(filepath):
             raise ("No model in path {}".format(filepath))
         self.nnet.model.load_weights(filepath)
+
+    def snapshot(self):
+        return self.nnet.model.get_weights()
+
+    def restore(self, snapshot):
+        self.nnet.model.set_weights(snapshot)
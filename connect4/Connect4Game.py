@@ -3,6 +3,7 @@ import numpy as np
 
 sys.path.append('..')
 from Game import Game
+from Zobrist import Zobrist
 from .Connect4Logic import Board
 
 
@@ -14,6 +15,7 @@ class Connect4Game(Game):
     def __init__(self, height=None, width=None, win_length=None, np_pieces=None):
         Game.__init__(self)
         self._base_board = Board(height, width, win_length, np_pieces)
+        self.zobrist = Zobrist(self._base_board.height * self._base_board.width)
 
     def getInitBoard(self):
         return self._base_board.np_pieces
@@ -62,6 +64,14 @@ class Connect4Game(Game):
     def stringRepresentation(self, board):
         return board.tostring()
 
+    def getHash(self, board):
+        return self.zobrist.hash(board)
+
+    def getNextHash(self, boardHash, board, action):
+        """The stone lands on the lowest empty row of the column."""
+        row = board[:, action].tolist().count(0) - 1
+        return Zobrist.negate(boardHash ^ self.zobrist.place[row * self._base_board.width + action])
+
     @staticmethod
     def display(board):
         print(" -----------------------")
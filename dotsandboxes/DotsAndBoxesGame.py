@@ -10,6 +10,28 @@ class DotsAndBoxesGame(Game):
     def __init__(self, n=3):
         self.n = n
 
+        # Zobrist keys of the lines (0 on the score and pass squares), of the
+        # scores of the player to move and of its opponent, and of the pass flag
+        rng = np.random.RandomState(0)
+        self.lineKeys = rng.randint(0, 1 << 64, size=self.getBoardSize(), dtype=np.uint64)
+        self.lineKeys[:3, -1] = 0
+        self.scoreKeys = [[int(k) for k in rng.randint(0, 1 << 64, size=n*n+1, dtype=np.uint64)] for _ in range(2)]
+        self.passKey = int(rng.randint(0, 1 << 64, dtype=np.uint64))
+
+        # for each line action: the Zobrist key of its square, and the flat
+        # indices of the other three lines of each box it borders, so that
+        # getNextHash finds the boxes it closes without building a Board
+        b = Board(n)
+        width = n + 1
+        cells = [x*width + y for x, y in (b.get_move(action) for action in range(self.getActionSize() - 1))]
+        h, v = n*(n+1), n*(n+1) + 1  # first vertical line, and the one to its right
+        boxes = [(cells[i*n + j], cells[(i+1)*n + j], cells[h + i*(n+1) + j], cells[v + i*(n+1) + j])
+                 for i in range(n) for j in range(n)]
+        self.lines = []
+        for cell in cells:
+            sides = [tuple(side for side in box if side != cell) for box in boxes if cell in box]
+            self.lines.append((int(self.lineKeys.flat[cell]), sides))
+
     def getInitBoard(self):
         # return initial board (numpy board)
         b = Board(self.n)
@@ -108,6 +130,30 @@ class DotsAndBoxesGame(Game):
         # 8x8 numpy array (canonical board)
         return board.tostring()
 
+    def getHash(self, board):
+        h = int(np.bitwise_xor.reduce(self.lineKeys[board != 0]))
+        h ^= self.scoreKeys[0][int(board[0, -1])] ^ self.scoreKeys[1][int(board[1, -1])]
+        return h ^ self.passKey if board[2, -1] else h
+
+    def getNextHash(self, boardHash, board, action):
+        cell = board.item  # a cell by its flat index, board[0, -1] being n and board[1, -1] 2n+1
+        me, opp = int(cell(self.n)), int(cell(2*self.n + 1))
+        if action == len(self.lines):
+            boardHash ^= self.passKey
+            score = 0
+        else:
+            key, boxes = self.lines[action]
+            boardHash ^= key
+            score = 0
+            for i, j, k in boxes:
+                if cell(i) and cell(j) and cell(k):
+                    score += 1
+            if score > 0:
+                boardHash ^= self.passKey
+        # the opponent moves next, so the scores swap places
+        boardHash ^= self.scoreKeys[0][me] ^ self.scoreKeys[1][opp]
+        return boardHash ^ self.scoreKeys[0][opp] ^ self.scoreKeys[1][me + score]
+
     @staticmethod
     def display(board):
         n = board.shape[1]
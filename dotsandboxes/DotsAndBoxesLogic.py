@@ -39,20 +39,20 @@ class Board():
         is_board_full = np.all(self.pieces[:self.n+1, :-1]) and np.all(self.pieces[-self.n:, :])
         return not is_board_full
 
+    def get_move(self, action):
+        """Returns the (x, y) square of the line drawn by action."""
+        if action < self.n*(self.n+1):
+            return (int(action / self.n), action % self.n)
+        action -= self.n*(self.n+1)
+        return (int(action / (self.n+1)) + self.n + 1, action % (self.n+1))
+
     def execute_move(self, action, color=1):
         """Perform the given move on the board; 
         color gives the color pf the piece to play (1=white,-1=black)
         """
         assert self.is_pass_on() == 0
 
-        is_horizontal = action < self.n*(self.n+1)
-        if is_horizontal:
-            move = (int(action / self.n), action % self.n)
-        else:
-            action -= self.n*(self.n+1)
-            move = (int(action / (self.n+1)) + self.n + 1, action % (self.n+1))
-
-        (x, y) = move
+        (x, y) = self.get_move(action)
 
         # Add the piece to the empty square.
         assert self[x][y] == 0
@@ -60,6 +60,16 @@ class Board():
 
         # Need to check if we have closed a square
         # If so, increase score and mark pass
+        score = self.count_closed_boxes(action)
+        self.increase_score(score, color)
+        self.toggle_pass(score > 0)
+
+    def count_closed_boxes(self, action):
+        """Returns the number of boxes the line drawn by action closes. The
+        line itself does not need to be on the board yet."""
+        is_horizontal = action < self.n*(self.n+1)
+        (x, y) = self.get_move(action)
+
         horizontal = np.zeros((self.n+3, self.n+2))
         horizontal[1:-1, 1:-1] = self.pieces[:self.n+1, :self.n]
 
@@ -81,6 +91,4 @@ class Board():
                 score += (horizontal[x][y] and horizontal[x+1][y])
             if vertical[x, y-1]:
                 score += (horizontal[x][y-1] and horizontal[x+1][y-1])
-
-        self.increase_score(score, color)
-        self.toggle_pass(score > 0)
+        return score
@@ -66,6 +66,17 @@ class NNetWrapper(NeuralNet):
 
         return pi[0], v[0]
 
+    def predict_batch(self, boards):
+        """
+        boards: list of np arrays with boards
+        """
+        boards = np.array(boards)
+        normalize_score(boards)
+
+        pi, v = self.nnet.model.predict(boards, verbose=False)
+
+        return pi, v
+
     def save_checkpoint(self, folder='checkpoint', filename='checkpoint.pth.tar'):
         # change extension
         filename = filename.split(".")[0] + ".h5"
@@ -84,3 +95,9 @@ class NNetWrapper(NeuralNet):
         
         filepath = os.path.join(folder, filename)
         self.nnet.model.load_weights(filepath)
+
+    def snapshot(self):
+        return self.nnet.model.get_weights()
+
+    def restore(self, snapshot):
+        self.nnet.model.set_weights(snapshot)
@@ -1,15 +1,24 @@
 from __future__ import print_function
 import sys
+from collections import OrderedDict
 sys.path.append('..')
 from Game import Game
+from KInARow import KInARow
+from Zobrist import Zobrist
 from .GobangLogic import Board
 import numpy as np
 
 
 class GobangGame(Game):
-    def __init__(self, n=15, nir=5):
+    # the 4 directions a row can run in, as (x,y) offsets
+    directions = [(1, 0), (0, 1), (1, 1), (1, -1)]
+
+    def __init__(self, n=15, nir=5, cacheSize=4096):
         self.n = n
         self.n_in_row = nir
+        self.zobrist = Zobrist(n * n)
+        self.cacheSize = cacheSize  # winners kept by getNextState, 0 to keep none
+        self.winners = OrderedDict()  # board bytes -> winner, least recently used first
 
     def getInitBoard(self):
         # return initial board (numpy board)
@@ -29,52 +38,74 @@ class GobangGame(Game):
         # action must be a valid move
         if action == self.n * self.n:
             return (board, -player)
-        b = Board(self.n)
-        b.pieces = np.copy(board)
-        move = (int(action / self.n), action % self.n)
-        b.execute_move(move, player)
-        return (b.pieces, -player)
+        x, y = int(action / self.n), action % self.n
+        assert board[x][y] == 0
+        parent = self.winners.get(board.tobytes()) if self.cacheSize else None
+        board = np.copy(board)
+        board[x][y] = player
+        if parent == 0:
+            # the board had no row, so one can only have been completed by
+            # the stone just placed
+            self.rememberWinner(board, player if self.completesRow(board, x, y) else 0)
+        elif self.cacheSize:
+            # a board we did not make (or that was already won)
+            self.rememberWinner(board, self.scanWinner(board))
+        return (board, -player)
 
     # modified
     def getValidMoves(self, board, player):
         # return a fixed size binary vector
-        valids = [0] * self.getActionSize()
-        b = Board(self.n)
-        b.pieces = np.copy(board)
-        legalMoves = b.get_legal_moves(player)
-        if len(legalMoves) == 0:
+        valids = np.zeros(self.getActionSize(), dtype=int)
+        valids[:-1] = np.ravel(board) == 0
+        if not valids.any():
             valids[-1] = 1
-            return np.array(valids)
-        for x, y in legalMoves:
-            valids[self.n * x + y] = 1
-        return np.array(valids)
+        return valids
+
+    def completesRow(self, board, x, y):
+        """Returns True if the stone on (x,y) is part of n_in_row stones of its
+        colour in a row."""
+        color = board[x][y]
+        for dx, dy in self.directions:
+            count = 1
+            for sign in (1, -1):
+                i, j = x + sign * dx, y + sign * dy
+                while 0 <= i < self.n and 0 <= j < self.n and board[i][j] == color:
+                    count += 1
+                    i, j = i + sign * dx, j + sign * dy
+            if count >= self.n_in_row:
+                return True
+        return False
+
+    def rememberWinner(self, board, winner):
+        # the canonical form of the board for the other player is remembered
+        # too, so that getGameEnded finds it whichever form it is asked about
+        for key, value in ((board.tobytes(), winner), ((-board).tobytes(), -winner)):
+            self.winners[key] = value
+            self.winners.move_to_end(key)
+        while len(self.winners) > self.cacheSize:
+            self.winners.popitem(last=False)
 
     # modified
     def getGameEnded(self, board, player):
         # return 0 if not ended, 1 if player 1 won, -1 if player 1 lost
         # player = 1
-        b = Board(self.n)
-        b.pieces = np.copy(board)
-        n = self.n_in_row
-
-        for w in range(self.n):
-            for h in range(self.n):
-                if (w in range(self.n - n + 1) and board[w][h] != 0 and
-                        len(set(board[i][h] for i in range(w, w + n))) == 1):
-                    return board[w][h]
-                if (h in range(self.n - n + 1) and board[w][h] != 0 and
-                        len(set(board[w][j] for j in range(h, h + n))) == 1):
-                    return board[w][h]
-                if (w in range(self.n - n + 1) and h in range(self.n - n + 1) and board[w][h] != 0 and
-                        len(set(board[w + k][h + k] for k in range(n))) == 1):
-                    return board[w][h]
-                if (w in range(self.n - n + 1) and h in range(n - 1, self.n) and board[w][h] != 0 and
-                        len(set(board[w + l][h - l] for l in range(n))) == 1):
-                    return board[w][h]
-        if b.has_legal_moves():
+        key = board.tobytes()
+        winner = self.winners.get(key)
+        if winner is None:
+            winner = self.scanWinner(board)
+        else:
+            self.winners.move_to_end(key)
+        if winner != 0:
+            return winner
+        if (board == 0).any():
             return 0
         return 1e-4
 
+    def scanWinner(self, board):
+        """Returns the colour with n_in_row stones in a row on board, or 0,
+        for boards getNextState did not make."""
+        return KInARow.get(board.shape, self.n_in_row).winner(board)
+
     def getCanonicalForm(self, board, player):
         # return state if player==1, else return -state if player==-1
         return player * board
@@ -100,6 +131,14 @@ class GobangGame(Game):
         # 8x8 numpy array (canonical board)
         return board.tostring()
 
+    def getHash(self, board):
+        return self.zobrist.hash(board)
+
+    def getNextHash(self, boardHash, board, action):
+        if action == self.n * self.n:
+            return Zobrist.negate(boardHash)
+        return Zobrist.negate(boardHash ^ self.zobrist.place[action])
+
     @staticmethod
     def display(board):
         n = board.shape[0]
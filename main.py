@@ -14,17 +14,47 @@ coloredlogs.install(level='INFO')  # Change this to DEBUG to see more info.
 args = dotdict({
     'numIters': 1000,
     'numEps': 100,              # Number of complete self-play games to simulate during a new iteration.
+    'numSelfPlayWorkers': 1,    # Number of processes playing the self-play games in parallel (1 plays them in this process).
+    'asyncPipeline': False,     # Play self-play games, train and evaluate new nets at the same time, in separate processes.
+    'useInferenceServer': False,  # Let the self-play workers share one network that evaluates their boards in batches.
+    'inferenceBatchSize': 8,    # Maximum number of boards the inference server evaluates at once.
+    'inferenceMaxWait': 0.005,  # Maximum time (in seconds) the inference server waits for a batch to fill up.
     'tempThreshold': 15,        #
     'updateThreshold': 0.6,     # During arena playoff, new neural net will be accepted if threshold or more of games are won.
     'maxlenOfQueue': 200000,    # Number of game examples to train the neural networks.
     'numMCTSSims': 25,          # Number of games moves for MCTS to simulate.
     'arenaCompare': 40,         # Number of games to play during arena play to determine if new net will be accepted.
+    'numArenaWorkers': 1,       # Number of processes playing the arena games in parallel (1 plays them in this process).
+    'arenaLockStepGames': 1,    # Number of arena games played in lock-step, sharing batched network evaluations (1 disables it).
+    'sprtGating': False,        # Stop the arena as soon as a sequential probability ratio test decides on the new net.
+    'sprtDelta': 0.1,           # The SPRT tests a win rate of updateThreshold - sprtDelta against updateThreshold + sprtDelta.
+    'sprtAlpha': 0.05,          # Probability that the SPRT accepts a net at the lower win rate.
+    'sprtBeta': 0.05,           # Probability that the SPRT rejects a net at the higher win rate.
     'cpuct': 1,
+    'reuseTree': False,         # Keep the searched subtree of the move played (and drop the rest of the tree) between moves.
+    'mctsBatchSize': 1,         # Number of MCTS leaves evaluated together in one batched forward pass (1 disables batching).
+    'maxTreeNodes': None,       # Maximum number of expanded MCTS nodes kept in memory (None for no limit).
+    'maxTreeBytes': None,       # Approximate memory budget of the MCTS tree in bytes (None for no limit).
+    'evictionPolicy': 'lru',    # Which nodes are evicted when the tree is over budget: 'lru' or 'visits'.
+    'zobristHash': False,       # Key the MCTS nodes on the game's incremental Zobrist hash instead of its string representation.
+    'dirichletAlpha': 0.3,      # Concentration of the Dirichlet noise added to the root prior in self-play.
+    'dirichletEpsilon': 0,      # Weight of that noise (0 disables it, AlphaZero uses 0.25).
+    'fullSearchProb': 1,        # Probability that a self-play move gets a full, recorded search (KataGo uses 0.25).
+    'numFastSims': 5,           # Number of MCTS simulations of the other, unrecorded self-play moves.
+    'earlyStop': False,         # Stop temp=0 searches (e.g. in the arena) once the best move can no longer change.
+    'asyncCheckpoints': True,   # Write the best/checkpoint_i files on a background thread instead of waiting for them.
+    'saveTrainingState': False, # Save what is needed to resume (network, optimizer, replay chunks, RNG) to checkpoint/state every iteration.
 
     'checkpoint': './temp/',
     'load_model': False,
+    'resume': False,            # Resume from the training state saved in checkpoint/state (see saveTrainingState) instead of load_model.
     'load_folder_file': ('/dev/models/8x100x50','best.pth.tar'),
     'numItersForTrainExamplesHistory': 20,
+    'replayBufferSize': None,   # Maximum number of examples kept for training (None for maxlenOfQueue * numItersForTrainExamplesHistory).
+    'replayBoardDtype': 'int8', # dtype the replay buffer stores the boards with (None keeps the dtype of the game's boards).
+    'replayPiDtype': 'float32', # dtype it stores the policies with ('float16' halves their memory).
+    'replayOnDisk': False,      # Keep the replay buffer in memory-mapped files of checkpoint/replay instead of RAM (needs a NNet.train that samples from it, e.g. othello/pytorch).
+    'lazySymmetries': False,    # Record each self-play position once and apply a random symmetry when it is sampled for training (needs a NNet.train that samples from the replay buffer).
 
 })
 
@@ -36,18 +66,18 @@ def main():
     log.info('Loading %s...', nn.__name__)
     nnet = nn(g)
 
-    if args.load_model:
-        log.info('Loading checkpoint "%s/%s"...', args.load_folder_file[0], args.load_folder_file[1])
-        nnet.load_checkpoint(args.load_folder_file[0], args.load_folder_file[1])
-    else:
-        log.warning('Not loading a checkpoint!')
-
     log.info('Loading the Coach...')
     c = Coach(g, nnet, args)
 
-    if args.load_model:
+    if args.resume and c.loadTrainingState(args.checkpoint):
+        log.info('Resuming the training state saved in "%s"', args.checkpoint)
+    elif args.load_model:
+        log.info('Loading checkpoint "%s/%s"...', args.load_folder_file[0], args.load_folder_file[1])
+        nnet.load_checkpoint(args.load_folder_file[0], args.load_folder_file[1])
         log.info("Loading 'trainExamples' from file...")
         c.loadTrainExamples()
+    else:
+        log.warning('Not loading a checkpoint!')
 
     log.info('Starting the learning process 🎉')
     c.learn()
@@ -0,0 +1,114 @@
+'''
+Bitboard move generation for Othello boards of up to 8x8.
+
+A position is held as two ints whose bit n*x+y is set when square (x,y) holds
+a piece of the player to move (own) or of the opponent (opp); bit n*x+y is
+also the index of the action playing on (x,y). Legal moves and flips of all
+squares are computed at once, eight directions at a time, with shifts and
+masks (Kogge-Stone occluded fills) instead of walking the board square by
+square like OthelloLogic.Board does.
+'''
+import numpy as np
+
+
+class Bitboard():
+
+    # the 8 directions, as (x,y) offsets
+    directions = [(1,1),(1,0),(1,-1),(0,-1),(-1,-1),(-1,0),(-1,1),(0,1)]
+
+    def __init__(self, n):
+        assert n*n <= 64, 'bitboards hold boards of up to 8x8'
+        self.n = n
+        self.full = (1 << n*n) - 1
+        column = [sum(1 << n*x+y for x in range(n)) for y in range(n)]
+        self.shifts = []
+        for dx, dy in self.directions:
+            # squares a piece may move to by one step in this direction
+            mask = self.full
+            if dy == 1:
+                mask &= ~column[0]
+            elif dy == -1:
+                mask &= ~column[n-1]
+            self.shifts.append((n*dx + dy, mask))
+
+    def fromBoard(self, board, player):
+        """Returns the (own, opp) bitboards of a numpy board, own being the
+        pieces of player."""
+        cells = np.ravel(board)
+        return self.pack(cells == player), self.pack(cells == -player)
+
+    def toBoard(self, own, opp, player):
+        """Returns the numpy board of the (own, opp) bitboards of player."""
+        cells = player*self.unpack(own) - player*self.unpack(opp)
+        return cells.reshape(self.n, self.n)
+
+    @staticmethod
+    def pack(cells):
+        return int.from_bytes(np.packbits(cells, bitorder='little').tobytes(), 'little')
+
+    def unpack(self, bits):
+        packed = np.frombuffer(bits.to_bytes(8, 'little'), dtype=np.uint8)
+        return np.unpackbits(packed, count=self.n*self.n, bitorder='little').astype(int)
+
+    @staticmethod
+    def squares(bits):
+        """Returns the indices of the bits set in bits, lowest first."""
+        squares = []
+        while bits:
+            low = bits & -bits
+            squares.append(low.bit_length() - 1)
+            bits ^= low
+        return squares
+
+    @staticmethod
+    def shift(bits, step, mask):
+        if step > 0:
+            return (bits << step) & mask
+        return (bits >> -step) & mask
+
+    def fill(self, gen, pro, step, mask):
+        """Returns gen extended by the runs of pro that follow it in the
+        direction of step (the occluded fill of gen through pro)."""
+        shift = self.shift
+        pro &= mask
+        gen |= pro & shift(gen, step, mask)
+        pro &= shift(pro, step, mask)
+        gen |= pro & shift(gen, 2*step, mask)
+        pro &= shift(pro, 2*step, mask)
+        gen |= pro & shift(gen, 4*step, mask)
+        return gen
+
+    def legalMoves(self, own, opp):
+        """Returns the bitboard of the squares the player of own may play on."""
+        empty = self.full & ~(own | opp)
+        moves = 0
+        for step, mask in self.shifts:
+            run = self.fill(own, opp, step, mask) & opp
+            moves |= self.shift(run, step, mask) & empty
+        return moves
+
+    def flips(self, own, opp, move):
+        """Returns the bitboard of the opponent pieces that playing on square
+        move turns over; 0 if the move is illegal."""
+        square = 1 << int(move)
+        flips = 0
+        for step, mask in self.shifts:
+            if not self.shift(square, step, mask) & opp:
+                continue
+            run = self.fill(square, opp, step, mask)
+            if self.shift(run, step, mask) & own:
+                flips |= run & ~square
+        return flips
+
+    def play(self, own, opp, move, flips=None):
+        """Plays on square move and returns the (own, opp) bitboards after it,
+        still from the point of view of the player who moved. flips are those
+        of the move, if they are already known."""
+        if flips is None:
+            flips = self.flips(own, opp, move)
+        assert flips
+        return own | flips | 1 << int(move), opp & ~flips
+
+    @staticmethod
+    def count(bits):
+        return bin(bits).count('1')
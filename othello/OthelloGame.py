@@ -1,10 +1,17 @@
 from __future__ import print_function
 import sys
+from collections import OrderedDict, namedtuple
 sys.path.append('..')
 from Game import Game
+from Zobrist import Zobrist
+from .OthelloBitboard import Bitboard
 from .OthelloLogic import Board
 import numpy as np
 
+# The rules state of a position: the bitboards of the +1 and -1 pieces, the
+# squares each side may play on, and the disc count of +1 minus that of -1.
+MoveState = namedtuple('MoveState', ['white', 'black', 'whiteMoves', 'blackMoves', 'diff'])
+
 class OthelloGame(Game):
     square_content = {
         -1: "X",
@@ -16,8 +23,52 @@ class OthelloGame(Game):
     def getSquarePiece(piece):
         return OthelloGame.square_content[piece]
 
-    def __init__(self, n):
+    def __init__(self, n, bitboard=True, cacheSize=4096):
         self.n = n
+        self.zobrist = Zobrist(n*n)
+        # rules engine on bitboards, or None to use OthelloLogic.Board
+        self.bitboard = Bitboard(n) if bitboard and n*n <= 64 else None
+        self.cacheSize = cacheSize  # MoveStates kept by moveState, 0 to keep none
+        self.moveStates = OrderedDict()  # board bytes -> MoveState, least recently used first
+        self.lastMove = (None, 0, None, 0)  # (board, player, action, flips) of the last getNextState, see flips
+
+    def moveState(self, board):
+        """
+        Returns the MoveState of board. The states of the last cacheSize boards
+        asked for are kept, so that getGameEnded, getValidMoves, getNextState
+        and getNextHash on the same board generate its moves only once.
+        """
+        key = board.tobytes()
+        state = self.moveStates.get(key)
+        if state is not None:
+            self.moveStates.move_to_end(key)
+            return state
+        white, black = self.bitboard.fromBoard(board, 1)
+        state = MoveState(white, black, self.bitboard.legalMoves(white, black),
+                          self.bitboard.legalMoves(black, white),
+                          self.bitboard.count(white) - self.bitboard.count(black))
+        if self.cacheSize:
+            self.moveStates[key] = state
+            if len(self.moveStates) > self.cacheSize:
+                self.moveStates.popitem(last=False)
+        return state
+
+    def flips(self, board, player, action):
+        """
+        Returns the bitboard of the pieces player turns over by playing action
+        on board. The flips of the last move getNextState played are kept
+        (boards are never changed in place), as MCTS then asks getNextHash
+        for that same move.
+        """
+        board_, player_, action_, flips = self.lastMove
+        if board_ is board and player_ == player and action_ == action:
+            return flips
+        return self.bitboard.flips(*self.sides(self.moveState(board), player), action)
+
+    @staticmethod
+    def sides(state, player):
+        # (own, opp) bitboards of player
+        return (state.white, state.black) if player == 1 else (state.black, state.white)
 
     def getInitBoard(self):
         # return initial board (numpy board)
@@ -37,6 +88,12 @@ class OthelloGame(Game):
         # action must be a valid move
         if action == self.n*self.n:
             return (board, -player)
+        if self.bitboard:
+            own, opp = self.sides(self.moveState(board), player)
+            flips = self.bitboard.flips(own, opp, action)
+            self.lastMove = (board, player, action, flips)
+            own, opp = self.bitboard.play(own, opp, action, flips)
+            return (self.bitboard.toBoard(own, opp, player), -player)
         b = Board(self.n)
         b.pieces = np.copy(board)
         move = (int(action/self.n), action%self.n)
@@ -45,6 +102,15 @@ class OthelloGame(Game):
 
     def getValidMoves(self, board, player):
         # return a fixed size binary vector
+        if self.bitboard:
+            state = self.moveState(board)
+            moves = state.whiteMoves if player == 1 else state.blackMoves
+            valids = np.zeros(self.getActionSize(), dtype=int)
+            if moves:
+                valids[:-1] = self.bitboard.unpack(moves)
+            else:
+                valids[-1] = 1
+            return valids
         valids = [0]*self.getActionSize()
         b = Board(self.n)
         b.pieces = np.copy(board)
@@ -59,6 +125,13 @@ class OthelloGame(Game):
     def getGameEnded(self, board, player):
         # return 0 if not ended, 1 if player 1 won, -1 if player 1 lost
         # player = 1
+        if self.bitboard:
+            state = self.moveState(board)
+            if state.whiteMoves or state.blackMoves:
+                return 0
+            if player*state.diff > 0:
+                return 1
+            return -1
         b = Board(self.n)
         b.pieces = np.copy(board)
         if b.has_legal_moves(player):
@@ -92,11 +165,32 @@ class OthelloGame(Game):
     def stringRepresentation(self, board):
         return board.tostring()
 
+    def getHash(self, board):
+        return self.zobrist.hash(board)
+
+    def getNextHash(self, boardHash, board, action):
+        if action == self.n*self.n:
+            return Zobrist.negate(boardHash)
+        boardHash ^= self.zobrist.place[action]
+        if self.bitboard:
+            for square in self.bitboard.squares(self.flips(board, 1, action)):
+                boardHash ^= self.zobrist.flip[square]
+            return Zobrist.negate(boardHash)
+        b = Board(self.n)
+        b.pieces = board
+        move = (int(action/self.n), action%self.n)
+        for x, y in b.get_flips(move, 1):
+            if (x, y) != move:
+                boardHash ^= self.zobrist.flip[self.n*x+y]
+        return Zobrist.negate(boardHash)
+
     def stringRepresentationReadable(self, board):
         board_s = "".join(self.square_content[square] for row in board for square in row)
         return board_s
 
     def getScore(self, board, player):
+        if self.bitboard:
+            return player*self.moveState(board).diff
         b = Board(self.n)
         b.pieces = np.copy(board)
         return b.countDiff(player)
@@ -106,13 +106,19 @@ class Board():
 
         # Add the piece to the empty square.
         # print(move)
-        flips = [flip for direction in self.__directions
-                      for flip in self._get_flips(move, direction, color)]
+        flips = self.get_flips(move, color)
         assert len(list(flips))>0
         for x, y in flips:
             #print(self[x][y],color)
             self[x][y] = color
 
+    def get_flips(self, move, color):
+        """Returns the set of squares that playing move with the given color
+        sets to color, move itself included. Empty if the move is illegal.
+        """
+        return {flip for direction in self.__directions
+                     for flip in self._get_flips(move, direction, color)}
+
     def _discover_move(self, origin, direction):
         """ Returns the endpoint for a legal move, starting at the given origin,
         moving by the given increment."""
@@ -1,3 +1,4 @@
+import copy
 import os
 import sys
 import time
@@ -8,6 +9,7 @@ from tqdm import tqdm
 sys.path.append('../../')
 from utils import *
 from NeuralNet import NeuralNet
+from ReplayBuffer import ReplayBuffer
 
 import torch
 import torch.optim as optim
@@ -32,12 +34,19 @@ class NNetWrapper(NeuralNet):
 
         if args.cuda:
             self.nnet.cuda()
+        # kept across train calls, and saved with the training state
+        self.optimizer = optim.Adam(self.nnet.parameters())
 
     def train(self, examples):
         """
-        examples: list of examples, each example is of form (board, pi, v)
+        examples: list of examples, each example is of form (board, pi, v),
+                  or a ReplayBuffer (e.g. an ExampleStore) to sample them from
         """
-        optimizer = optim.Adam(self.nnet.parameters())
+        optimizer = self.optimizer
+        if not isinstance(examples, ReplayBuffer):
+            # convert the examples to contiguous float32 tensors once, the
+            # minibatches are then taken from them by indexing
+            all_boards, all_pis, all_vs = self.examples_to_tensors(examples)
 
         for epoch in range(args.epochs):
             print('EPOCH ::: ' + str(epoch + 1))
@@ -50,10 +59,12 @@ class NNetWrapper(NeuralNet):
             t = tqdm(range(batch_count), desc='Training Net')
             for _ in t:
                 sample_ids = np.random.randint(len(examples), size=args.batch_size)
-                boards, pis, vs = list(zip(*[examples[i] for i in sample_ids]))
-                boards = torch.FloatTensor(np.array(boards).astype(np.float64))
-                target_pis = torch.FloatTensor(np.array(pis))
-                target_vs = torch.FloatTensor(np.array(vs).astype(np.float64))
+                if isinstance(examples, ReplayBuffer):
+                    boards, target_pis, target_vs = (torch.from_numpy(np.asarray(a, dtype=np.float32))
+                                                     for a in examples.sample(sample_ids))
+                else:
+                    sample_ids = torch.from_numpy(sample_ids)
+                    boards, target_pis, target_vs = all_boards[sample_ids], all_pis[sample_ids], all_vs[sample_ids]
 
                 # predict
                 if args.cuda:
@@ -75,6 +86,15 @@ class NNetWrapper(NeuralNet):
                 total_loss.backward()
                 optimizer.step()
 
+    @staticmethod
+    def examples_to_tensors(examples):
+        """
+        examples: list of examples, each example is of form (board, pi, v)
+
+        Returns the boards, pis and vs of all examples as float32 tensors.
+        """
+        return tuple(torch.from_numpy(np.array([e[k] for e in examples], dtype=np.float32)) for k in range(3))
+
     def predict(self, board):
         """
         board: np array with board
@@ -93,6 +113,20 @@ class NNetWrapper(NeuralNet):
         # print('PREDICTION TIME TAKEN : {0:03f}'.format(time.time()-start))
         return torch.exp(pi).data.cpu().numpy()[0], v.data.cpu().numpy()[0]
 
+    def predict_batch(self, boards):
+        """
+        boards: list of np arrays with boards
+        """
+        # preparing input
+        boards = torch.FloatTensor(np.array(boards).astype(np.float64))
+        if args.cuda: boards = boards.contiguous().cuda()
+        boards = boards.view(-1, self.board_x, self.board_y)
+        self.nnet.eval()
+        with torch.no_grad():
+            pi, v = self.nnet(boards)
+
+        return torch.exp(pi).data.cpu().numpy(), v.data.cpu().numpy()
+
     def loss_pi(self, targets, outputs):
         return -torch.sum(targets * outputs) / targets.size()[0]
 
@@ -118,3 +152,35 @@ class NNetWrapper(NeuralNet):
         map_location = None if args.cuda else 'cpu'
         checkpoint = torch.load(filepath, map_location=map_location)
         self.nnet.load_state_dict(checkpoint['state_dict'])
+
+    def save_training_state(self, folder, filename):
+        os.makedirs(folder, exist_ok=True)
+        state = {
+            'state_dict': self.nnet.state_dict(),
+            'optimizer': self.optimizer.state_dict(),
+            # dropout draws from the torch generators
+            'rng': torch.get_rng_state(),
+        }
+        if args.cuda:
+            state['cudaRng'] = torch.cuda.get_rng_state_all()
+        torch.save(state, os.path.join(folder, filename))
+
+    def load_training_state(self, folder, filename):
+        map_location = None if args.cuda else 'cpu'
+        checkpoint = torch.load(os.path.join(folder, filename), map_location=map_location)
+        self.nnet.load_state_dict(checkpoint['state_dict'])
+        self.optimizer.load_state_dict(checkpoint['optimizer'])
+        torch.set_rng_state(checkpoint['rng'].cpu())
+        if args.cuda and 'cudaRng' in checkpoint:
+            torch.cuda.set_rng_state_all([state.cpu() for state in checkpoint['cudaRng']])
+
+    def snapshot(self):
+        return {
+            'state_dict': {k: v.detach().clone() for k, v in self.nnet.state_dict().items()},
+            'optimizer': copy.deepcopy(self.optimizer.state_dict()),
+        }
+
+    def restore(self, snapshot):
+        self.nnet.load_state_dict(snapshot['state_dict'])
+        # copied again, load_state_dict may keep the tensors it is given
+        self.optimizer.load_state_dict(copy.deepcopy(snapshot['optimizer']))
@@ -72,6 +72,18 @@ class NNetWrapper(NeuralNet):
         pi, v = self.nnet.model.predict(board, verbose=False)
         return pi[0], v[0]
 
+    def predict_batch(self, boards):
+        """
+        Predicts actions for many boards with one forward pass.
+        :param boards: list of specific boards
+        :return: arrays of predicted actions and win predictions (Pi, V), one row per board
+        """
+        boards = np.asarray([self.encoder.encode(board) for board in boards])
+
+        # run
+        pi, v = self.nnet.model.predict(boards, verbose=False)
+        return pi, v
+
     def save_checkpoint(self, folder='checkpoint', filename='checkpoint.pth.tar'):
         # change extension
         filename = filename.split(".")[0] + ".h5"
@@ -90,3 +102,9 @@ class NNetWrapper(NeuralNet):
         
         filepath = os.path.join(folder, filename)
         self.nnet.model.load_weights(filepath)
+
+    def snapshot(self):
+        return self.nnet.model.get_weights()
+
+    def restore(self, snapshot):
+        self.nnet.model.set_weights(snapshot)
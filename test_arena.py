@@ -0,0 +1,148 @@
+"""
+Unit tests for Arena.py, played with simple deterministic TicTacToe players
+so no deep learning framework is required.
+
+To run tests:
+python -m pytest test_arena.py
+"""
+
+import unittest
+
+import numpy as np
+
+from Arena import Arena, BatchedArena, MCTSPlayer, SPRT
+from othello.OthelloGame import OthelloGame
+from test_mcts import FixedPolicyNet
+from tictactoe.TicTacToeGame import TicTacToeGame
+from utils import dotdict
+
+
+class FirstValidPlayer():
+    def __init__(self, game):
+        self.game = game
+
+    def play(self, board):
+        return int(np.argmax(self.game.getValidMoves(board, 1)))
+
+
+class MiddleValidPlayer():
+    def __init__(self, game):
+        self.game = game
+
+    def play(self, board):
+        valids = np.flatnonzero(self.game.getValidMoves(board, 1))
+        return int(valids[len(valids) // 2])
+
+
+class PlayerFactory():
+    """Builds the player of a worker process, see Arena.playGamesParallel."""
+
+    def __init__(self, playerClass, game):
+        self.playerClass = playerClass
+        self.game = game
+
+    def __call__(self):
+        return self.playerClass(self.game).play
+
+
+class BatchRecordingNet(FixedPolicyNet):
+    """A FixedPolicyNet that records the size of its batches."""
+
+    def __init__(self, game):
+        super().__init__(game)
+        self.batchSizes = []
+
+    def predict_batch(self, boards):
+        self.batchSizes.append(len(boards))
+        return super().predict_batch(boards)
+
+
+class TestArena(unittest.TestCase):
+
+    def test_parallel_games_match_serial_games(self):
+        game = TicTacToeGame()
+        arena = Arena(FirstValidPlayer(game).play, MiddleValidPlayer(game).play, game)
+        serial = arena.playGames(6)
+        # FirstValidPlayer wins with both colours
+        self.assertEqual(serial, (6, 0, 0))
+
+        arena = Arena(FirstValidPlayer(game).play, MiddleValidPlayer(game).play, game)
+        factories = (PlayerFactory(FirstValidPlayer, game), PlayerFactory(MiddleValidPlayer, game))
+        self.assertEqual(arena.playGames(6, numWorkers=2, playerFactories=factories), serial)
+        factories = factories[::-1]
+        self.assertEqual(arena.playGames(6, numWorkers=2, playerFactories=factories), (0, 6, 0))
+
+    def test_parallel_games_need_factories(self):
+        game = TicTacToeGame()
+        arena = Arena(FirstValidPlayer(game).play, MiddleValidPlayer(game).play, game)
+        with self.assertRaises(ValueError):
+            arena.playGames(2, numWorkers=2)
+
+    def test_lock_step_games_match_serial_games(self):
+        game = OthelloGame(6)
+        args = dotdict({'numMCTSSims': 10, 'cpuct': 1.0})
+        nnet1, nnet2 = FixedPolicyNet(game), FixedPolicyNet(game)
+        nnet2.predict = lambda board: (np.ones(game.getActionSize()), 0.)
+
+        # one lock-step game at a time keeps its trees across games, like MCTSPlayers
+        np.random.seed(0)
+        player1, player2 = MCTSPlayer(game, nnet1, args), MCTSPlayer(game, nnet2, args)
+        serial = Arena(player1, player2, game).playGames(4)
+
+        np.random.seed(0)
+        self.assertEqual(BatchedArena(nnet1, nnet2, game, args, numGames=1).playGames(4), serial)
+
+        # 8 games on 2 pairs of trees: each tree searched the moves of several games
+        arena = BatchedArena(nnet1, nnet2, game, args, numGames=2)
+        arena.playGames(8)
+        self.assertEqual(len(arena.trees), 2)
+        for mcts in (mcts for trees in arena.trees for mcts in trees):
+            self.assertGreater(mcts.searches, game.n * game.n)
+
+    def test_lock_step_games_share_batches(self):
+        game = OthelloGame(6)
+        args = dotdict({'numMCTSSims': 10, 'cpuct': 1.0, 'mctsBatchSize': 2})
+        nnet1, nnet2 = BatchRecordingNet(game), BatchRecordingNet(game)
+        self.assertEqual(sum(BatchedArena(nnet1, nnet2, game, args, numGames=4).playGames(6)), 6)
+        # up to 4 games for a network to move in at a time, 2 leaves each
+        batchSizes = nnet1.batchSizes + nnet2.batchSizes
+        self.assertGreater(max(batchSizes), 2)
+        self.assertLessEqual(max(batchSizes), 8)
+
+    def test_sprt(self):
+        sprt = SPRT(0.5, 0.7)
+        # a win of player2 adds log(1.4), the upper bound is log(19)
+        for _ in range(8):
+            self.assertIsNone(sprt.update(-1))
+        self.assertTrue(sprt.update(-1))
+        # draws do not count
+        sprt = SPRT(0.5, 0.7)
+        for _ in range(5):
+            self.assertIsNone(sprt.update(1e-4))
+            self.assertIsNone(sprt.update(1))
+        self.assertFalse(sprt.update(1))
+        self.assertEqual(sprt.games, 11)
+        self.assertEqual(len(sprt.trace), 11)
+
+    def test_sprt_stops_the_games(self):
+        game = TicTacToeGame()
+        factories = (PlayerFactory(FirstValidPlayer, game), PlayerFactory(MiddleValidPlayer, game))
+        for numWorkers in (1, 2):
+            arena = Arena(FirstValidPlayer(game).play, MiddleValidPlayer(game).play, game)
+            sprt = SPRT(0.5, 0.7)
+            # player2 loses every game, which rejects it after 6 games
+            results = arena.playGames(40, numWorkers=numWorkers, playerFactories=factories, sprt=sprt)
+            self.assertFalse(sprt.decision)
+            self.assertEqual(sprt.games, 6)
+            self.assertEqual(results, (6, 0, 0))
+
+        game = OthelloGame(6)
+        args = dotdict({'numMCTSSims': 5, 'cpuct': 1.0})
+        sprt = SPRT(0.5, 0.7)
+        oneWon, twoWon, draws = BatchedArena(FixedPolicyNet(game), FixedPolicyNet(game), game, args,
+                                             numGames=4).playGames(40, sprt=sprt)
+        self.assertEqual(oneWon + twoWon + draws, sprt.games)
+        self.assertLessEqual(sprt.games, 40)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,178 @@
+"""
+Unit tests for the training loops in Coach.py. They use a stand-in network
+that does not learn, so no deep learning framework is required.
+
+To run tests:
+python -m pytest test_coach.py
+"""
+
+import os
+import pickle
+import tempfile
+import unittest
+
+import numpy as np
+
+from CheckpointWriter import CheckpointWriter
+from Coach import Coach
+from NeuralNet import NeuralNet
+from tictactoe.TicTacToeGame import TicTacToeGame
+from utils import dotdict
+
+
+class CountingNet(NeuralNet):
+    """A NeuralNet stand-in with a uniform policy that counts its training calls."""
+
+    def __init__(self, game):
+        self.action_size = game.getActionSize()
+        self.trained = 0
+
+    def train(self, examples):
+        self.trained += 1
+
+    def predict(self, board):
+        return np.ones(self.action_size) / self.action_size, 0.
+
+    def save_checkpoint(self, folder, filename):
+        with open(os.path.join(folder, filename), 'wb') as f:
+            pickle.dump(self.trained, f)
+
+    def load_checkpoint(self, folder, filename):
+        with open(os.path.join(folder, filename), 'rb') as f:
+            self.trained = pickle.load(f)
+
+
+class SnapshotNet(CountingNet):
+    """A CountingNet that takes in-memory snapshots."""
+
+    def snapshot(self):
+        return self.trained
+
+    def restore(self, snapshot):
+        self.trained = snapshot
+
+
+class FailingNet(SnapshotNet):
+    """A SnapshotNet whose checkpoints cannot be written."""
+
+    def save_checkpoint(self, folder, filename):
+        raise OSError(f'cannot write {filename}')
+
+
+class TestCoach(unittest.TestCase):
+
+    @staticmethod
+    def make_args(folder, **kwargs):
+        args = dotdict({
+            'numIters': 2,
+            'numEps': 2,
+            'tempThreshold': 15,
+            'updateThreshold': 0.6,
+            'maxlenOfQueue': 1000,
+            'numMCTSSims': 5,
+            'arenaCompare': 2,
+            'cpuct': 1,
+            'checkpoint': folder,
+            'load_folder_file': (folder, 'best.pth.tar'),
+            'numItersForTrainExamplesHistory': 2,
+        })
+        args.update(kwargs)
+        return args
+
+    def test_learn(self):
+        game = TicTacToeGame()
+        with tempfile.TemporaryDirectory() as folder:
+            coach = Coach(game, CountingNet(game), self.make_args(folder))
+            coach.learn()
+            self.assertEqual(len(coach.replayBuffer.chunks), 2)
+            self.assertEqual(coach.examplesAdded, len(coach.replayBuffer))
+            # rejected networks are rolled back, accepted ones kept
+            self.assertEqual(coach.nnet.trained, coach.modelsAccepted)
+            self.assertGreater(coach.throughput()[0], 0)
+
+    def test_parallel_self_play(self):
+        game = TicTacToeGame()
+        for useInferenceServer in (False, True):
+            with tempfile.TemporaryDirectory() as folder:
+                coach = Coach(game, CountingNet(game), self.make_args(folder, numSelfPlayWorkers=2,
+                                                                      useInferenceServer=useInferenceServer))
+                episodes = list(coach.executeEpisodesParallel(3))
+                self.assertEqual(len(episodes), 3)
+                # every position is recorded in its 8 symmetrical forms
+                self.assertEqual(sum(len(e) for e in episodes), 8 * coach.selfPlayPositions)
+                self.assertEqual(coach.selfPlayPositions, coach.selfPlayMoves)
+                for board, pi, v in (example for e in episodes for example in e):
+                    self.assertEqual(np.shape(board), (3, 3))
+                    self.assertEqual(len(pi), game.getActionSize())
+                    self.assertAlmostEqual(sum(pi), 1.)
+                    self.assertIn(v, (-1, 1, 1e-4, -1e-4))
+
+    def test_snapshots_and_async_checkpoints(self):
+        game = TicTacToeGame()
+        with tempfile.TemporaryDirectory() as folder:
+            coach = Coach(game, SnapshotNet(game), self.make_args(folder, numIters=4, asyncCheckpoints=True))
+            coach.learn()
+            self.assertEqual(coach.nnet.trained, coach.modelsAccepted)
+            # the previous network was kept in memory
+            self.assertFalse(os.path.exists(os.path.join(folder, 'temp.pth.tar')))
+            if coach.modelsAccepted:
+                best = SnapshotNet(game)
+                best.load_checkpoint(folder, 'best.pth.tar')
+                self.assertEqual(best.trained, coach.modelsAccepted)
+
+    def test_failed_async_checkpoints_are_raised(self):
+        game = TicTacToeGame()
+        with tempfile.TemporaryDirectory() as folder:
+            writer = CheckpointWriter(game, FailingNet)
+            writer.save(SnapshotNet(game), folder, 'best.pth.tar')
+            with self.assertRaises(OSError):
+                writer.wait()
+            # raised once
+            writer.wait()
+            writer.save(SnapshotNet(game), folder, 'checkpoint_1.pth.tar')
+            writer.jobs.join()
+            with self.assertRaises(OSError):
+                writer.save(SnapshotNet(game), folder, 'checkpoint_2.pth.tar')
+            writer.close()
+
+    def test_resume(self):
+        game = TicTacToeGame()
+        with tempfile.TemporaryDirectory() as folder:
+            np.random.seed(0)
+            coach = Coach(game, CountingNet(game), self.make_args(folder, saveTrainingState=True))
+            coach.learn()
+            state = np.random.get_state()
+            # only the network of the latest state is kept
+            self.assertEqual(sorted(os.listdir(os.path.join(folder, 'state'))), ['model_2.pth.tar', 'state.json'])
+
+            resumed = Coach(game, CountingNet(game), self.make_args(folder, numIters=3, saveTrainingState=True))
+            self.assertTrue(resumed.loadTrainingState(folder))
+            self.assertEqual(resumed.startIteration, 3)
+            self.assertEqual(resumed.nnet.trained, coach.nnet.trained)
+            self.assertEqual(list(resumed.replayBuffer.chunks), list(coach.replayBuffer.chunks))
+            np.testing.assert_array_equal(np.random.get_state()[1], state[1])
+
+            # only the third iteration is left
+            resumed.learn()
+            self.assertEqual([c[0] for c in resumed.replayBuffer.chunks], [1, 2])
+            fresh = Coach(game, CountingNet(game), self.make_args(folder))
+            self.assertFalse(fresh.loadTrainingState(os.path.join(folder, 'new')))
+
+    def test_async_pipeline(self):
+        game = TicTacToeGame()
+        with tempfile.TemporaryDirectory() as folder:
+            coach = Coach(game, CountingNet(game), self.make_args(folder, asyncPipeline=True, numSelfPlayWorkers=2))
+            coach.learn()
+            # training carries on whatever the verdicts
+            self.assertEqual(coach.nnet.trained, 2)
+            self.assertEqual(len(coach.replayBuffer.chunks), 2)
+            self.assertEqual(coach.examplesAdded, len(coach.replayBuffer))
+            # every candidate was decided
+            self.assertTrue(os.path.isfile(os.path.join(folder, 'best.pth.tar')))
+            self.assertFalse([f for f in os.listdir(folder) if f.startswith('candidate')])
+            examplesPerHour, acceptedPerHour = coach.throughput()
+            self.assertGreater(examplesPerHour, 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,64 @@
+"""
+Unit tests for the Gobang rules: the winners GobangGame finds from the last
+move must match a scan of the whole board.
+
+To run tests:
+python -m pytest test_gobang.py
+"""
+
+import unittest
+
+import numpy as np
+
+from gobang.GobangGame import GobangGame
+
+
+class TestGobang(unittest.TestCase):
+
+    def test_last_move_matches_scan(self):
+        rng = np.random.RandomState(0)
+        for n, nir in ((7, 4), (15, 5)):
+            game = GobangGame(n, nir)
+            for _ in range(10):
+                board, player = game.getInitBoard(), 1
+                while True:
+                    canonical = game.getCanonicalForm(board, player)
+                    ended = game.getGameEnded(canonical, 1)
+                    scanned = game.scanWinner(canonical)
+                    if scanned == 0 and not (canonical == 0).any():
+                        scanned = 1e-4
+                    self.assertEqual(ended, scanned)
+                    if ended:
+                        break
+                    valids = game.getValidMoves(canonical, 1)
+                    np.testing.assert_array_equal(valids[:-1], np.ravel(board) == 0)
+                    board, player = game.getNextState(board, player, rng.choice(np.flatnonzero(valids)))
+
+    def test_rows(self):
+        game = GobangGame(7, 4, cacheSize=0)
+        board = game.getInitBoard()
+        for x, y in ((1, 5), (2, 4), (3, 3)):
+            board[x][y] = -1
+        self.assertEqual(game.getGameEnded(board, 1), 0)
+        board, _ = game.getNextState(board, -1, 4 * 7 + 2)
+        self.assertEqual(game.getGameEnded(board, 1), -1)
+        self.assertFalse(game.winners)
+
+    def test_row_made_elsewhere(self):
+        game = GobangGame(7, 4)
+        board = game.getInitBoard()
+        # a row getNextState did not see being made, then an unrelated move
+        board[0][:4] = 1
+        board, _ = game.getNextState(board, -1, 6 * 7 + 6)
+        self.assertEqual(game.getGameEnded(board, 1), 1)
+        self.assertEqual(game.getGameEnded(-board, 1), -1)
+
+    def test_full_board_is_a_draw(self):
+        game = GobangGame(4, 4)
+        board = np.array([[1, 1, -1, -1], [-1, -1, 1, 1]] * 2)
+        self.assertEqual(game.getGameEnded(board, 1), 1e-4)
+        np.testing.assert_array_equal(game.getValidMoves(board, 1), [0] * 16 + [1])
+
+
+if __name__ == '__main__':
+    unittest.main()
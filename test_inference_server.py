@@ -0,0 +1,107 @@
+"""
+Unit tests for InferenceServer.py, using threads as clients.
+
+To run tests:
+python -m pytest test_inference_server.py
+"""
+
+import threading
+import unittest
+
+import numpy as np
+
+from InferenceServer import InferenceServer
+from NeuralNet import NeuralNet
+
+
+class SumNet(NeuralNet):
+    """A NeuralNet stand-in: pi is the board itself, v its sum."""
+
+    def __init__(self):
+        self.batches = []
+
+    def predict_batch(self, boards):
+        boards = np.array(boards)
+        self.batches.append(len(boards))
+        return boards.reshape(len(boards), -1), boards.sum(axis=(1, 2))[:, np.newaxis]
+
+
+class TestInferenceServer(unittest.TestCase):
+
+    def test_clients_get_their_own_results(self):
+        nnet = SumNet()
+        server = InferenceServer(nnet, numClients=4, maxBatchSize=4, maxWaitTime=0.05)
+        server.start()
+        errors = []
+
+        def play(client, seed):
+            rng = np.random.default_rng(seed)
+            for _ in range(10):
+                board = rng.integers(-1, 2, size=(3, 3))
+                pi, v = client.predict(board)
+                if not (np.array_equal(pi, board.ravel()) and v[0] == board.sum()):
+                    errors.append(seed)
+
+        threads = [threading.Thread(target=play, args=(client, i)) for i, client in enumerate(server.clients)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        server.stop()
+
+        self.assertEqual(errors, [])
+        stats = server.stats()
+        self.assertEqual(sum(nnet.batches), 40)
+        self.assertEqual(stats['batches'], len(nnet.batches))
+        self.assertEqual(sum(stats['queueLatencies'].values()), 40)
+        self.assertLessEqual(max(nnet.batches), 4)
+        # with four clients and a generous wait time batches do fill up
+        self.assertGreater(stats['meanFill'], 0.25)
+
+    def test_predict_batch_requests_count_as_several_boards(self):
+        nnet = SumNet()
+        server = InferenceServer(nnet, numClients=1, maxBatchSize=8, maxWaitTime=0.)
+        server.start()
+        boards = [np.full((2, 2), i) for i in range(3)]
+        pis, vs = server.clients[0].predict_batch(boards)
+        server.stop()
+
+        np.testing.assert_array_equal(vs[:, 0], [0, 4, 8])
+        self.assertEqual(server.stats()['batchSizes'], {3: 1})
+
+    def test_batches_stay_within_max_batch_size(self):
+        nnet = SumNet()
+        server = InferenceServer(nnet, numClients=2, maxBatchSize=4, maxWaitTime=0.05)
+        server.start()
+        results = {}
+
+        def predict(client, n):
+            results[n] = client.predict_batch([np.full((2, 2), i) for i in range(n)])
+
+        threads = [threading.Thread(target=predict, args=(client, n)) for client, n in zip(server.clients, (3, 6))]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        server.stop()
+
+        np.testing.assert_array_equal(results[6][1][:, 0], [0, 4, 8, 12, 16, 20])
+        np.testing.assert_array_equal(results[3][1][:, 0], [0, 4, 8])
+        self.assertLessEqual(max(nnet.batches), 4)
+        self.assertEqual(sum(nnet.batches), 9)
+
+    def test_network_errors_reach_the_clients(self):
+        server = InferenceServer(SumNet(), numClients=1, maxBatchSize=4, maxWaitTime=0.)
+        server.start()
+        client = server.clients[0]
+        # boards of different shapes cannot be stacked
+        with self.assertRaises(RuntimeError):
+            client.predict_batch([np.zeros((2, 2)), np.zeros((3, 3))])
+        # the server is still running
+        pi, v = client.predict(np.ones((2, 2)))
+        server.stop()
+        self.assertEqual(v[0], 4)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,55 @@
+"""
+Unit tests for the k-in-a-row detector in KInARow.py.
+
+To run tests:
+python -m pytest test_k_in_a_row.py
+"""
+
+import itertools
+import unittest
+
+import numpy as np
+
+from KInARow import KInARow
+
+
+def slow_winner(board, k):
+    # walks every direction from every cell
+    board = np.asarray(board)
+    for color in (1, -1):
+        for cell in itertools.product(*map(range, board.shape)):
+            for direction in itertools.product((-1, 0, 1), repeat=board.ndim):
+                if not any(direction):
+                    continue
+                row = [tuple(c + i * d for c, d in zip(cell, direction)) for i in range(k)]
+                if all(all(0 <= c < n for c, n in zip(square, board.shape)) and board[square] == color
+                       for square in row):
+                    return color
+    return 0
+
+
+class TestKInARow(unittest.TestCase):
+
+    def test_matches_slow_winner(self):
+        rng = np.random.RandomState(0)
+        for shape, k in (((3, 3), 3), ((6, 7), 4), ((7, 7), 4), ((3, 3, 3), 3), ((4, 4, 4), 4), ((4, 5, 3), 3)):
+            detector = KInARow(shape, k)
+            boards = rng.choice([-1, 0, 1], size=(50,) + shape, p=[0.3, 0.4, 0.3])
+            # sparser boards have fewer rows
+            boards[25:] *= rng.rand(25, *shape) < 0.5
+            expected = [slow_winner(board, k) for board in boards]
+            self.assertEqual([detector.winner(board) for board in boards], expected)
+            np.testing.assert_array_equal(detector.winner(boards), expected)
+            np.testing.assert_array_equal(detector.winner(boards.reshape((5, 10) + shape)),
+                                          np.reshape(expected, (5, 10)))
+            self.assertIn(0, expected)
+
+    def test_number_of_lines(self):
+        self.assertEqual(len(KInARow((3, 3), 3).lines), 8)
+        self.assertEqual(len(KInARow((3, 3, 3), 3).lines), 49)
+        self.assertEqual(len(KInARow((4, 4, 4), 4).lines), 76)
+        self.assertIs(KInARow.get([6, 7], 4), KInARow.get((6, 7), 4))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,228 @@
+"""
+Unit tests for the tree search in MCTS.py. They use a small deterministic
+stand-in for the neural network, so no deep learning framework is required.
+
+To run tests:
+python -m pytest test_mcts.py
+"""
+
+import unittest
+import zlib
+
+import numpy as np
+
+from MCTS import MCTS, ArrayMCTS, puct_select
+from NeuralNet import NeuralNet
+from connect4.Connect4Game import Connect4Game
+from dotsandboxes.DotsAndBoxesGame import DotsAndBoxesGame
+from gobang.GobangGame import GobangGame
+from othello.OthelloGame import OthelloGame
+from tictactoe.TicTacToeGame import TicTacToeGame
+from utils import dotdict
+
+
+class FixedPolicyNet(NeuralNet):
+    """A NeuralNet stand-in whose output only depends on the board (and not on the hash seed)."""
+
+    def __init__(self, game):
+        self.action_size = game.getActionSize()
+
+    def predict(self, board):
+        rng = np.random.default_rng(zlib.crc32(board.tobytes()))
+        return rng.random(self.action_size), rng.uniform(-1, 1)
+
+
+class CollidingTicTacToeGame(TicTacToeGame):
+    """TicTacToe with a hash that collides for every pair of boards."""
+
+    def getHash(self, board):
+        return 0
+
+    def getNextHash(self, boardHash, board, action):
+        return 0
+
+
+class TestMCTS(unittest.TestCase):
+
+    @staticmethod
+    def make_mcts(mcts_class, game, **kwargs):
+        args = dotdict({'numMCTSSims': 50, 'cpuct': 1.0})
+        args.update(kwargs)
+        return mcts_class(game, FixedPolicyNet(game), args)
+
+    def test_puct_select(self):
+        Q = np.array([0.5, 0., 0., 0.9])
+        N = np.array([4, 0, 0, 1])
+        P = np.array([0.1, 0.2, 0.6, 0.1])
+        valids = np.array([1, 1, 0, 1])
+        # action 2 has the highest prior but is not valid
+        self.assertEqual(puct_select(Q, N, P, valids, 5, 1.0), 3)
+        # unvisited edges count as Q = 0, so exploration takes over for large cpuct
+        self.assertEqual(puct_select(Q, N, P, valids, 5, 100.0), 1)
+        # at a fresh node the prior decides
+        self.assertEqual(puct_select(np.zeros(4), np.zeros(4), P, valids, 0, 1.0), 1)
+
+    def test_array_store_matches_dict_store(self):
+        for game in (TicTacToeGame(), OthelloGame(6)):
+            board = game.getInitBoard()
+            dict_mcts = self.make_mcts(MCTS, game)
+            array_mcts = self.make_mcts(ArrayMCTS, game)
+            np.testing.assert_allclose(dict_mcts.getActionProb(board), array_mcts.getActionProb(board))
+
+    def test_array_store_grows(self):
+        game = OthelloGame(6)
+        mcts = ArrayMCTS(game, FixedPolicyNet(game), dotdict({'numMCTSSims': 100, 'cpuct': 1.0}), capacity=4)
+        mcts.getActionProb(game.getInitBoard())
+        self.assertEqual(len(mcts), 100)
+        self.assertGreaterEqual(len(mcts.Ns), 100)
+
+    def test_batched_search(self):
+        game = OthelloGame(6)
+        board = game.getInitBoard()
+        mcts = self.make_mcts(MCTS, game, numMCTSSims=60, mctsBatchSize=8)
+        probs = mcts.getActionProb(board)
+        self.assertAlmostEqual(sum(probs), 1.0)
+        # the first simulation expands the root, every other one visits a child
+        s = game.stringRepresentation(board)
+        self.assertEqual(mcts.Ns[s], 59)
+        # all virtual losses were removed again
+        for s in mcts.Nsa:
+            self.assertEqual(mcts.Nsa[s].sum(), mcts.Ns[s])
+            self.assertTrue(np.all(np.abs(mcts.Qsa[s]) <= 1 + 1e-9))
+
+    def test_advance_root_keeps_subtree(self):
+        game = OthelloGame(6)
+        board = game.getInitBoard()
+        mcts = self.make_mcts(MCTS, game, numMCTSSims=100)
+        probs = mcts.getActionProb(board)
+        action = int(np.argmax(probs))
+        next_board, next_player = game.getNextState(board, 1, action)
+        next_board = game.getCanonicalForm(next_board, next_player)
+        child = game.stringRepresentation(next_board)
+        visits = mcts.Ns[child]
+        subtree = {child}
+        stack = [child]
+        while stack:
+            for node in mcts.Cs.get(stack.pop(), {}).values():
+                if node not in subtree:
+                    subtree.add(node)
+                    stack.append(node)
+        subtree &= set(mcts.Ps)
+
+        mcts.advanceRoot(board, action)
+        self.assertNotIn(game.stringRepresentation(board), mcts.Ps)
+        self.assertEqual(mcts.Ns[child], visits)
+        self.assertEqual(set(mcts.Ps), subtree)
+        # the next search starts from the statistics that were kept
+        mcts.getActionProb(next_board)
+        self.assertEqual(mcts.Ns[child], visits + 100)
+
+    def test_reuse_tree_bounds_memory(self):
+        game = TicTacToeGame()
+        board, player = game.getInitBoard(), 1
+        reused = self.make_mcts(MCTS, game, numMCTSSims=30, reuseTree=True)
+        fresh = self.make_mcts(MCTS, game, numMCTSSims=30)
+        while game.getGameEnded(board, player) == 0:
+            canonicalBoard = game.getCanonicalForm(board, player)
+            action = int(np.argmax(reused.getActionProb(canonicalBoard, temp=0)))
+            fresh.getActionProb(canonicalBoard, temp=0)
+            reused.advanceRoot(canonicalBoard, action)
+            board, player = game.getNextState(board, player, action)
+
+            # nothing but the subtree of the current position is kept
+            reachable = {reused.root}
+            stack = [reused.root]
+            while stack:
+                for child in reused.Cs.get(stack.pop(), {}).values():
+                    if child not in reachable:
+                        reachable.add(child)
+                        stack.append(child)
+            self.assertLessEqual(set(reused.Ps), reachable)
+            self.assertLessEqual(len(reused.Ps), len(fresh.Ps))
+
+    def test_node_budget(self):
+        game = OthelloGame(6)
+        board = game.getInitBoard()
+        for policy in ('lru', 'visits'):
+            mcts = self.make_mcts(MCTS, game, numMCTSSims=200, maxTreeNodes=50, evictionPolicy=policy)
+            probs = mcts.getActionProb(board)
+            self.assertLessEqual(mcts.treeStats()['nodes'], 50)
+            self.assertGreater(mcts.evictions, 0)
+            self.assertIn(mcts.root, mcts.Ps)
+            self.assertAlmostEqual(sum(probs), 1.)
+            self.assertEqual(mcts.Ns[mcts.root], 199)
+
+        mcts = self.make_mcts(MCTS, game, numMCTSSims=200, maxTreeBytes=20000)
+        mcts.getActionProb(board)
+        self.assertLessEqual(mcts.treeStats()['bytes'], 20000)
+
+    def test_zobrist_hash_is_incremental(self):
+        rng = np.random.RandomState(0)
+        for game in (OthelloGame(6), GobangGame(7, 4), TicTacToeGame(), Connect4Game(), DotsAndBoxesGame(3)):
+            board, player = game.getInitBoard(), 1
+            canonicalBoard = game.getCanonicalForm(board, player)
+            h = game.getHash(canonicalBoard)
+            while game.getGameEnded(board, player) == 0:
+                action = rng.choice(np.flatnonzero(game.getValidMoves(canonicalBoard, 1)))
+                h = game.getNextHash(h, canonicalBoard, action)
+                board, player = game.getNextState(board, player, action)
+                canonicalBoard = game.getCanonicalForm(board, player)
+                self.assertEqual(h, game.getHash(canonicalBoard))
+
+    def test_zobrist_keys_match_string_keys(self):
+        for game in (OthelloGame(6), GobangGame(7, 4), TicTacToeGame(), Connect4Game(), DotsAndBoxesGame(3)):
+            board = game.getInitBoard()
+            for batchSize in (1, 4):
+                string_mcts = self.make_mcts(MCTS, game, mctsBatchSize=batchSize)
+                hash_mcts = self.make_mcts(MCTS, game, mctsBatchSize=batchSize, zobristHash=True)
+                np.testing.assert_allclose(string_mcts.getActionProb(board), hash_mcts.getActionProb(board))
+                self.assertEqual(len(string_mcts.Ps), len(hash_mcts.Ps))
+
+    def test_zobrist_collisions_are_detected(self):
+        game = CollidingTicTacToeGame()
+        board = game.getInitBoard()
+        string_mcts = self.make_mcts(MCTS, game, numMCTSSims=200)
+        hash_mcts = self.make_mcts(MCTS, game, numMCTSSims=200, zobristHash=True)
+        np.testing.assert_allclose(string_mcts.getActionProb(board), hash_mcts.getActionProb(board))
+        self.assertEqual(len(string_mcts.Ps), len(hash_mcts.Ps))
+        self.assertEqual(hash_mcts.collisions, len(hash_mcts.Es) - 1)
+
+    def test_root_noise_and_sim_budget(self):
+        game = OthelloGame(6)
+        board = game.getInitBoard()
+        mcts = self.make_mcts(MCTS, game, dirichletEpsilon=0.25, reuseTree=True)
+        s = game.stringRepresentation(board)
+
+        mcts.getActionProb(board, numSims=10)
+        self.assertEqual(mcts.Ns[s], 9)
+        prior = mcts.Ps[s].copy()
+
+        np.random.seed(0)
+        noisy = mcts.noisyPrior(s)
+        self.assertAlmostEqual(noisy.sum(), 1.)
+        self.assertTrue(np.all(noisy[mcts.Vs[s] == 0] == 0))
+        self.assertFalse(np.allclose(noisy, prior))
+
+        # the noise only lasts for the search it was asked for
+        mcts.getActionProb(board, numSims=20, rootNoise=True)
+        self.assertEqual(mcts.Ns[s], 29)
+        np.testing.assert_array_equal(mcts.Ps[s], prior)
+
+    def test_early_stop_keeps_the_move(self):
+        for game in (TicTacToeGame(), OthelloGame(6)):
+            board = game.getInitBoard()
+            for mcts_class in (MCTS, ArrayMCTS):
+                full = self.make_mcts(mcts_class, game, numMCTSSims=200)
+                early = self.make_mcts(mcts_class, game, numMCTSSims=200, earlyStop=True)
+                self.assertEqual(np.argmax(full.getActionProb(board, temp=0)),
+                                 np.argmax(early.getActionProb(board, temp=0)))
+                self.assertGreater(early.simsSaved, 0)
+                self.assertEqual(full.simsSaved, 0)
+                # searches with temp > 0 need all the visit counts
+                saved = early.simsSaved
+                early.getActionProb(board, temp=1)
+                self.assertEqual(early.simsSaved, saved)
+                self.assertEqual(early.searches, 2)
+
+if __name__ == '__main__':
+    unittest.main()
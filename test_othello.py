@@ -0,0 +1,80 @@
+"""
+Unit tests for the Othello rules engines: the bitboard engine behind
+OthelloGame, with its cache of move states, and OthelloLogic.Board must agree.
+
+To run tests:
+python -m pytest test_othello.py
+"""
+
+import unittest
+
+import numpy as np
+
+from othello.OthelloGame import OthelloGame
+
+
+def perft(game, board, player, depth):
+    if depth == 0:
+        return 1
+    valids = game.getValidMoves(board, player)
+    if valids[-1] and game.getGameEnded(board, player) != 0:
+        return 1
+    return sum(perft(game, *game.getNextState(board, player, action), depth - 1)
+               for action in np.flatnonzero(valids))
+
+
+class TestOthello(unittest.TestCase):
+
+    def test_perft(self):
+        game = OthelloGame(8)
+        self.assertIsNotNone(game.bitboard)
+        counts = [perft(game, game.getInitBoard(), 1, depth) for depth in range(1, 5)]
+        self.assertEqual(counts, [4, 12, 56, 244])
+
+    def test_bitboard_matches_board(self):
+        rng = np.random.RandomState(0)
+        for n in (4, 6, 8):
+            game, reference = OthelloGame(n), OthelloGame(n, bitboard=False)
+            for _ in range(5):
+                board, player = game.getInitBoard(), 1
+                boardHash = game.getHash(game.getCanonicalForm(board, player))
+                while True:
+                    ended = game.getGameEnded(board, player)
+                    self.assertEqual(ended, reference.getGameEnded(board, player))
+                    self.assertEqual(game.getScore(board, player), reference.getScore(board, player))
+                    if ended:
+                        break
+                    valids = game.getValidMoves(board, player)
+                    np.testing.assert_array_equal(valids, reference.getValidMoves(board, player))
+                    action = rng.choice(np.flatnonzero(valids))
+                    canonical = game.getCanonicalForm(board, player)
+                    self.assertEqual(game.getNextHash(boardHash, canonical, action),
+                                     reference.getNextHash(boardHash, canonical, action))
+                    nextBoard, nextPlayer = game.getNextState(board, player, action)
+                    np.testing.assert_array_equal(nextBoard, reference.getNextState(board, player, action)[0])
+                    board, player = nextBoard, nextPlayer
+                    boardHash = game.getHash(game.getCanonicalForm(board, player))
+
+    def test_move_states_are_cached(self):
+        game = OthelloGame(6, cacheSize=2)
+        board = game.getInitBoard()
+        state = game.moveState(board)
+        self.assertEqual(state.diff, 0)
+        self.assertEqual(game.getValidMoves(board, 1)[:-1].sum(), 4)
+        self.assertEqual(game.getGameEnded(board, 1), 0)
+        self.assertIs(game.moveState(board), state)
+        nextBoard, _ = game.getNextState(board, 1, int(np.flatnonzero(game.getValidMoves(board, 1))[0]))
+        # the least recently used state goes first
+        game.moveState(-board)
+        game.moveState(nextBoard)
+        self.assertNotIn(board.tobytes(), game.moveStates)
+        self.assertEqual(len(game.moveStates), 2)
+
+    def test_large_boards_fall_back(self):
+        game = OthelloGame(10)
+        self.assertIsNone(game.bitboard)
+        self.assertEqual(game.getValidMoves(game.getInitBoard(), 1).sum(), 4)
+
+
+if __name__ == '__main__':
+    unittest.main()
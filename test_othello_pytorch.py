@@ -0,0 +1,119 @@
+"""
+Unit tests for the PyTorch network of Othello (othello/pytorch/NNet.py), on a
+small network and a 6x6 board. They need PyTorch.
+
+To run tests:
+python -m pytest test_othello_pytorch.py
+"""
+
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+import numpy as np
+import torch
+
+from ReplayBuffer import ReplayBuffer
+from othello.OthelloGame import OthelloGame
+from othello.pytorch import NNet
+
+
+class TestOthelloPytorchNNet(unittest.TestCase):
+
+    def setUp(self):
+        patch = mock.patch.dict(NNet.args, {'epochs': 1, 'batch_size': 8, 'num_channels': 16, 'cuda': False})
+        patch.start()
+        self.addCleanup(patch.stop)
+        np.random.seed(0)
+        torch.manual_seed(0)
+        self.game = OthelloGame(6)
+        self.nnet = NNet.NNetWrapper(self.game)
+
+    def make_examples(self, count):
+        n = self.game.n
+        examples = []
+        for _ in range(count):
+            board = np.random.randint(-1, 2, size=(n, n))
+            pi = np.random.dirichlet(np.ones(self.game.getActionSize()))
+            examples.append((board, pi, np.random.choice((-1., 1.))))
+        return examples
+
+    def weights(self):
+        return [p.detach().clone() for p in self.nnet.nnet.parameters()]
+
+    def assertWeightsEqual(self, first, second):
+        for a, b in zip(first, second):
+            torch.testing.assert_close(a, b, rtol=0, atol=0)
+
+    def loss(self, examples):
+        boards, pis, vs = self.nnet.examples_to_tensors(examples)
+        self.nnet.nnet.eval()
+        with torch.no_grad():
+            out_pi, out_v = self.nnet.nnet(boards)
+            return (self.nnet.loss_pi(pis, out_pi) + self.nnet.loss_v(vs, out_v)).item()
+
+    def test_train(self):
+        examples = self.make_examples(64)
+        buffer = ReplayBuffer(64, maxChunks=2, piDtype='float16', game=self.game)
+        buffer.addChunk(examples)
+        for trainingExamples in (examples, buffer):
+            weights = self.weights()
+            self.nnet.train(trainingExamples)
+            self.assertTrue(np.isfinite(self.loss(examples)))
+            for a, b in zip(self.weights(), weights):
+                self.assertTrue(torch.isfinite(a).all())
+                self.assertFalse(torch.equal(a, b))
+
+    def test_snapshot_restores_the_optimizer(self):
+        examples = self.make_examples(32)
+        self.nnet.train(examples)
+        snapshot = self.nnet.snapshot()
+        weights = self.weights()
+        steps = [float(s['step']) for s in self.nnet.optimizer.state_dict()['state'].values()]
+
+        self.nnet.train(examples)
+        self.nnet.restore(snapshot)
+        self.assertWeightsEqual(self.weights(), weights)
+        state = self.nnet.optimizer.state_dict()['state']
+        self.assertEqual([float(s['step']) for s in state.values()], steps)
+        for saved, restored in zip(snapshot['optimizer']['state'].values(), state.values()):
+            torch.testing.assert_close(restored['exp_avg'], saved['exp_avg'], rtol=0, atol=0)
+            # the snapshot can be restored again after more training
+            self.assertIsNot(restored['exp_avg'], saved['exp_avg'])
+
+    def test_only_the_training_state_holds_the_optimizer(self):
+        self.nnet.train(self.make_examples(32))
+        weights = self.weights()
+        with tempfile.TemporaryDirectory() as folder:
+            self.nnet.save_checkpoint(folder, 'best.pth.tar')
+            self.nnet.save_training_state(os.path.join(folder, 'state'), 'model_1.pth.tar')
+            self.assertEqual(set(torch.load(os.path.join(folder, 'best.pth.tar'))), {'state_dict'})
+
+            loaded = NNet.NNetWrapper(self.game)
+            loaded.load_training_state(os.path.join(folder, 'state'), 'model_1.pth.tar')
+            for a, b in zip(loaded.optimizer.state_dict()['state'].values(),
+                            self.nnet.optimizer.state_dict()['state'].values()):
+                self.assertEqual(a['step'], b['step'])
+                torch.testing.assert_close(a['exp_avg_sq'], b['exp_avg_sq'], rtol=0, atol=0)
+            for a, b in zip(loaded.nnet.parameters(), weights):
+                torch.testing.assert_close(a.detach(), b, rtol=0, atol=0)
+
+    def test_training_state_holds_the_torch_rng(self):
+        examples = self.make_examples(32)
+        with tempfile.TemporaryDirectory() as folder:
+            self.nnet.save_training_state(folder, 'model_1.pth.tar')
+            # dropout makes the training depend on the torch RNG
+            np.random.seed(0)
+            self.nnet.train(examples)
+            weights = self.weights()
+
+            torch.manual_seed(1)
+            self.nnet.load_training_state(folder, 'model_1.pth.tar')
+            np.random.seed(0)
+            self.nnet.train(examples)
+            self.assertWeightsEqual(self.weights(), weights)
+
+
+if __name__ == '__main__':
+    unittest.main()
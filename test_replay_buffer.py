@@ -0,0 +1,139 @@
+"""
+Unit tests for the replay buffer in ReplayBuffer.py.
+
+To run tests:
+python -m pytest test_replay_buffer.py
+"""
+
+import os
+import tempfile
+import unittest
+
+import numpy as np
+
+from ReplayBuffer import ExampleStore, ReplayBuffer
+from connect4.Connect4Game import Connect4Game
+from dotsandboxes.DotsAndBoxesGame import DotsAndBoxesGame
+from gobang.GobangGame import GobangGame
+from othello.OthelloGame import OthelloGame
+from tictactoe.TicTacToeGame import TicTacToeGame
+
+
+def make_examples(n, value):
+    board = np.full((3, 3), -1 if value < 0 else 1)
+    return [(board, [1. / 9] * 9, value) for _ in range(n)]
+
+
+class TestReplayBuffer(unittest.TestCase):
+
+    def test_chunks_are_evicted(self):
+        buffer = ReplayBuffer(10, maxChunks=2, boardDtype='int8')
+        buffer.addChunk(make_examples(4, 1.))
+        buffer.addChunk(make_examples(4, -1.))
+        self.assertEqual(len(buffer), 8)
+        self.assertEqual(buffer.boards.dtype, np.int8)
+        # too many chunks
+        buffer.addChunk(make_examples(2, 0.5))
+        self.assertEqual([c[0] for c in buffer.chunks], [1, 2])
+        # not enough room: the next chunk wraps around the end of the arrays
+        buffer.addChunk(make_examples(5, 0.25))
+        self.assertEqual([c[0] for c in buffer.chunks], [2, 3])
+        self.assertEqual(len(buffer), 7)
+        self.assertEqual([v for _, _, v in buffer.examples()], [0.5] * 2 + [0.25] * 5)
+
+    def test_board_dtype_is_checked(self):
+        buffer = ReplayBuffer(10, maxChunks=2, boardDtype='int8')
+        with self.assertRaises(ValueError):
+            buffer.addChunk([(np.full((3, 3), 300), [1.] * 9, 1.)])
+
+    def test_board_dtype_of_the_first_boards(self):
+        # e.g. the float boards of RTS, whose remaining time reaches 200
+        board = np.full((3, 3), 200.5)
+        with tempfile.TemporaryDirectory() as folder:
+            buffer = ReplayBuffer(10, maxChunks=2)
+            buffer.addChunk([(board, [1.] * 9, 1.)])
+            self.assertEqual(buffer.boards.dtype, np.float64)
+            np.testing.assert_array_equal(buffer.examples()[0][0], board)
+            buffer.save(folder)
+            loaded = ReplayBuffer(10, maxChunks=2)
+            loaded.load(folder)
+            np.testing.assert_array_equal(loaded.examples()[0][0], board)
+
+    def test_save_only_writes_new_chunks(self):
+        with tempfile.TemporaryDirectory() as folder:
+            buffer = ReplayBuffer(100, maxChunks=2, piDtype='float16')
+            buffer.addChunk(make_examples(4, 1.))
+            buffer.save(folder)
+            first = os.path.join(folder, 'chunk_000000.boards.npy')
+            os.utime(first, (0, 0))
+
+            buffer.addChunk(make_examples(3, -1.))
+            buffer.save(folder)
+            self.assertEqual(os.path.getmtime(first), 0)
+
+            buffer.addChunk(make_examples(2, 0.5))
+            buffer.save(folder)
+            self.assertFalse(os.path.exists(first))
+
+            loaded = ReplayBuffer(100, maxChunks=2, piDtype='float16')
+            loaded.load(folder)
+            self.assertEqual(len(loaded), 5)
+            self.assertEqual(loaded.pis.dtype, np.float16)
+            for (b1, p1, v1), (b2, p2, v2) in zip(buffer.examples(), loaded.examples()):
+                np.testing.assert_array_equal(b1, b2)
+                np.testing.assert_array_equal(p1, p2)
+                self.assertEqual(v1, v2)
+            # new chunks continue the ids of the loaded ones
+            self.assertEqual(loaded.addChunk(make_examples(1, 1.)), 3)
+
+    def test_example_store_matches_buffer(self):
+        with tempfile.TemporaryDirectory() as folder:
+            buffer = ReplayBuffer(10, maxChunks=3)
+            store = ExampleStore(folder, 10, maxChunks=3)
+            for n, value in ((4, 1.), (3, -1.), (5, 0.5), (2, -0.5)):
+                examples = make_examples(n, value)
+                self.assertEqual(buffer.addChunk(examples), store.addChunk(examples))
+            self.assertEqual(len(store), len(buffer))
+            self.assertFalse(os.path.exists(os.path.join(folder, 'chunk_000000.boards.npy')))
+
+            ids = np.random.RandomState(0).randint(len(buffer), size=20)
+            for a, b in zip(buffer.sample(ids), store.sample(ids)):
+                np.testing.assert_array_equal(a, b)
+            self.assertEqual([v for _, _, v in store.examples()], [v for _, _, v in buffer.examples()])
+
+            # reopening the folder only maps the files again
+            reopened = ExampleStore(folder, 10, maxChunks=3)
+            reopened.load(folder)
+            self.assertEqual(len(reopened), len(store))
+            self.assertIsInstance(reopened.shards[2][0], np.memmap)
+            for a, b in zip(store.sample(ids), reopened.sample(ids)):
+                np.testing.assert_array_equal(a, b)
+
+    def test_symmetry_batch_matches_get_symmetries(self):
+        rng = np.random.RandomState(0)
+        for game in (OthelloGame(6), GobangGame(7, 4), TicTacToeGame(), Connect4Game(), DotsAndBoxesGame(3)):
+            boards = rng.randint(-1, 2, size=(20,) + np.shape(game.getInitBoard()))
+            pis = rng.random_sample((20, game.getActionSize()))
+            ids = rng.randint(len(game.getSymmetries(boards[0], pis[0])), size=20)
+            newBoards, newPis = game.applySymmetryBatch(boards, pis, ids)
+            for k in range(20):
+                board, pi = game.getSymmetries(boards[k], pis[k])[ids[k]]
+                np.testing.assert_array_equal(newBoards[k], board)
+                np.testing.assert_array_equal(newPis[k], pi)
+
+    def test_lazy_symmetries(self):
+        game = TicTacToeGame()
+        board = np.array([[1, 0, 0], [0, 0, 0], [0, 0, 0]])
+        pi = np.zeros(10)
+        pi[0] = 1.
+        buffer = ReplayBuffer(10, maxChunks=1, game=game)
+        buffer.addChunk([(board, pi, 1.)])
+        self.assertEqual(len(buffer), 1)
+        boards, pis, vs = buffer.sample(np.zeros(200, dtype=int))
+        # the stone ends up in every corner, and the policy moves along with it
+        self.assertEqual(len({b.tobytes() for b in boards}), 4)
+        np.testing.assert_array_equal(np.argmax(pis, axis=1), np.argmax(boards.reshape(200, -1), axis=1))
+
+
+if __name__ == '__main__':
+    unittest.main()
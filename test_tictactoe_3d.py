@@ -0,0 +1,56 @@
+"""
+Unit tests for the 3D TicTacToe (Qubic) game.
+
+To run tests:
+python -m pytest test_tictactoe_3d.py
+"""
+
+import unittest
+
+import numpy as np
+
+from tictactoe_3d.TicTacToeGame import TicTacToeGame
+
+
+class TestTicTacToe3D(unittest.TestCase):
+
+    def test_actions_are_cells_in_order(self):
+        game = TicTacToeGame(4)
+        board = game.getInitBoard()
+        board, player = game.getNextState(board, 1, 4 * 16 - 1)
+        self.assertEqual(board[3, 3, 3], 1)
+        board, player = game.getNextState(board, player, 1 * 16 + 2 * 4 + 3)
+        self.assertEqual(board[1, 2, 3], -1)
+        valids = game.getValidMoves(board, player)
+        self.assertEqual(valids.sum(), 62)
+        self.assertFalse(valids[63] or valids[27] or valids[-1])
+
+    def test_games_end_on_a_row(self):
+        rng = np.random.RandomState(0)
+        for n in (3, 4):
+            game = TicTacToeGame(n)
+            for _ in range(10):
+                board, player = game.getInitBoard(), 1
+                while game.getGameEnded(board, player) == 0:
+                    valids = game.getValidMoves(board, player)
+                    board, player = game.getNextState(board, player, rng.choice(np.flatnonzero(valids)))
+                ended = game.getGameEnded(board, 1)
+                if ended != 1e-4:
+                    # the last player to move made the row
+                    self.assertEqual(ended, -player)
+                    rows = np.ravel(board)[game.rows.lines]
+                    self.assertTrue(np.any(np.all(rows == ended, axis=1)))
+                else:
+                    self.assertFalse((board == 0).any())
+
+    def test_space_diagonals(self):
+        game = TicTacToeGame(4)
+        board = game.getInitBoard()
+        for i in range(4):
+            board[i, 3 - i, i] = -1
+        self.assertEqual(game.getGameEnded(board, 1), -1)
+        self.assertEqual(game.getGameEnded(board, -1), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -2,6 +2,8 @@ from __future__ import print_function
 import sys
 sys.path.append('..')
 from Game import Game
+from KInARow import KInARow
+from Zobrist import Zobrist
 from .TicTacToeLogic import Board
 import numpy as np
 
@@ -17,6 +19,7 @@ Based on the OthelloGame by Surag Nair.
 class TicTacToeGame(Game):
     def __init__(self, n=3):
         self.n = n
+        self.zobrist = Zobrist(n*n)
 
     def getInitBoard(self):
         # return initial board (numpy board)
@@ -58,14 +61,10 @@ class TicTacToeGame(Game):
     def getGameEnded(self, board, player):
         # return 0 if not ended, 1 if player 1 won, -1 if player 1 lost
         # player = 1
-        b = Board(self.n)
-        b.pieces = np.copy(board)
-
-        if b.is_win(player):
-            return 1
-        if b.is_win(-player):
-            return -1
-        if b.has_legal_moves():
+        winner = KInARow.get(board.shape, self.n).winner(board)
+        if winner:
+            return winner*player
+        if (board == 0).any():
             return 0
         # draw has a very little value 
         return 1e-4
@@ -94,6 +93,14 @@ class TicTacToeGame(Game):
         # 8x8 numpy array (canonical board)
         return board.tostring()
 
+    def getHash(self, board):
+        return self.zobrist.hash(board)
+
+    def getNextHash(self, boardHash, board, action):
+        if action == self.n*self.n:
+            return Zobrist.negate(boardHash)
+        return Zobrist.negate(boardHash ^ self.zobrist.place[action])
+
     @staticmethod
     def display(board):
         n = board.shape[0]
@@ -14,6 +14,8 @@ Date: Jan 5, 2018.
 Based on the board for the game of Othello by Eric P. Nichols.
 
 '''
+from KInARow import KInARow
+
 # from bkcharts.attributes import color
 class Board():
 
@@ -59,38 +61,7 @@ class Board():
         """Check whether the given player has collected a triplet in any direction; 
         @param color (1=white,-1=black)
         """
-        win = self.n
-        # check y-strips
-        for y in range(self.n):
-            count = 0
-            for x in range(self.n):
-                if self[x][y]==color:
-                    count += 1
-            if count==win:
-                return True
-        # check x-strips
-        for x in range(self.n):
-            count = 0
-            for y in range(self.n):
-                if self[x][y]==color:
-                    count += 1
-            if count==win:
-                return True
-        # check two diagonal strips
-        count = 0
-        for d in range(self.n):
-            if self[d][d]==color:
-                count += 1
-        if count==win:
-            return True
-        count = 0
-        for d in range(self.n):
-            if self[d][self.n-d-1]==color:
-                count += 1
-        if count==win:
-            return True
-        
-        return False
+        return KInARow.get((self.n, self.n), self.n).winner(self.pieces) == color
 
     def execute_move(self, move, color):
         """Perform the given move on the board; 
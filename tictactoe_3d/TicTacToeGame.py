@@ -2,6 +2,7 @@ from __future__ import print_function
 import sys
 sys.path.append('..')
 from Game import Game
+from KInARow import KInARow
 from .TicTacToeLogic import Board
 import numpy as np
 
@@ -16,6 +17,8 @@ Based on the TicTacToeGame by Evgeny Tyurin.
 class TicTacToeGame(Game):
     def __init__(self, n):
         self.n = n
+        # all the rows of n cells of the cube, computed once per n
+        self.rows = KInARow.get((n, n, n), n)
 
     def getInitBoard(self):
         # return initial board (numpy board)
@@ -35,39 +38,27 @@ class TicTacToeGame(Game):
         # action must be a valid move
         if action == self.n*self.n*self.n:
             return (board, -player)
-        b = Board(self.n)
-        b.pieces = np.copy(board)
-        boardvalues = np.arange(0,(self.n*self.n*self.n)).reshape(self.n,self.n,self.n)
-        
-        move = np.argwhere(boardvalues==action)[0]
-        b.execute_move(move, player)
-        return (b.pieces, -player)
+        move = np.unravel_index(action, board.shape)
+        assert board[move] == 0
+        board = np.copy(board)
+        board[move] = player
+        return (board, -player)
 
     def getValidMoves(self, board, player):
         # return a fixed size binary vector
-        valids = [0]*self.getActionSize()
-        b = Board(self.n)
-        b.pieces = np.copy(board)
-        legalMoves =  b.get_legal_moves(player)
-        if len(legalMoves)==0:
-            valids[-1]=1
-            return np.array(valids)
-        for z, x, y in legalMoves:
-            boardvalues = np.arange(0,(self.n*self.n*self.n)).reshape(self.n,self.n,self.n)
-            valids[boardvalues[z][x][y]] = 1
-        return np.array(valids)
+        valids = np.zeros(self.getActionSize(), dtype=int)
+        valids[:-1] = np.ravel(board) == 0
+        if not valids.any():
+            valids[-1] = 1
+        return valids
 
     def getGameEnded(self, board, player):
         # return 0 if not ended, 1 if player 1 won, -1 if player 1 lost
         # player = 1
-        b = Board(self.n)
-        b.pieces = np.copy(board)
-
-        if b.is_win(player):
-            return 1
-        if b.is_win(-player):
-            return -1
-        if b.has_legal_moves():
+        winner = self.rows.winner(board)
+        if winner:
+            return winner*player
+        if (board == 0).any():
             return 0
         # draw has a very little value 
         return 1e-4
@@ -1,4 +1,6 @@
 import numpy as np
+
+from KInARow import KInARow
 '''
 Board class for the game of TicTacToe.
 Default board size is 3x3.
@@ -66,177 +68,7 @@ class Board():
         """Check whether the given player has collected a triplet in any direction; 
         @param color (1=white,-1=black)
         """
-        win = self.n
-        # check z-dimension
-        count = 0
-        for z in range(self.n):
-            count = 0
-            for y in range(self.n):
-                count = 0
-                for x in range(self.n):
-                    if self.pieces[z,x,y]==color:
-                        count += 1
-                if count==win:
-                    return True
-
-        count = 0
-        for z in range(self.n):
-            count = 0
-            for x in range(self.n):
-                count = 0
-                for y in range(self.n):
-                    if self.pieces[z,x,y]==color:
-                        count += 1
-                if count==win:
-                    return True
-        
-        # check x dimension
-        count = 0
-        for x in range(self.n):
-            count = 0
-            for z in range(self.n):
-                count = 0
-                for y in range(self.n):
-                    if self.pieces[z,x,y]==color:
-                        count += 1
-                if count==win:
-                    return True
-
-        count = 0
-        for x in range(self.n):
-            count = 0
-            for y in range(self.n):
-                count = 0
-                for z in range(self.n):
-                    if self.pieces[z,x,y]==color:
-                        count += 1
-                if count==win:
-                    return True
-
-        # check y dimension
-        count = 0
-        for y in range(self.n):
-            count = 0
-            for x in range(self.n):
-                count = 0
-                for z in range(self.n):
-                    if self.pieces[z,x,y]==color:
-                        count += 1
-                if count==win:
-                    return True
-        
-        count = 0
-        for y in range(self.n):
-            count = 0
-            for z in range(self.n):
-                count = 0
-                for x in range(self.n):
-                    if self.pieces[z,x,y]==color:
-                        count += 1
-                if count==win:
-                    return True
-        
-        # check flat diagonals
-        # check z dimension
-        count = 0
-        for z in range(self.n):
-            count = 0
-            for d in range(self.n):
-                if self.pieces[z,d,d]==color:
-                    count += 1
-            if count==win:
-                return True
-        
-        count = 0
-        for z in range(self.n):
-            count = 0
-            for d in range(self.n):
-                if self.pieces[z,d,self.n-d-1]==color:
-                    count += 1
-            if count==win:
-                return True
-
-        # check x dimension
-        count = 0
-        for x in range(self.n):
-            count = 0
-            for d in range(self.n):
-                if self.pieces[d,x,d]==color:
-                    count += 1
-            if count==win:
-                return True
-
-        count = 0
-        for x in range(self.n):
-            count = 0
-            for d in range(self.n):
-                if self.pieces[d,x,self.n-d-1]==color:
-                    count += 1
-            if count==win:
-                return True
-
-        # check y dimension
-        count = 0
-        for y in range(self.n):
-            count = 0
-            for d in range(self.n):
-                if self.pieces[d,d,y]==color:
-                    count += 1
-            if count==win:
-                return True
-
-        count = 0
-        for y in range(self.n):
-            count = 0
-            for d in range(self.n):
-                if self.pieces[self.n-d-1,d,y]==color:
-                    count += 1
-            if count==win:
-                return True
-        
-        # check 4 true diagonals
-        count = 0
-        if self.pieces[0,0,0] == color:
-            count += 1
-            if self.pieces[1,1,1] == color:
-                count += 1
-                if self.pieces[2,2,2] == color:
-                    count += 1
-                    if count == win:
-                        return True
-            
-        count = 0
-        if self.pieces[2,0,0] == color:
-            count += 1
-            if self.pieces[1,1,1] == color:
-                count += 1
-                if self.pieces[0,2,2] == color:
-                    count += 1
-                    if count == win:
-                        return True
-        
-        count = 0
-        if self.pieces[2,2,0] == color:
-            count += 1
-            if self.pieces[1,1,1] == color:
-                count += 1
-                if self.pieces[0,0,2] == color:
-                    count += 1
-                    if count == win:
-                        return True
-        
-        count = 0
-        if self.pieces[0,2,0] == color:
-            count += 1
-            if self.pieces[1,1,1] == color:
-                count += 1
-                if self.pieces[2,0,2] == color:
-                    count += 1
-                    if count == win:
-                        return True
-
-        # return false if no 3 is reached
-        return False
+        return KInARow.get(self.pieces.shape, self.n).winner(self.pieces) == color
 
     def execute_move(self, move, color):
         """Perform the given move on the board; 
@@ -27,14 +27,10 @@ class HumanTicTacToePlayer():
         self.n = n
 
     def play(self, board):
-        boardvalues = np.arange(self.n*self.n*self.n).reshape(self.n,self.n,self.n)
-        validvalue = np.arange(self.n*self.n*self.n)
         # display(board)
         valid = self.game.getValidMoves(board, 1)
-        for i in range(len(valid)):
-            if valid[i] == 1:
-                action = validvalue[i]
-                print(np.argwhere(boardvalues == action))
+        for action in np.flatnonzero(valid[:-1]):
+            print(np.unravel_index(action, board.shape))
 
         while True: 
             # Python 3.x
@@ -43,8 +39,7 @@ class HumanTicTacToePlayer():
             # a = raw_input()
 
             z,x,y = [int(x) for x in a.split(' ')]
-            boardvalues = np.arange(self.n*self.n*self.n).reshape(self.n,self.n,self.n)
-            a = boardvalues[z][x][y]
+            a = np.ravel_multi_index((z, x, y), board.shape)
             if valid[a]:
                 break
             else:
@@ -19,4 +19,8 @@ class AverageMeter(object):
 
 class dotdict(dict):
     def __getattr__(self, name):
-        return self[name]
+        try:
+            return self[name]
+        except KeyError:
+            # lets getattr(args, name, default) work for optional arguments
+            raise AttributeError(name)